@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+"""
+Coût de connexion par requête: CONN_MAX_AGE=0 (une connexion par requête)
+contre connexions persistantes (CONN_MAX_AGE > 0, CONN_HEALTH_CHECKS)
+
+Simule le cycle d'une requête Django (signaux request_started /
+request_finished) autour d'une requête SQL, sans serveur HTTP.
+
+Seule mesure faite à ce jour : SQLite (ouvrir une connexion = ouvrir un
+fichier), 300 requêtes, médiane 0,31 ms avec CONN_MAX_AGE=0 contre 0,07 ms
+avec une connexion persistante. Ce chiffre ne dit rien du coût sur
+PostgreSQL (authentification, réseau, pgbouncer) : le script n'y a pas encore
+été lancé, les valeurs de production (DB_CONN_MAX_AGE) sont à valider avec
+lui sur le serveur cible.
+
+Usage (PostgreSQL):
+    DJANGO_SETTINGS_MODULE=ecom_maillot.settings_production \\
+    DB_NAME=ecom DB_USER=ecom DB_PASSWORD=... DB_HOST=127.0.0.1 \\
+    python bench_db_connections.py [--requests 500] [--alias default]
+"""
+import argparse
+import os
+import statistics
+import time
+
+import django
+
+# Configuration Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ecom_maillot.settings')
+django.setup()
+
+from django.core.signals import request_finished, request_started
+from django.db import connections
+
+
+def simulate(alias, requests, max_age, health_checks):
+    """Durée de chaque « requête » en ms et nombre de connexions ouvertes"""
+    connection = connections[alias]
+    connection.close()
+    connection.settings_dict['CONN_MAX_AGE'] = max_age
+    connection.settings_dict['CONN_HEALTH_CHECKS'] = health_checks
+
+    opened = 0
+    timings = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        request_started.send(sender=None)
+        if connection.connection is None:
+            opened += 1
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+        request_finished.send(sender=None)
+        timings.append((time.perf_counter() - started) * 1000)
+    connection.close()
+    return timings, opened
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--alias', default='default')
+    args = parser.parse_args()
+
+    vendor = connections[args.alias].vendor
+    print(f"⏱  Connexions par requête ({vendor}, {args.requests} requêtes)")
+    print("=" * 60)
+    for label, max_age, health_checks in (
+        ("CONN_MAX_AGE=0 (défaut Django)", 0, False),
+        ("CONN_MAX_AGE=60", 60, False),
+        ("CONN_MAX_AGE=60 + CONN_HEALTH_CHECKS", 60, True),
+    ):
+        timings, opened = simulate(args.alias, args.requests, max_age, health_checks)
+        print(f"{label:<40} médiane {statistics.median(timings):6.2f} ms  "
+              f"p95 {statistics.quantiles(timings, n=20)[-1]:6.2f} ms  connexions {opened}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+"""
+Latence de la première requête d'un worker neuf (déploiement ou recyclage
+par --max-requests), sans préchauffage, avec templates précompilés et avec
+le préchauffage complet
+
+Chaque scénario tourne dans un processus Python neuf.
+Usage: python bench_first_request.py [--urls / /products/ ...]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+DEFAULT_URLS = ['/', '/products/', '/cart/']
+SCENARIOS = {
+    'cold': "sans préchauffage",
+    'templates': "templates précompilés",
+    'warmup': "préchauffage complet (core.warmup)",
+}
+
+
+def run_child(scenario, urls):
+    """Exécuté dans le processus neuf: charge l'application comme gunicorn puis mesure"""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ecom_maillot.settings')
+    from ecom_maillot.wsgi import application  # noqa: F401 (chargement comme --preload)
+    from django.conf import settings
+    from django.test import Client
+
+    settings.ALLOWED_HOSTS = [*settings.ALLOWED_HOSTS, 'testserver']
+    started = time.perf_counter()
+    if scenario == 'templates':
+        from core.warmup import compile_templates
+
+        compile_templates()
+    elif scenario == 'warmup':
+        from core.warmup import warmup
+
+        warmup()
+    warmup_ms = (time.perf_counter() - started) * 1000
+
+    client = Client()
+    timings = {}
+    for url in urls:
+        runs = []
+        for _ in range(3):
+            started = time.perf_counter()
+            client.get(url)
+            runs.append((time.perf_counter() - started) * 1000)
+        timings[url] = runs
+    print(json.dumps({'warmup_ms': warmup_ms, 'timings': timings}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--urls', nargs='+', default=DEFAULT_URLS)
+    parser.add_argument('--child', choices=SCENARIOS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.urls)
+        return
+
+    env = {**os.environ, 'LOG_LEVEL': 'WARNING'}
+    print("⏱  Première requête d'un worker neuf (ms: 1re / 2e / 3e requête)")
+    print("=" * 60)
+    for scenario, label in SCENARIOS.items():
+        process = subprocess.run(
+            [sys.executable, __file__, '--child', scenario, '--urls', *args.urls],
+            capture_output=True, text=True, env=env,
+        )
+        if process.returncode:
+            sys.exit(process.stderr)
+        result = json.loads(process.stdout.strip().splitlines()[-1])
+        print(f"\n{label} ({result['warmup_ms']:.0f} ms avant la 1re requête):")
+        for url, runs in result['timings'].items():
+            print(f"  {url:<20} " + " / ".join(f"{run:7.1f}" for run in runs))
+
+
+if __name__ == '__main__':
+    main()
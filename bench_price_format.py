@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+"""
+Microbenchmark du formatage des prix (coût par appel)
+
+Usage: python bench_price_format.py [--calls 100000]
+"""
+import argparse
+import os
+import random
+import timeit
+from decimal import Decimal
+
+import django
+
+# Configuration Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ecom_maillot.settings')
+django.setup()
+
+from core.templatetags import price_format as filters
+from core.tests import legacy_price_format
+
+
+def sample_prices(count, distinct):
+    """Prix d'une page: ``distinct`` montants différents répétés sur ``count`` appels"""
+    rng = random.Random(42)
+    amounts = [Decimal(rng.randint(1000, 100000)) + Decimal(rng.choice(['0', '0.50', '0.99'])) for _ in range(distinct)]
+    return [rng.choice(amounts) for _ in range(count)]
+
+
+def per_call(function, values, repeat=5):
+    """Meilleur temps par appel en microsecondes"""
+    best = min(timeit.repeat(lambda: [function(value) for value in values], number=1, repeat=repeat))
+    return best / len(values) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--calls', type=int, default=100000)
+    args = parser.parse_args()
+
+    print("⏱  Formatage des prix (µs par appel)")
+    print("=" * 50)
+    for label, distinct in (("prix répétés (page liste)", 50), ("prix tous différents", args.calls)):
+        values = sample_prices(args.calls, distinct)
+        filters._cached_format_price.cache_clear()
+        print(f"\n{label}:")
+        print(f"  {'ancien price_format':<26} {per_call(legacy_price_format, values):6.2f}")
+        for name in ('price_format', 'price_format_no_currency', 'price_format_compact'):
+            print(f"  {name:<26} {per_call(getattr(filters, name), values):6.2f}")
+        batch = per_call(lambda chunk: filters.price_format_many(*chunk), [values[i:i + 20] for i in range(0, len(values), 20)])
+        print(f"  {'price_format_many (x20)':<26} {batch / 20:6.2f}")
+        print(f"  cache: {filters._cached_format_price.cache_info()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,48 +1,124 @@
-from decimal import Decimal
+"""
+Panier de la requête en cours
+
+- Visiteur anonyme : les lignes (et leurs personnalisations) sont dans un
+  cookie signé et compressé (``settings.CART_COOKIE_NAME``), écrit par
+  ``cart.middleware.CartCookieMiddleware`` seulement si le panier a changé.
+  Ni session ni ligne en base : parcourir le site ne crée aucune session.
+- Utilisateur connecté : les lignes sont dans la session, enregistrée
+  seulement si elles ont changé, et les articles dans ``cart.models.Cart``
+  (personnalisations, commande).
+
+Dans les deux cas, les lignes décrivent tout le panier (personnalisations
+comprises) : les prix et les totaux en sont tirés par ``cart.pricing``.
+
+À la connexion, le panier du cookie est fusionné avec celui de l'utilisateur
+(``cart.merge``).
+"""
+import json
+
 from django.conf import settings
-from products.models import Product
+from django.core import signing
+
+from products.models import CartItemCustomization, Product
+
+CART_COOKIE_SALT = 'cart.cookie'
+# Un cookie dépassant ~4 Ko est ignoré par le navigateur
+CART_COOKIE_MAX_LINES = 20
+
+
+class CartFull(Exception):
+    """Panier du cookie plein (``CART_COOKIE_MAX_LINES`` lignes)"""
+
+
+def _dumps(lines):
+    return json.dumps(lines, sort_keys=True, separators=(',', ':'))
+
+
+class CookieCart:
+    """Lignes du cookie panier de la requête et leur dernière version envoyée"""
+
+    def __init__(self, lines):
+        self.lines = lines
+        self.saved = _dumps(lines)
+
+    @classmethod
+    def for_request(cls, request):
+        state = getattr(request, '_cart_cookie', None)
+        if state is None:
+            state = request._cart_cookie = cls(cls.load(request.COOKIES.get(settings.CART_COOKIE_NAME)))
+        return state
+
+    @staticmethod
+    def load(value):
+        if not value:
+            return {}
+        try:
+            lines = signing.loads(value, salt=CART_COOKIE_SALT, max_age=settings.CART_COOKIE_AGE)
+        except signing.BadSignature:
+            return {}
+        return lines if isinstance(lines, dict) else {}
+
+    def dumps(self):
+        return signing.dumps(self.lines, salt=CART_COOKIE_SALT, compress=True)
+
+    def changed(self):
+        return _dumps(self.lines) != self.saved
 
 
 class Cart:
     def __init__(self, request):
         """Initialise le panier"""
-        self.session = request.session
         self._request = request
-        cart = self.session.get(settings.CART_SESSION_ID)
-        if not cart:
-            # Sauvegarder un panier vide dans la session
-            cart = self.session[settings.CART_SESSION_ID] = {}
-        self.cart = cart
-
-    def add(self, product, size, quantity=1, override_quantity=False):
-        """Ajouter un produit au panier ou mettre à jour sa quantité"""
+        self.session = request.session
+        if request.user.is_authenticated:
+            self._cookie = None
+            self.cart = self.session.get(settings.CART_SESSION_ID) or {}
+            self._saved = _dumps(self.cart)
+        else:
+            self._cookie = CookieCart.for_request(request)
+            self.cart = self._cookie.lines
+
+    @property
+    def anonymous(self):
+        return self._cookie is not None
+
+    def add(self, product, size, quantity=1, override_quantity=False, customizations=()):
+        """
+        Ajouter un produit au panier ou mettre à jour sa quantité.
+        ``customizations`` : couples (JerseyCustomization, texte) à ajouter à
+        l'article. Retourne l'article en base (utilisateur connecté) ou None.
+        """
         product_id = str(product.id)
         size_key = f"{product_id}_{size}"
-        
+
         if size_key not in self.cart:
+            if self.anonymous and len(self.cart) >= CART_COOKIE_MAX_LINES:
+                raise CartFull()
             self.cart[size_key] = {
                 'quantity': 0,
-                'price': str(product.current_price),
                 'size': size
             }
-        
+
         if override_quantity:
             self.cart[size_key]['quantity'] = quantity
         else:
             self.cart[size_key]['quantity'] += quantity
-        
+
+        if customizations:
+            self.cart[size_key].setdefault('customizations', []).extend(
+                [customization.id, custom_text] for customization, custom_text in customizations
+            )
+
+        if self.anonymous:
+            return None
+
         self.save()
-        
-        # Retourner le cart_item pour les personnalisations
+
         from .models import Cart, CartItem
-        from django.contrib.auth.models import AnonymousUser
-        
-        # Créer ou récupérer le panier
-        if hasattr(self, '_request') and not isinstance(self._request.user, AnonymousUser):
-            cart, created = Cart.objects.get_or_create(user=self._request.user)
-        else:
-            cart, created = Cart.objects.get_or_create(session_key=self._request.session.session_key)
-        
+
+        cart, created = Cart.objects.get_or_create(user=self._request.user)
+
         # Créer ou récupérer le cart_item
         cart_item, created = CartItem.objects.get_or_create(
             cart=cart,
@@ -50,86 +126,93 @@ class Cart:
             size=size,
             defaults={'quantity': quantity}
         )
-        
+
         if not created:
             if override_quantity:
                 cart_item.quantity = quantity
             else:
                 cart_item.quantity += quantity
             cart_item.save()
-        
+
+        if customizations:
+            rows = []
+            for customization, custom_text in customizations:
+                custom = CartItemCustomization(cart_item=cart_item, customization=customization, custom_text=custom_text)
+                custom.price = custom.compute_price()
+                rows.append(custom)
+            CartItemCustomization.objects.bulk_create(rows)
+
         return cart_item
 
     def save(self):
-        """Marquer la session comme "modifiée" pour s'assurer qu'elle est sauvegardée"""
-        self.session.modified = True
+        """Enregistrer la session si les lignes ont changé (le cookie est écrit par le middleware)"""
+        if self.anonymous:
+            return
+        serialized = _dumps(self.cart)
+        if serialized == self._saved:
+            return
+        self._saved = serialized
+        if self.cart:
+            self.session[settings.CART_SESSION_ID] = self.cart
+        else:
+            self.session.pop(settings.CART_SESSION_ID, None)
 
     def remove(self, product, size):
         """Supprimer un produit du panier"""
         product_id = str(product.id)
         size_key = f"{product_id}_{size}"
-        
+
         if size_key in self.cart:
             del self.cart[size_key]
             self.save()
 
+        if not self.anonymous:
+            from .models import CartItem
+
+            CartItem.objects.filter(cart__user=self._request.user, product=product, size=size).delete()
+
+    def pricing(self):
+        """Chiffrage du panier aux prix actuels (``cart.pricing``), en cache"""
+        from .pricing import cart_pricing
+
+        return cart_pricing(self.cart)
+
     def __iter__(self):
-        """Itérer sur les articles du panier et obtenir les produits de la base de données"""
-        product_ids = []
-        for key in self.cart.keys():
-            product_id = key.split('_')[0]
-            if product_id not in product_ids:
-                product_ids.append(product_id)
-        
-        # Obtenir les objets produit et les ajouter au panier
-        products = Product.objects.filter(id__in=product_ids)
-        cart = self.cart.copy()
-        
-        for product in products:
-            product_id = str(product.id)
-            for key in cart.keys():
-                if key.startswith(product_id + '_'):
-                    cart[key]['product'] = product
-
-        for item in cart.values():
-            item['price'] = Decimal(item['price'])
-            item['total_price'] = item['price'] * item['quantity']
-            yield item
+        """Itérer sur les articles chiffrés du panier avec leurs produits"""
+        lines = self.pricing().lines
+        products = Product.objects.select_related('team').in_bulk({line.product_id for line in lines})
+
+        for line in lines:
+            if line.product_id not in products:
+                continue
+            yield {
+                'product': products[line.product_id],
+                'size': line.size,
+                'quantity': line.quantity,
+                'price': line.unit_price,
+                'base_price': line.base_price,
+                'customizations': line.customizations,
+                'total_price': line.total_price,
+            }
 
     def __len__(self):
         """Compter tous les articles dans le panier"""
         return sum(item['quantity'] for item in self.cart.values())
 
     def get_total_price(self):
-        """Calculer le coût total des articles dans le panier avec personnalisations"""
-        total = 0
-        
-        # Récupérer les cart_items avec leurs personnalisations
-        from .models import Cart, CartItem
-        from django.contrib.auth.models import AnonymousUser
-        
-        if hasattr(self, '_request') and not isinstance(self._request.user, AnonymousUser):
-            cart = Cart.objects.filter(user=self._request.user).first()
-        else:
-            cart = Cart.objects.filter(session_key=self._request.session.session_key).first()
-        
-        if cart:
-            # Utiliser les cart_items qui ont déjà les personnalisations calculées
-            for cart_item in cart.items.all():
-                total += cart_item.total_price
-        else:
-            # Fallback : calcul basique sans personnalisations
-            for item in self.cart.values():
-                base_price = Decimal(item['price']) * item['quantity']
-                total += base_price
-        
-        return total
+        """Coût total des articles du panier avec personnalisations"""
+        return self.pricing().subtotal
 
     def clear(self):
-        """Supprimer le panier de la session"""
-        del self.session[settings.CART_SESSION_ID]
+        """Vider le panier"""
+        self.cart.clear()
         self.save()
 
+        if not self.anonymous:
+            from .models import CartItem
+
+            CartItem.objects.filter(cart__user=self._request.user).delete()
+
     def get_item(self, product, size):
         """Obtenir un article spécifique du panier"""
         product_id = str(product.id)
@@ -0,0 +1,39 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from cart.purge import ANONYMOUS_CART_DAYS, BATCH_SIZE, CART_DAYS, SLEEP, purge
+
+
+class Command(BaseCommand):
+    help = "Supprime les paniers abandonnés et les sessions expirées par petits lots (à lancer chaque nuit par cron)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--anonymous-days', type=int, default=ANONYMOUS_CART_DAYS,
+                            help="Inactivité (jours) au-delà de laquelle un panier anonyme est supprimé")
+        parser.add_argument('--days', type=int, default=CART_DAYS,
+                            help="Inactivité (jours) au-delà de laquelle un panier d'utilisateur est supprimé")
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help="Identifiants traités par lot")
+        parser.add_argument('--sleep', type=float, default=SLEEP, help="Pause entre deux lots (secondes)")
+        parser.add_argument('--skip-sessions', action='store_true', help="Ne pas supprimer les sessions expirées")
+        parser.add_argument('--dry-run', action='store_true', help="Compter sans supprimer")
+        parser.add_argument('--json', action='store_true', help="Résultat JSON (supervision)")
+
+    def handle(self, *args, **options):
+        report = purge(
+            anonymous_days=options['anonymous_days'],
+            days=options['days'],
+            batch_size=options['batch_size'],
+            sleep=options['sleep'],
+            sessions=not options['skip_sessions'],
+            dry_run=options['dry_run'],
+        )
+        if options['json']:
+            self.stdout.write(json.dumps(report.as_dict()))
+            return
+
+        prefix = "[simulation] " if options['dry_run'] else ""
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}{report.carts} paniers ({report.items} articles, {report.customizations} personnalisations) "
+            f"et {report.sessions} sessions supprimés en {report.batches} lots, {report.duration_ms} ms"
+        ))
@@ -0,0 +1,108 @@
+"""
+Fusion des paniers à la connexion
+
+Le panier du cookie (visiteur anonyme) et le panier en base de l'utilisateur
+sont fusionnés en une transaction et un nombre fixe de requêtes, quel que soit
+le nombre de lignes :
+
+- produits du cookie chargés en une requête, options de personnalisation lues
+  dans le catalogue en mémoire (``products.customizations``) ;
+- articles existants de l'utilisateur chargés en une requête ;
+- un seul ``INSERT ... ON CONFLICT (cart, product, size) DO UPDATE`` pour
+  tous les articles (quantités additionnées, plafonnées au stock) ;
+- un seul ``bulk_create`` pour toutes les personnalisations.
+
+Les lignes de la session (articles et personnalisations) sont ensuite
+reconstruites depuis le panier fusionné : un utilisateur qui se reconnecte
+retrouve son panier en base.
+"""
+from django.conf import settings
+from django.db import transaction
+
+from products.customizations import customization_catalog
+from products.models import CartItemCustomization, Product
+
+from .cart import CookieCart
+from .models import Cart as CartModel, CartItem
+
+
+def merge_carts(request, user):
+    """Fusionne le cookie panier dans le panier de ``user``. Retourne (lignes reprises, lignes ignorées)."""
+    state = CookieCart.for_request(request)
+    lines = state.lines
+
+    product_ids = {int(key.split('_')[0]) for key in lines}
+    products = Product.objects.filter(is_active=True).in_bulk(product_ids) if product_ids else {}
+    option_ids = {custom_id for line in lines.values() for custom_id, _ in line.get('customizations', ())}
+    options = customization_catalog().in_bulk(option_ids) if option_ids else {}
+
+    merged, skipped = 0, 0
+    with transaction.atomic():
+        if lines:
+            cart, _ = CartModel.objects.get_or_create(user=user)
+        else:
+            cart = CartModel.objects.filter(user=user).first()
+        items = {
+            (item.product_id, item.size): item
+            for item in CartItem.objects.filter(cart=cart)
+        } if cart else {}
+
+        upserts, customizations = [], []
+        for key, line in lines.items():
+            product = products.get(int(key.split('_')[0]))
+            size = line.get('size')
+            if product is None or not product.is_available_in_size(size):
+                skipped += 1
+                continue
+            existing = items.get((product.id, size))
+            quantity = min((existing.quantity if existing else 0) + line['quantity'], product.get_stock_for_size(size))
+            if quantity <= 0:
+                skipped += 1
+                continue
+            item = items[(product.id, size)] = CartItem(cart=cart, product=product, size=size, quantity=quantity)
+            upserts.append(item)
+            customizations.extend(
+                (product.id, size, options[custom_id], custom_text)
+                for custom_id, custom_text in line.get('customizations', ())
+                if custom_id in options
+            )
+            merged += 1
+
+        if upserts:
+            CartItem.objects.bulk_create(
+                upserts, update_conflicts=True, unique_fields=['cart', 'product', 'size'], update_fields=['quantity'],
+            )
+        if customizations:
+            # bulk_create avec update_conflicts ne renvoie pas les clés (Django 4.2)
+            item_ids = {
+                (product_id, size): item_id
+                for product_id, size, item_id in CartItem.objects.filter(cart=cart).values_list('product_id', 'size', 'id')
+            }
+            rows = []
+            for product_id, size, option, custom_text in customizations:
+                custom = CartItemCustomization(
+                    cart_item_id=item_ids[product_id, size], customization=option, custom_text=custom_text,
+                )
+                custom.price = custom.compute_price()
+                rows.append(custom)
+            CartItemCustomization.objects.bulk_create(rows)
+
+    # Lignes de session reconstruites depuis le panier fusionné, personnalisations comprises
+    previous = request.session.get(settings.CART_SESSION_ID) or {}
+    session_lines = {
+        f"{product_id}_{size}": {'quantity': item.quantity, 'size': size}
+        for (product_id, size), item in items.items()
+    }
+    if session_lines:
+        for product_id, size, custom_id, custom_text in CartItemCustomization.objects.filter(
+            cart_item__cart=cart,
+        ).order_by('id').values_list('cart_item__product_id', 'cart_item__size', 'customization_id', 'custom_text'):
+            session_lines[f"{product_id}_{size}"].setdefault('customizations', []).append([custom_id, custom_text])
+    if session_lines != previous:
+        if session_lines:
+            request.session[settings.CART_SESSION_ID] = session_lines
+        else:
+            request.session.pop(settings.CART_SESSION_ID, None)
+
+    lines.clear()
+    return merged, skipped
@@ -0,0 +1,31 @@
+"""
+Middleware du panier
+"""
+from django.conf import settings
+
+
+class CartCookieMiddleware:
+    """Écrit (ou supprime) le cookie du panier anonyme quand il a changé pendant la requête"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        # Posé par cart.cart.CookieCart.for_request si la requête a lu le panier
+        state = getattr(request, '_cart_cookie', None)
+        if state is None or not state.changed():
+            return response
+
+        if state.lines:
+            response.set_cookie(
+                settings.CART_COOKIE_NAME,
+                state.dumps(),
+                max_age=settings.CART_COOKIE_AGE,
+                secure=settings.SESSION_COOKIE_SECURE,
+                httponly=True,
+                samesite='Lax',
+            )
+        else:
+            response.delete_cookie(settings.CART_COOKIE_NAME, samesite='Lax')
+        return response
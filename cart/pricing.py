@@ -0,0 +1,124 @@
+"""
+Chiffrage du panier
+
+Tous les prix d'un panier (lignes, personnalisations, totaux) sont calculés en
+un seul passage à partir des prix actuels : ceux des produits chargés en une
+requête, ceux des options de personnalisation lus dans le catalogue en
+mémoire (``products.customizations``).
+
+Le résultat est mis en cache (cache ``catalog``) sous une clé formée de la
+version du panier (empreinte de ses lignes) et de la version des prix
+(``products.cache.price_version``) : modifier le panier ou un prix change la
+clé, un panier inchangé n'est chiffré qu'une fois. Le panier, le passage de
+commande et la mise à jour AJAX affichent tous ce même résultat.
+"""
+import hashlib
+from dataclasses import dataclass, field
+from decimal import Decimal
+
+from core.cache import get_or_compute
+from products.cache import CATALOG_CACHE, price_version
+from products.customizations import customization_catalog
+from products.models import Product
+
+from .cart import _dumps
+
+SHIPPING_COST = Decimal('1000')  # Frais de livraison fixes
+
+
+@dataclass
+class CustomizationPrice:
+    option_id: int
+    name: str
+    custom_text: str
+    price: Decimal
+
+
+@dataclass
+class LinePrice:
+    key: str
+    product_id: int
+    size: str
+    quantity: int
+    unit_price: Decimal
+    customizations: list = field(default_factory=list)
+
+    @property
+    def base_price(self):
+        return self.unit_price * self.quantity
+
+    @property
+    def customization_price(self):
+        return sum((custom.price for custom in self.customizations), Decimal('0'))
+
+    @property
+    def total_price(self):
+        return self.base_price + self.customization_price
+
+
+@dataclass
+class CartPricing:
+    lines: list = field(default_factory=list)
+    shipping_cost: Decimal = SHIPPING_COST
+
+    @property
+    def subtotal(self):
+        return sum((line.total_price for line in self.lines), Decimal('0'))
+
+    @property
+    def total(self):
+        return self.subtotal + self.shipping_cost
+
+    @property
+    def item_count(self):
+        return sum(line.quantity for line in self.lines)
+
+
+def cart_version(lines):
+    """Empreinte des lignes du panier"""
+    return hashlib.sha1(_dumps(lines).encode()).hexdigest()
+
+
+def price_cart(lines):
+    """Chiffre les lignes d'un panier aux prix actuels (produits inactifs ou supprimés ignorés)"""
+    product_ids = {int(key.split('_')[0]) for key in lines}
+    prices = {
+        product_id: sale_price or price
+        for product_id, price, sale_price in Product.objects.filter(
+            id__in=product_ids, is_active=True,
+        ).values_list('id', 'price', 'sale_price')
+    } if product_ids else {}
+    option_ids = {custom_id for line in lines.values() for custom_id, _ in line.get('customizations', ())}
+    options = customization_catalog().in_bulk(option_ids) if option_ids else {}
+
+    pricing = CartPricing()
+    for key, line in lines.items():
+        product_id = int(key.split('_')[0])
+        if product_id not in prices:
+            continue
+        pricing.lines.append(LinePrice(
+            key=key,
+            product_id=product_id,
+            size=line['size'],
+            quantity=line['quantity'],
+            unit_price=prices[product_id],
+            customizations=[
+                CustomizationPrice(
+                    option_id=custom_id,
+                    name=options[custom_id].name,
+                    custom_text=custom_text,
+                    price=options[custom_id].price_for(custom_text),
+                )
+                for custom_id, custom_text in line.get('customizations', ())
+                if custom_id in options
+            ],
+        ))
+    return pricing
+
+
+def cart_pricing(lines):
+    """Chiffrage des lignes, en cache tant que le panier et les prix ne changent pas"""
+    if not lines:
+        return CartPricing()
+    key = f"cart-pricing:{cart_version(lines)}:{price_version()}"
+    return get_or_compute(key, lambda: price_cart(lines), cache=CATALOG_CACHE)
@@ -0,0 +1,130 @@
+"""
+Purge des paniers abandonnés et des sessions expirées
+
+Les tables sont parcourues par fenêtres d'identifiants (``batch_size`` ids à
+la fois) : chaque fenêtre est supprimée dans sa propre transaction courte,
+suivie d'une pause (``sleep``), pour ne jamais verrouiller une table pendant
+longtemps ni saturer le disque de la base.
+
+Paniers supprimés :
+
+- anonymes (``session_key``) inactifs depuis ``anonymous_days`` jours ; depuis
+  les paniers en cookie, plus aucun n'est créé ;
+- d'utilisateurs sans activité depuis ``days`` jours (dernier ajout d'article
+  ou modification du panier).
+
+Les sessions expirées sont supprimées par lots de clés (``clearsessions``
+les supprime en une seule requête).
+"""
+import logging
+import time
+from dataclasses import asdict, dataclass
+from datetime import timedelta
+
+from django.contrib.sessions.models import Session
+from django.db import transaction
+from django.db.models import Max, Min, Q
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from products.models import CartItemCustomization
+
+from .models import Cart, CartItem
+
+logger = logging.getLogger(__name__)
+
+ANONYMOUS_CART_DAYS = 2
+CART_DAYS = 60
+BATCH_SIZE = 500
+SLEEP = 0.1
+
+
+@dataclass
+class PurgeReport:
+    carts: int = 0
+    items: int = 0
+    customizations: int = 0
+    sessions: int = 0
+    batches: int = 0
+    duration_ms: int = 0
+
+    def as_dict(self):
+        return asdict(self)
+
+
+def stale_carts(anonymous_days=ANONYMOUS_CART_DAYS, days=CART_DAYS, now=None):
+    """Paniers à supprimer: anonymes ou utilisateurs inactifs"""
+    now = now or timezone.now()
+    return Cart.objects.annotate(
+        last_activity=Greatest('updated_at', Coalesce(Max('items__added_at'), 'updated_at')),
+    ).filter(
+        Q(user__isnull=True, last_activity__lt=now - timedelta(days=anonymous_days))
+        | Q(user__isnull=False, last_activity__lt=now - timedelta(days=days))
+    )
+
+
+def id_windows(queryset, batch_size):
+    """Fenêtres [début, fin) couvrant les identifiants de ``queryset``"""
+    bounds = queryset.aggregate(low=Min('id'), high=Max('id'))
+    if bounds['low'] is None:
+        return
+    for start in range(bounds['low'], bounds['high'] + 1, batch_size):
+        yield start, start + batch_size
+
+
+def delete_carts(cart_ids):
+    """Supprime des paniers et leurs lignes, des feuilles vers la racine. Retourne (paniers, articles, personnalisations)."""
+    with transaction.atomic():
+        customizations = CartItemCustomization.objects.filter(cart_item__cart_id__in=cart_ids).delete()[0]
+        items = CartItem.objects.filter(cart_id__in=cart_ids).delete()[0]
+        carts = Cart.objects.filter(id__in=cart_ids).delete()[0]
+    return carts, items, customizations
+
+
+def purge_carts(report, anonymous_days=ANONYMOUS_CART_DAYS, days=CART_DAYS, batch_size=BATCH_SIZE,
+                sleep=SLEEP, dry_run=False):
+    now = timezone.now()
+    stale = stale_carts(anonymous_days, days, now)
+    for start, end in id_windows(Cart.objects.all(), batch_size):
+        cart_ids = list(stale.filter(id__gte=start, id__lt=end).values_list('id', flat=True))
+        if not cart_ids:
+            continue
+        report.batches += 1
+        if dry_run:
+            report.carts += len(cart_ids)
+            continue
+        carts, items, customizations = delete_carts(cart_ids)
+        report.carts += carts
+        report.items += items
+        report.customizations += customizations
+        time.sleep(sleep)
+
+
+def purge_sessions(report, batch_size=BATCH_SIZE, sleep=SLEEP, dry_run=False):
+    expired = Session.objects.filter(expire_date__lt=timezone.now())
+    if dry_run:
+        report.sessions = expired.count()
+        return
+    while True:
+        keys = list(expired.values_list('session_key', flat=True)[:batch_size])
+        if not keys:
+            break
+        report.batches += 1
+        report.sessions += Session.objects.filter(session_key__in=keys).delete()[0]
+        if len(keys) < batch_size:
+            break
+        time.sleep(sleep)
+
+
+def purge(anonymous_days=ANONYMOUS_CART_DAYS, days=CART_DAYS, batch_size=BATCH_SIZE, sleep=SLEEP,
+          sessions=True, dry_run=False):
+    """Purge les paniers abandonnés puis les sessions expirées. Retourne un ``PurgeReport``."""
+    started = time.perf_counter()
+    report = PurgeReport()
+    purge_carts(report, anonymous_days, days, batch_size, sleep, dry_run)
+    if sessions:
+        purge_sessions(report, batch_size, sleep, dry_run)
+    report.duration_ms = int((time.perf_counter() - started) * 1000)
+
+    logger.info('cart_purge_done', extra={**report.as_dict(), 'dry_run': dry_run})
+    return report
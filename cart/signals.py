@@ -0,0 +1,26 @@
+"""
+Panier à la connexion: le panier du cookie (visiteur anonyme) est fusionné
+avec celui de l'utilisateur (voir cart.merge), puis le cookie est supprimé.
+"""
+import logging
+
+from django.contrib.auth.signals import user_logged_in
+from django.dispatch import receiver
+
+from .merge import merge_carts
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(user_logged_in, dispatch_uid='cart_merge_cookie_cart')
+def merge_cart_on_login(sender, request, user, **kwargs):
+    if request is None:
+        return
+    try:
+        merged, skipped = merge_carts(request, user)
+    except Exception:
+        # Ne jamais empêcher la connexion
+        logger.exception('cart_merge_failed', extra={'user_id': user.pk})
+        return
+    if merged or skipped:
+        logger.info('cart_merged', extra={'user_id': user.pk, 'lines': merged, 'skipped': skipped})
@@ -1,3 +1,335 @@
-from django.test import TestCase
+import io
+import json
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import login
+from django.contrib.auth.models import AnonymousUser, User
+from django.contrib.messages import get_messages
+from django.contrib.sessions.backends.cached_db import SessionStore
+from django.contrib.sessions.models import Session
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from orders.models import Address, Order
+from products.customizations import customization_catalog
+from products.models import CartItemCustomization, Category, JerseyCustomization, Product, Team
+
+from .cart import CART_COOKIE_MAX_LINES, Cart
+from .models import Cart as CartModel, CartItem
+from .purge import purge
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class CookieCartTest(TestCase):
+    """Tests pour le panier anonyme en cookie signé et les sessions"""
+
+    def setUp(self):
+        category = Category.objects.create(name="Maillots", slug='maillots')
+        team = Team.objects.create(name="ASEC Mimosas", slug='asec', country="Côte d'Ivoire")
+        self.product = Product.objects.create(
+            name="Maillot domicile", category=category, team=team, description="-",
+            price=Decimal('15000'), available_sizes=['M', 'L'], stock_quantity=10,
+        )
+        self.badge = JerseyCustomization.objects.create(
+            name="Badge Ligue_1", customization_type='badge', badge_type='ligue_1', price=Decimal('500'),
+        )
+
+    def add(self, quantity=1, **customization):
+        data = {'product_id': self.product.id, 'size': 'M', 'quantity': quantity}
+        data.update(customization)
+        return self.client.post(reverse('cart:cart_add'), data)
+
+    def test_anonymous_browsing_creates_no_session(self):
+        self.client.get(reverse('products:home'))
+        self.client.get(reverse('products:product_detail', args=[self.product.slug]))
+        response = self.client.get(reverse('cart:cart_detail'))
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, response.cookies)
+        self.assertNotIn(settings.CART_COOKIE_NAME, response.cookies)
+        self.assertEqual(Session.objects.count(), 0)
+
+    def test_anonymous_cart_lives_in_signed_cookie(self):
+        response = self.add(2, customization_0_type='badge', customization_0_badge_type='ligue_1')
+        self.assertIn(settings.CART_COOKIE_NAME, response.cookies)
+        self.assertEqual(Session.objects.count(), 0)
+        self.assertFalse(CartModel.objects.exists())
+
+        response = self.client.get(reverse('cart:cart_detail'))
+        item, = response.context['cart_items']
+        self.assertEqual(item['quantity'], 2)
+        self.assertEqual([custom.price for custom in item['customizations']], [Decimal('500')])
+        self.assertEqual(response.context['pricing'].subtotal, Decimal('30500'))
+        # Panier inchangé: le cookie n'est pas renvoyé
+        self.assertNotIn(settings.CART_COOKIE_NAME, response.cookies)
+
+        # Cookie modifié: signature invalide, panier vide
+        self.client.cookies[settings.CART_COOKIE_NAME] = self.client.cookies[settings.CART_COOKIE_NAME].value + 'x'
+        response = self.client.get(reverse('cart:cart_detail'))
+        self.assertEqual(response.context['cart_items'], [])
+
+    def test_client_price_fields_are_ignored(self):
+        self.add(1, customization_0_type='badge', customization_0_badge_type='ligue_1', customization_0_price='gratuit')
+        response = self.client.get(reverse('cart:cart_detail'))
+        self.assertEqual(response.context['pricing'].subtotal, Decimal('15500'))
+
+    def test_removing_last_line_deletes_cookie(self):
+        self.add()
+        response = self.client.post(reverse('cart:cart_remove'), {'product_id': self.product.id, 'size': 'M'})
+        self.assertEqual(response.cookies[settings.CART_COOKIE_NAME]['max-age'], 0)
+
+    def test_full_cookie_cart_redirects_to_product(self):
+        for index in range(CART_COOKIE_MAX_LINES):
+            product = Product.objects.create(
+                name=f"Maillot {index}", category=self.product.category, team=self.product.team, description="-",
+                price=Decimal('15000'), available_sizes=['M'], stock_quantity=10,
+            )
+            self.client.post(reverse('cart:cart_add'), {'product_id': product.id, 'size': 'M', 'quantity': 1})
+        response = self.add()
+        self.assertRedirects(response, self.product.get_absolute_url(), fetch_redirect_response=False)
+        self.assertIn("panier est plein", str(list(get_messages(response.wsgi_request))[-1]))
+        self.assertNotIn(settings.CART_COOKIE_NAME, response.cookies)
+
+    def login_request(self, user):
+        """Connexion avec le cookie panier du client de test"""
+        request = RequestFactory().post('/accounts/login/')
+        request.COOKIES[settings.CART_COOKIE_NAME] = self.client.cookies[settings.CART_COOKIE_NAME].value
+        request.session = SessionStore()
+        request.user = AnonymousUser()
+        login(request, user, backend='django.contrib.auth.backends.ModelBackend')
+        return request
+
+    def test_login_moves_cookie_cart_to_user_cart(self):
+        user = User.objects.create_user(username='client', password='secret')
+        self.add(2, customization_0_type='badge', customization_0_badge_type='ligue_1')
+
+        request = self.login_request(user)
+        item = CartItem.objects.get(cart__user=user)
+        self.assertEqual((item.product, item.size, item.quantity), (self.product, 'M', 2))
+        self.assertEqual(CartItemCustomization.objects.get(cart_item=item).customization, self.badge)
+        self.assertEqual(len(Cart(request)), 2)
+        # Le cookie sera supprimé par CartCookieMiddleware
+        self.assertEqual(request._cart_cookie.lines, {})
+        self.assertTrue(request._cart_cookie.changed())
+
+    def test_login_merges_with_existing_user_cart(self):
+        user = User.objects.create_user(username='client', password='secret')
+        cart = CartModel.objects.create(user=user)
+        CartItem.objects.create(cart=cart, product=self.product, size='M', quantity=7)
+        CartItem.objects.create(cart=cart, product=self.product, size='L', quantity=1)
+        self.add(5)
+
+        request = self.login_request(user)
+        # Quantités additionnées, plafonnées au stock (10)
+        self.assertEqual(dict(CartItem.objects.filter(cart=cart).values_list('size', 'quantity')), {'M': 10, 'L': 1})
+        # Panier en base retrouvé dans la session
+        self.assertEqual(len(Cart(request)), 11)
+
+    def test_merge_query_count_does_not_depend_on_lines(self):
+        products = [self.product] + [
+            Product.objects.create(
+                name=f"Maillot {index}", category=self.product.category, team=self.product.team, description="-",
+                price=Decimal('15000'), available_sizes=['M'], stock_quantity=10,
+            )
+            for index in range(3)
+        ]
+        counts = []
+        for index, count in enumerate((1, 4)):
+            self.client.cookies.clear()
+            for product in products[:count]:
+                self.client.post(reverse('cart:cart_add'), {
+                    'product_id': product.id, 'size': 'M', 'quantity': 1,
+                    'customization_0_type': 'badge', 'customization_0_badge_type': 'ligue_1',
+                })
+            user = User.objects.create_user(username=f'client{index}')
+            with CaptureQueriesContext(connection) as queries:
+                self.login_request(user)
+            counts.append(len(queries))
+            self.assertEqual(CartItemCustomization.objects.filter(cart_item__cart__user=user).count(), count)
+        self.assertEqual(counts[0], counts[1])
+
+    def test_removed_lines_do_not_come_back_after_login(self):
+        user = User.objects.create_user(username='client', password='secret')
+        self.client.force_login(user)
+        self.add(2)
+        self.client.post(reverse('cart:cart_add'), {'product_id': self.product.id, 'size': 'L', 'quantity': 1})
+        self.client.post(reverse('cart:cart_remove'), {'product_id': self.product.id, 'size': 'M'})
+        self.assertEqual(list(CartItem.objects.filter(cart__user=user).values_list('size', flat=True)), ['L'])
+
+        self.client.logout()
+        self.client.force_login(user)
+        response = self.client.get(reverse('cart:cart_detail'))
+        self.assertEqual([item['size'] for item in response.context['cart_items']], ['L'])
+
+        self.client.get(reverse('cart:cart_clear'))
+        self.assertFalse(CartItem.objects.filter(cart__user=user).exists())
+
+    def test_customized_add_query_count_does_not_depend_on_customizations(self):
+        JerseyCustomization.objects.create(name="Nom et Numéro", customization_type='name', price=Decimal('100'))
+        user = User.objects.create_user(username='client', password='secret')
+        self.client.force_login(user)
+        CartModel.objects.create(user=user)
+        customization_catalog()  # Catalogue déjà chargé par le worker
+        counts = []
+        for size, badges in (('M', 1), ('L', 4)):
+            data = {'product_id': self.product.id, 'size': size, 'quantity': 1}
+            for index in range(badges):
+                data.update({f'customization_{index}_type': 'badge', f'customization_{index}_badge_type': 'ligue_1'})
+            data.update({f'customization_{badges}_type': 'name', f'customization_{badges}_name': 'DROGBA'})
+            with CaptureQueriesContext(connection) as queries:
+                self.client.post(reverse('cart:cart_add'), data)
+            counts.append(len(queries))
+            self.assertEqual(CartItemCustomization.objects.filter(cart_item__size=size).count(), badges + 1)
+        self.assertEqual(counts[0], counts[1])
+        self.assertFalse([query for query in queries if 'jerseycustomization' in query['sql']])
+
+    def test_authenticated_pages_do_not_rewrite_session(self):
+        user = User.objects.create_user(username='client', password='secret')
+        self.client.force_login(user)
+        self.add()
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('products:home'))
+            self.client.get(reverse('cart:cart_detail'))
+        self.assertFalse([query for query in queries if 'django_session' in query['sql']])
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class CartPricingTest(TestCase):
+    """Tests pour le chiffrage du panier en cache"""
+
+    def setUp(self):
+        category = Category.objects.create(name="Maillots", slug='maillots')
+        team = Team.objects.create(name="ASEC Mimosas", slug='asec', country="Côte d'Ivoire")
+        self.product = Product.objects.create(
+            name="Maillot domicile", category=category, team=team, description="-",
+            price=Decimal('15000'), sale_price=Decimal('12000'), available_sizes=['M', 'L'], stock_quantity=10,
+        )
+        self.other = Product.objects.create(
+            name="Maillot extérieur", category=category, team=team, description="-",
+            price=Decimal('14000'), available_sizes=['M'], stock_quantity=10,
+        )
+        JerseyCustomization.objects.create(
+            name="Badge Ligue_1", customization_type='badge', badge_type='ligue_1', price=Decimal('500'),
+        )
+        JerseyCustomization.objects.create(name="Nom et Numéro", customization_type='name', price=Decimal('100'))
+        self.user = User.objects.create_user(username='client', password='secret')
+        self.client.force_login(self.user)
+        self.client.post(reverse('cart:cart_add'), {
+            'product_id': self.product.id, 'size': 'M', 'quantity': 2,
+            'customization_0_type': 'badge', 'customization_0_badge_type': 'ligue_1',
+            'customization_1_type': 'name', 'customization_1_name': 'DROGBA', 'customization_1_number': '11',
+        })
+        self.client.post(reverse('cart:cart_add'), {'product_id': self.other.id, 'size': 'M', 'quantity': 1})
+        # 2 x 12000 + badge 500 + "DROGBA 11" (9 caractères x 100) + 14000
+        self.subtotal = Decimal('39400')
+
+    def cart(self):
+        return Cart(self.client.get(reverse('cart:cart_detail')).wsgi_request)
+
+    def test_totals_match_on_every_page(self):
+        response = self.client.get(reverse('cart:cart_detail'))
+        self.assertEqual(response.context['pricing'].subtotal, self.subtotal)
+        self.assertEqual(response.context['pricing'].total, self.subtotal + Decimal('1000'))
+        self.assertEqual(sum(item['total_price'] for item in response.context['cart_items']), self.subtotal)
+
+        response = self.client.get(reverse('orders:order_create'))
+        self.assertEqual(response.context['pricing'].total, self.subtotal + Decimal('1000'))
+
+        response = self.client.post(reverse('cart:cart_update_ajax'), {
+            'product_id': self.other.id, 'size': 'M', 'quantity': 2,
+        })
+        self.assertEqual(Decimal(str(response.json()['cart_total_price'])), self.subtotal + Decimal('14000'))
+
+    def test_order_uses_cart_pricing(self):
+        address = Address.objects.create(
+            user=self.user, first_name='Didier', last_name='Drogba', phone='+2250102030405',
+            email='client@example.com', address='Rue 12', city='Abidjan', postal_code='00225',
+            country="Côte d'Ivoire",
+        )
+        self.client.post(reverse('orders:order_create'), {'shipping_address': address.id})
+        order = Order.objects.get(user=self.user)
+        self.assertEqual((order.subtotal, order.total), (self.subtotal, self.subtotal + Decimal('1000')))
+        item = order.items.get(product=self.product)
+        self.assertEqual((item.price, item.total_price), (Decimal('12000'), Decimal('25400')))
+        self.assertEqual(
+            sorted(item.customizations.values_list('custom_text', 'price')),
+            [('', Decimal('500')), ('DROGBA 11', Decimal('900'))],
+        )
+
+    def test_pricing_is_cached_until_prices_change(self):
+        cart = self.cart()
+        cart.pricing()
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(cart.get_total_price(), self.subtotal)
+        self.assertEqual(len(queries), 0)
+
+        self.other.price = Decimal('16000')
+        self.other.save()
+        self.assertEqual(cart.get_total_price(), self.subtotal + Decimal('2000'))
+
+        JerseyCustomization.objects.filter(customization_type='badge').get().delete()
+        self.assertEqual(cart.get_total_price(), self.subtotal + Decimal('1500'))
+
+    def test_inactive_products_are_not_priced(self):
+        self.other.is_active = False
+        self.other.save()
+        cart = self.cart()
+        self.assertEqual(cart.get_total_price(), self.subtotal - Decimal('14000'))
+        self.assertEqual([item['product'] for item in cart], [self.product])
+
+
+class CartPurgeTest(TestCase):
+    """Tests pour la purge des paniers abandonnés et des sessions expirées"""
+
+    def setUp(self):
+        category = Category.objects.create(name="Maillots", slug='maillots')
+        team = Team.objects.create(name="ASEC Mimosas", slug='asec', country="Côte d'Ivoire")
+        self.product = Product.objects.create(
+            name="Maillot domicile", category=category, team=team, description="-",
+            price=Decimal('15000'), available_sizes=['M'], stock_quantity=10,
+        )
+        self.badge = JerseyCustomization.objects.create(
+            name="Badge Ligue_1", customization_type='badge', badge_type='ligue_1', price=Decimal('500'),
+        )
+        now = timezone.now()
+        self.stale = [
+            self.create_cart(now - timedelta(days=90), user='ancien'),
+            self.create_cart(now - timedelta(days=5)),
+            self.create_cart(now - timedelta(days=3)),
+        ]
+        self.kept = [
+            self.create_cart(now - timedelta(days=90), user='actif', item_age=timedelta(days=1)),
+            self.create_cart(now - timedelta(hours=1)),
+        ]
+        Session.objects.create(session_key='expiree', session_data='', expire_date=now - timedelta(days=1))
+        Session.objects.create(session_key='valide', session_data='', expire_date=now + timedelta(days=1))
+
+    def create_cart(self, updated_at, user=None, item_age=None):
+        cart = CartModel.objects.create(user=User.objects.create_user(username=user) if user else None)
+        item = CartItem.objects.create(cart=cart, product=self.product, size='M', quantity=1)
+        CartItemCustomization.objects.create(cart_item=item, customization=self.badge, price=0)
+        CartModel.objects.filter(pk=cart.pk).update(updated_at=updated_at)
+        CartItem.objects.filter(pk=item.pk).update(added_at=timezone.now() - item_age if item_age else updated_at)
+        return cart.pk
+
+    def test_purge_in_batches(self):
+        report = purge(batch_size=2, sleep=0)
+        self.assertEqual((report.carts, report.items, report.customizations, report.sessions), (3, 3, 3, 1))
+        self.assertGreater(report.batches, 2)
+        self.assertEqual(sorted(CartModel.objects.values_list('pk', flat=True)), sorted(self.kept))
+        self.assertEqual(CartItem.objects.count(), 2)
+        self.assertEqual(list(Session.objects.values_list('session_key', flat=True)), ['valide'])
+
+    def test_dry_run_and_command(self):
+        report = purge(dry_run=True)
+        self.assertEqual((report.carts, report.sessions), (3, 1))
+        self.assertEqual(CartModel.objects.count(), 5)
+
+        out = io.StringIO()
+        call_command('purge_carts', '--json', '--sleep', '0', '--skip-sessions', stdout=out)
+        self.assertEqual(json.loads(out.getvalue())['carts'], 3)
+        self.assertEqual(Session.objects.count(), 2)
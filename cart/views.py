@@ -2,57 +2,27 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.http import JsonResponse
 from django.views.decorators.http import require_POST
+from products.cards import product_cards
 from products.models import Product
-from .cart import Cart
+from products.recommendations import bought_together_for
+from .cart import CART_COOKIE_MAX_LINES, Cart, CartFull
 
 
 def cart_detail(request):
     """Afficher le détail du panier avec personnalisations"""
     cart = Cart(request)
+    pricing = cart.pricing()
+    cart_items = list(cart)
     
-    # Récupérer les cart_items avec leurs personnalisations
-    cart_items = []
-    for item in cart:
-        # Récupérer le cart_item de la base de données pour les personnalisations
-        from .models import CartItem
-        from django.contrib.auth.models import AnonymousUser
-        
-        if not isinstance(request.user, AnonymousUser):
-            cart_item = CartItem.objects.filter(
-                cart__user=request.user,
-                product=item['product'],
-                size=item['size']
-            ).first()
-        else:
-            cart_item = CartItem.objects.filter(
-                cart__session_key=request.session.session_key,
-                product=item['product'],
-                size=item['size']
-            ).first()
-        
-        if cart_item:
-            item['customizations'] = cart_item.customizations.all()
-        else:
-            item['customizations'] = []
-        
-        # Calculer le prix total avec personnalisations
-        base_price = item['price'] * item['quantity']
-        customization_price = sum(cust.price for cust in item['customizations'])
-        item['total_price_with_customizations'] = base_price + customization_price
-        
-        cart_items.append(item)
-    
-    # Calculer le total avec personnalisations
-    total_with_customizations = 0
-    for item in cart_items:
-        base_price = item['price'] * item['quantity']
-        customization_price = sum(cust.price for cust in item.get('customizations', []))
-        total_with_customizations += base_price + customization_price
+    # Souvent achetés avec les articles du panier
+    cart_product_ids = {item['product'].id for item in cart_items}
+    bought_together = product_cards(bought_together_for(cart_product_ids)) if cart_product_ids else []
     
     context = {
         'cart_items': cart_items,
         'cart': cart,
-        'total_with_customizations': total_with_customizations
+        'pricing': pricing,
+        'bought_together': bought_together,
     }
     
     return render(request, 'cart/cart_detail.html', context)
@@ -77,10 +47,7 @@ def cart_add(request):
             messages.error(request, f"Stock insuffisant pour la taille {size}.")
             return redirect('products:product_detail', slug=product.slug)
         
-        cart = Cart(request)
-        cart_item = cart.add(product=product, size=size, quantity=quantity)
-        
-        # Traiter les personnalisations
+        # Traiter les personnalisations (prix calculés côté serveur: JerseyCustomization.price_for)
         customizations = []
         index = 0
         while f'customization_{index}_type' in request.POST:
@@ -89,57 +56,48 @@ def cart_add(request):
             if custom_type == 'name':
                 custom_name = request.POST.get(f'customization_{index}_name', '')
                 custom_number = request.POST.get(f'customization_{index}_number', '')
-                custom_price = float(request.POST.get(f'customization_{index}_price', 0))
                 
                 if custom_name or custom_number:
                     customizations.append({
                         'type': 'name',
                         'name': custom_name,
                         'number': custom_number,
-                        'price': custom_price
                     })
             
             elif custom_type == 'badge':
                 badge_type = request.POST.get(f'customization_{index}_badge_type', '')
-                custom_price = float(request.POST.get(f'customization_{index}_price', 500))
                 
                 if badge_type:
                     customizations.append({
                         'type': 'badge',
                         'badge_type': badge_type,
-                        'price': custom_price
                     })
             
             index += 1
         
-        # Ajouter les personnalisations au cart_item
-        if customizations and cart_item:
-            from products.models import JerseyCustomization, CartItemCustomization
+        # Options de personnalisation correspondantes (catalogue en mémoire)
+        from products.customizations import customization_catalog
+        
+        catalog = customization_catalog()
+        options = []
+        for custom in customizations:
+            if custom['type'] == 'name':
+                custom_text = f"{custom['name']} {custom['number']}".strip()
+                options.append((catalog.name_option(), custom_text))
             
-            for custom in customizations:
-                if custom['type'] == 'name':
-                    # Créer ou récupérer l'option de personnalisation nom/numéro
-                    customization = JerseyCustomization.get_or_create_name_customization()
-                    
-                    # Créer la personnalisation pour cet article
-                    custom_text = f"{custom['name']} {custom['number']}".strip()
-                    CartItemCustomization.objects.create(
-                        cart_item=cart_item,
-                        customization=customization,
-                        custom_text=custom_text,
-                        price=custom['price']
-                    )
-                
-                elif custom['type'] == 'badge':
-                    # Créer ou récupérer l'option de personnalisation badge
-                    customization = JerseyCustomization.get_or_create_badge_customization(custom['badge_type'])
-                    
-                    # Créer la personnalisation pour cet article
-                    CartItemCustomization.objects.create(
-                        cart_item=cart_item,
-                        customization=customization,
-                        price=custom['price']
-                    )
+            elif custom['type'] == 'badge':
+                options.append((catalog.badge_option(custom['badge_type']), ''))
+        
+        cart = Cart(request)
+        try:
+            cart.add(product=product, size=size, quantity=quantity, customizations=options)
+        except CartFull:
+            messages.error(
+                request,
+                f"Votre panier est plein ({CART_COOKIE_MAX_LINES} articles différents au maximum). "
+                "Connectez-vous ou finalisez votre commande pour ajouter d'autres articles.",
+            )
+            return redirect('products:product_detail', slug=product.slug)
         
         # Message de succès
         if customizations:
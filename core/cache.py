@@ -0,0 +1,244 @@
+"""
+Caches nommés et calcul protégé contre l'effet « stampede »
+
+``build_caches`` construit ``settings.CACHES`` pour un backend choisi par
+``CACHE_BACKEND`` :
+
+- ``locmem`` : mémoire du processus (développement, tests) ;
+- ``file`` : un dossier par cache, partagé par les workers d'un même serveur ;
+- ``redis`` : serveur Redis (ou compatible) désigné par ``CACHE_URL``.
+
+Chaque usage a son cache, avec sa durée par défaut et son préfixe de clés :
+``catalog`` (données du catalogue), ``sessions`` (``SESSION_CACHE_ALIAS``),
+``template_fragments`` (utilisé par ``{% cache %}``) et ``ratelimit``.
+
+``get_or_compute`` évite qu'une entrée expirée de la page d'accueil, en plein
+pic de trafic, soit recalculée par cinquante requêtes en même temps :
+
+- expiration anticipée probabiliste (« XFetch ») : peu avant l'échéance, une
+  requête tirée au hasard recalcule la valeur pendant que les autres servent
+  encore l'ancienne ; la probabilité croît avec le coût du calcul ;
+- un seul calcul à la fois : si la valeur manque, les autres requêtes
+  attendent le résultat au lieu de recalculer.
+
+Le « un seul calcul » dépend du backend :
+
+- ``redis`` : verrou ``cache.add`` (SET NX, atomique), valable pour tous les
+  serveurs qui partagent le Redis ;
+- ``file`` : ``FileBasedCache.add`` n'est pas atomique (lecture puis
+  écriture) ; le verrou est un ``fcntl.flock`` sur un fichier du dossier du
+  cache, valable pour les workers d'un même serveur seulement ;
+- ``locmem`` : verrou et valeurs propres à chaque processus, comme les
+  générations (``bump_generation`` n'invalide que le processus courant).
+  Réservé au développement et aux tests.
+"""
+import hashlib
+import logging
+import math
+import random
+import time
+from pathlib import Path
+
+from django.core.cache import caches
+from django.core.cache.backends.filebased import FileBasedCache
+
+try:
+    import fcntl
+except ImportError:  # Windows: verrou cache.add, non atomique avec ``file``
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'redis': 'django.core.cache.backends.redis.RedisCache',
+}
+
+# Durée de vie par défaut de chaque cache (secondes)
+CACHE_TIMEOUTS = {
+    'default': 300,
+    'catalog': 300,
+    'sessions': 60 * 60 * 24 * 14,
+    'template_fragments': 600,
+    'ratelimit': 3600,
+}
+
+# Attente d'un calcul en cours dans un autre processus
+LOCK_TIMEOUT = 10
+POLL_INTERVAL = 0.05
+# Fichiers de verrou du backend ``file`` (les clés se les partagent par hachage)
+FILE_LOCK_STRIPES = 256
+# > 1 : recalcul anticipé plus tôt, < 1 : plus tard
+EARLY_EXPIRATION_BETA = 1.0
+
+_DEFAULT = object()
+
+
+def build_caches(backend='locmem', location=None, key_prefix='ecom', max_entries=5000):
+    """
+    Construit la configuration CACHES utilisée par les settings.
+    ``location`` : dossier racine (``file``) ou URL du serveur (``redis``).
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"CACHE_BACKEND inconnu: {backend!r} (choix: {', '.join(BACKENDS)})")
+
+    aliases = {}
+    for name, timeout in CACHE_TIMEOUTS.items():
+        config = {
+            'BACKEND': BACKENDS[backend],
+            'TIMEOUT': timeout,
+            'KEY_PREFIX': f'{key_prefix}:{name}',
+        }
+        if backend == 'locmem':
+            config['LOCATION'] = name
+        elif backend == 'file':
+            config['LOCATION'] = str(Path(location) / name)
+        else:
+            config['LOCATION'] = location
+        if backend != 'redis':
+            config['OPTIONS'] = {'MAX_ENTRIES': max_entries}
+        aliases[name] = config
+    return aliases
+
+
+def _expired_early(delta, expires_at, beta):
+    """Tirage XFetch: vrai si l'entrée doit être recalculée dès maintenant"""
+    if expires_at is None:
+        return False
+    # -log(U) suit une loi exponentielle: le plus souvent petit, parfois grand
+    return time.time() - delta * beta * math.log(1.0 - random.random()) >= expires_at
+
+
+def _compute_and_store(backend, key, compute, timeout, cache_name, early):
+    started = time.perf_counter()
+    value = compute()
+    delta = time.perf_counter() - started
+    expires_at = None if timeout is None else time.time() + timeout
+    backend.set(key, (value, delta, expires_at), timeout)
+    logger.info('cache_computed', extra={
+        'cache': cache_name,
+        'key': key,
+        'early': early,
+        'duration_ms': int(delta * 1000),
+    })
+    return value
+
+
+class AddLock:
+    """Verrou par ``cache.add`` (atomique sous Redis : SET NX)"""
+
+    def __init__(self, backend, key, timeout):
+        self.backend = backend
+        self.key = f'{key}:lock'
+        self.timeout = timeout
+
+    def acquire(self):
+        return self.backend.add(self.key, 1, self.timeout)
+
+    def release(self):
+        self.backend.delete(self.key)
+
+    def held_elsewhere(self):
+        return self.backend.has_key(self.key)
+
+
+class FileLock:
+    """Verrou ``fcntl.flock`` dans le dossier d'un ``FileBasedCache`` (workers d'un même serveur)"""
+
+    def __init__(self, backend, key):
+        stripe = int(hashlib.md5(key.encode()).hexdigest(), 16) % FILE_LOCK_STRIPES
+        self.path = Path(backend._dir) / f'lock-{stripe:03d}.lock'
+        self.handle = None
+
+    def _try_lock(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        handle = open(self.path, 'a')
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            handle.close()
+            return None
+        return handle
+
+    def acquire(self):
+        self.handle = self._try_lock()
+        return self.handle is not None
+
+    def release(self):
+        fcntl.flock(self.handle, fcntl.LOCK_UN)
+        self.handle.close()
+        self.handle = None
+
+    def held_elsewhere(self):
+        handle = self._try_lock()
+        if handle is None:
+            return True
+        fcntl.flock(handle, fcntl.LOCK_UN)
+        handle.close()
+        return False
+
+
+def compute_lock(backend, key, timeout):
+    """Verrou « un seul calcul » adapté au backend (voir la docstring du module)"""
+    if fcntl is not None and isinstance(backend, FileBasedCache):
+        return FileLock(backend, key)
+    return AddLock(backend, key, timeout)
+
+
+def get_or_compute(key, compute, timeout=_DEFAULT, cache='default', beta=EARLY_EXPIRATION_BETA,
+                   lock_timeout=LOCK_TIMEOUT):
+    """
+    Valeur en cache de ``key``, sinon résultat de ``compute()`` (mis en cache
+    ``timeout`` secondes, durée du cache par défaut). Un seul appelant calcule
+    à la fois (par processus avec ``locmem``) ; ``compute`` peut renvoyer None.
+    """
+    backend = caches[cache]
+    if timeout is _DEFAULT:
+        timeout = backend.default_timeout
+
+    entry = backend.get(key)
+    if entry is not None:
+        value, delta, expires_at = entry
+        if not _expired_early(delta, expires_at, beta):
+            return value
+
+    lock = compute_lock(backend, key, lock_timeout)
+    if lock.acquire():
+        try:
+            return _compute_and_store(backend, key, compute, timeout, cache, early=entry is not None)
+        finally:
+            lock.release()
+
+    if entry is not None:
+        # Recalcul anticipé déjà en cours ailleurs: l'ancienne valeur est encore valide
+        return entry[0]
+
+    deadline = time.monotonic() + lock_timeout
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        entry = backend.get(key)
+        if entry is not None:
+            return entry[0]
+        if not lock.held_elsewhere():
+            # Verrou libéré sans valeur: le calcul a échoué dans l'autre processus
+            break
+    return _compute_and_store(backend, key, compute, timeout, cache, early=False)
+
+
+def generation(name, cache='default'):
+    """
+    Génération courante d'un groupe de clés, à inclure dans les clés. Une
+    génération perdue (éviction) est remplacée par une nouvelle, jamais par
+    une ancienne.
+    """
+    return caches[cache].get_or_set(f'generation:{name}', time.time_ns, None)
+
+
+def bump_generation(name, cache='default'):
+    """
+    Invalide toutes les clés construites avec ``generation(name)`` (dans tous
+    les processus avec ``file`` et ``redis``, le seul processus courant avec
+    ``locmem``)
+    """
+    caches[cache].set(f'generation:{name}', time.time_ns(), None)
@@ -0,0 +1,57 @@
+"""
+Réglages SQLite pour les petits déploiements
+
+Activés par ``SQLITE_HIGH_CONCURRENCY=True`` (voir ``settings.SQLITE_PRAGMAS``),
+les PRAGMA sont appliqués à chaque nouvelle connexion (signal
+``connection_created``) :
+
+- ``journal_mode=WAL`` : les lectures ne bloquent plus les écritures ;
+- ``synchronous=NORMAL`` : pas de fsync à chaque commit (sûr en WAL) ;
+- ``busy_timeout`` : un writer attend le verrou au lieu d'échouer ;
+- ``mmap_size`` / ``cache_size`` : moins d'appels système en lecture.
+
+``write_atomic`` remplace ``transaction.atomic`` autour des écritures qui
+lisent avant d'écrire (commande, changement de statut). Sous SQLite, la
+transaction commence par ``BEGIN IMMEDIATE`` : le verrou d'écriture est pris
+dès le début, en attendant au besoin (busy_timeout). Avec le ``BEGIN`` différé
+par défaut, deux workers qui ont lu puis veulent écrire échouent aussitôt
+avec « database is locked », sans que busy_timeout puisse aider.
+Sur les autres bases, ``write_atomic`` est un simple ``transaction.atomic``.
+"""
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """Applique ``settings.SQLITE_PRAGMAS`` aux nouvelles connexions SQLite"""
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', None)
+    if connection.vendor != 'sqlite' or not pragmas:
+        return
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+
+
+def _begin_immediate(connection):
+    connection.cursor().execute("BEGIN IMMEDIATE")
+
+
+@contextmanager
+def write_atomic(using=None):
+    """``transaction.atomic`` qui prend le verrou d'écriture SQLite dès le début"""
+    connection = connections[using or DEFAULT_DB_ALIAS]
+    if connection.vendor != 'sqlite' or connection.in_atomic_block:
+        with transaction.atomic(using=using):
+            yield
+        return
+
+    # Le BEGIN du bloc atomic le plus externe est émis par cette méthode
+    connection._start_transaction_under_autocommit = lambda: _begin_immediate(connection)
+    try:
+        with transaction.atomic(using=using):
+            del connection._start_transaction_under_autocommit
+            yield
+    finally:
+        connection.__dict__.pop('_start_transaction_under_autocommit', None)
@@ -0,0 +1,175 @@
+"""
+Journalisation structurée et non bloquante
+
+Les vues et signaux émettent des événements courts (``logger.info('stock_updated',
+extra={...})``). Le ``QueueLogHandler`` se contente de déposer l'enregistrement
+dans une file en mémoire : l'écriture (stdout ou fichier) et le formatage JSON
+sont faits par un thread d'écoute en arrière-plan, jamais dans la requête.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import uuid
+import weakref
+from contextvars import ContextVar
+
+# Identifiant de la requête en cours, propagé dans chaque événement
+request_id_var = ContextVar('request_id', default='-')
+
+# Attributs standards d'un LogRecord, exclus des champs "extra" du JSON
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'request_id'}
+
+
+def new_request_id():
+    """Génère un identifiant de requête court"""
+    return uuid.uuid4().hex[:16]
+
+
+class RequestIdFilter(logging.Filter):
+    """Ajoute l'identifiant de la requête courante à chaque enregistrement"""
+
+    def filter(self, record):
+        if not hasattr(record, 'request_id'):
+            record.request_id = request_id_var.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Formate un enregistrement en une ligne JSON"""
+
+    def format(self, record):
+        payload = {
+            'ts': self.formatTime(record, '%Y-%m-%dT%H:%M:%S'),
+            'level': record.levelname,
+            'logger': record.name,
+            'event': record.getMessage(),
+            'request_id': getattr(record, 'request_id', '-'),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                payload[key] = value
+        if record.exc_info:
+            payload['exc'] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str, ensure_ascii=False)
+
+
+class QueueLogHandler(logging.handlers.QueueHandler):
+    """
+    Handler qui délègue l'écriture à un QueueListener en arrière-plan.
+
+    Le listener est redémarré dans chaque processus fils (gunicorn --preload),
+    car le thread du processus maître ne survit pas au fork. Un handler fermé
+    (rechargement de ``LOGGING``) n'est plus ni arrêté ni redémarré.
+    """
+
+    def __init__(self, filename=None, level=logging.NOTSET):
+        super().__init__(queue.SimpleQueue())
+        self.setLevel(level)
+        self.addFilter(RequestIdFilter())
+        self.target = self._build_target(filename)
+        self.listener = None
+        self._closed = False
+        self._start_listener()
+        _live_handlers.add(self)
+
+    @staticmethod
+    def _build_target(filename):
+        if filename:
+            handler = logging.handlers.WatchedFileHandler(filename, encoding='utf-8')
+        else:
+            handler = logging.StreamHandler()
+        handler.setFormatter(JsonFormatter())
+        return handler
+
+    def _start_listener(self):
+        self.listener = logging.handlers.QueueListener(self.queue, self.target)
+        self.listener.start()
+
+    def _after_fork(self):
+        if self._closed:
+            return
+        self.queue = queue.SimpleQueue()
+        self._start_listener()
+
+    def prepare(self, record):
+        # La file reste dans le processus : pas besoin de formater ni de copier
+        # l'enregistrement, on fige seulement le message et ses arguments.
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def stop(self):
+        self._closed = True
+        _live_handlers.discard(self)
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+        self.target.flush()
+
+    def close(self):
+        self.stop()
+        super().close()
+
+
+# Handlers ouverts : les crochets atexit / fork sont enregistrés une seule fois
+# pour tout le processus, pas à chaque (re)configuration du logging.
+_live_handlers = weakref.WeakSet()
+
+
+def _stop_handlers():
+    for handler in list(_live_handlers):
+        handler.stop()
+
+
+def _restart_handlers_after_fork():
+    for handler in list(_live_handlers):
+        handler._after_fork()
+
+
+atexit.register(_stop_handlers)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_restart_handlers_after_fork)
+
+
+def parse_levels(value):
+    """
+    Convertit "payments=DEBUG,products=WARNING" en dictionnaire
+    {'payments': 'DEBUG', 'products': 'WARNING'}
+    """
+    levels = {}
+    for item in value.split(','):
+        if '=' in item:
+            name, level = item.split('=', 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def build_logging_config(level='INFO', module_levels=None, filename=None):
+    """Construit la configuration LOGGING utilisée par les settings"""
+    apps = ['core', 'accounts', 'products', 'cart', 'orders', 'payments', 'dashboard']
+    module_levels = module_levels or {}
+
+    loggers = {}
+    for app in apps:
+        loggers[app] = {
+            'handlers': ['queue'],
+            'level': module_levels.get(app, level),
+            'propagate': False,
+        }
+    for name, module_level in module_levels.items():
+        loggers.setdefault(name, {'handlers': ['queue'], 'propagate': False})['level'] = module_level
+
+    return {
+        'version': 1,
+        'disable_existing_loggers': False,
+        'handlers': {
+            'queue': {
+                '()': 'core.log.QueueLogHandler',
+                'filename': str(filename) if filename else None,
+            },
+        },
+        'loggers': loggers,
+    }
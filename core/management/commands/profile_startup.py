@@ -0,0 +1,90 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Démarrage d'un worker: application WSGI (comme gunicorn --preload) puis
+# import de toutes les vues (comme core.warmup ou la première requête)
+CHILD_CODE = """
+import json, os, resource, time
+started = time.perf_counter()
+from ecom_maillot.wsgi import application
+from core.warmup import load_url_resolvers
+load_url_resolvers()
+print(json.dumps({
+    'boot_ms': (time.perf_counter() - started) * 1000,
+    'rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+}))
+"""
+
+
+def parse_importtime(stderr):
+    """Lignes de ``python -X importtime``: [(module, temps propre en µs, cumul en µs)]"""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules.append((name.strip(), int(self_us), int(cumulative_us)))
+    return modules
+
+
+class Command(BaseCommand):
+    help = "Profile le démarrage d'un worker: temps d'import par paquet/app, durée totale et mémoire (RSS)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=3, help="Nombre de démarrages mesurés (médiane)")
+        parser.add_argument('--top', type=int, default=15, help="Nombre de paquets et modules affichés")
+        parser.add_argument('--json', action='store_true', help="Résultat JSON (suivi des benchmarks)")
+
+    def run_child(self):
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'ecom_maillot.settings'),
+               'LOG_LEVEL': 'WARNING'}
+        process = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', CHILD_CODE],
+            capture_output=True, text=True, cwd=settings.BASE_DIR, env=env,
+        )
+        if process.returncode:
+            raise CommandError(process.stderr.strip().splitlines()[-1])
+        result = json.loads(process.stdout.strip().splitlines()[-1])
+        return result, parse_importtime(process.stderr)
+
+    def handle(self, *args, **options):
+        runs = [self.run_child() for _ in range(max(options['runs'], 1))]
+        boot_ms = statistics.median(result['boot_ms'] for result, _ in runs)
+        rss_mb = statistics.median(result['rss_kb'] for result, _ in runs) / 1024
+        # Détail des imports: dernier démarrage (caches de bytecode chauds)
+        modules = runs[-1][1]
+
+        packages = defaultdict(int)
+        for name, self_us, _ in modules:
+            packages[name.split('.')[0]] += self_us
+        top_packages = sorted(packages.items(), key=lambda item: -item[1])[:options['top']]
+        top_modules = sorted(modules, key=lambda module: -module[2])[:options['top']]
+
+        if options['json']:
+            self.stdout.write(json.dumps({
+                'boot_ms': round(boot_ms, 1),
+                'rss_mb': round(rss_mb, 1),
+                'imports_ms': round(sum(packages.values()) / 1000, 1),
+                'packages': {name: round(us / 1000, 1) for name, us in top_packages},
+            }))
+            return
+
+        local_apps = {app.split('.')[0] for app in settings.INSTALLED_APPS if (settings.BASE_DIR / app.split('.')[0]).is_dir()}
+        local_apps.add('ecom_maillot')
+
+        self.stdout.write(f"Démarrage: {boot_ms:.0f} ms, RSS max {rss_mb:.1f} Mo "
+                          f"(médiane sur {len(runs)}), imports {sum(packages.values()) / 1000:.0f} ms")
+        self.stdout.write("\nTemps d'import propre par paquet (ms):")
+        for name, self_us in top_packages:
+            marker = " (app)" if name in local_apps else ""
+            self.stdout.write(f"  {name:<30} {self_us / 1000:8.1f}{marker}")
+        self.stdout.write("\nModules les plus lents, imports inclus (ms):")
+        for name, _, cumulative_us in top_modules:
+            self.stdout.write(f"  {name:<50} {cumulative_us / 1000:8.1f}")
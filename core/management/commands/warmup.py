@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from core.warmup import warmup
+
+
+class Command(BaseCommand):
+    help = "Préchauffe le processus (URLs, templates, fichiers statiques, connexions, catalogue) et affiche la durée de chaque étape"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fork-safe-only', action='store_true',
+                            help="Seulement les étapes sans connexion (comme le maître gunicorn)")
+
+    def handle(self, *args, **options):
+        timings = warmup(fork_safe_only=options['fork_safe_only'])
+        for step, duration in timings.items():
+            self.stdout.write(f"{step:<16} {duration:8.1f} ms")
+        self.stdout.write(self.style.SUCCESS(f"Préchauffage terminé en {sum(timings.values()):.1f} ms"))
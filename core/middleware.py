@@ -0,0 +1,59 @@
+"""
+Middlewares transverses de l'application core
+"""
+from django.conf import settings
+
+from .log import new_request_id, request_id_var
+from .routers import RoutingState, routing_state
+
+
+class RequestIdMiddleware:
+    """
+    Associe un identifiant à chaque requête pour corréler les logs.
+
+    L'identifiant fourni par nginx (X-Request-ID) est réutilisé s'il existe.
+    """
+
+    header = 'HTTP_X_REQUEST_ID'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request_id = request.META.get(self.header, '')[:64] or new_request_id()
+        request.request_id = request_id
+        token = request_id_var.set(request_id)
+        try:
+            response = self.get_response(request)
+        finally:
+            request_id_var.reset(token)
+        response['X-Request-ID'] = request_id
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Pose l'état de routage de la requête (voir core.routers) et rend la
+    session collante à la base principale après une écriture.
+    """
+
+    cookie_name = 'primary_db'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.REPLICA_DATABASE:
+            return self.get_response(request)
+
+        state = RoutingState(pinned=self.cookie_name in request.COOKIES)
+        token = routing_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            routing_state.reset(token)
+        if state.wrote:
+            response.set_cookie(
+                self.cookie_name, '1', max_age=settings.REPLICA_STICKY_SECONDS, httponly=True, samesite='Lax',
+            )
+        return response
@@ -0,0 +1,87 @@
+"""
+Routage des lectures vers un réplica PostgreSQL
+
+Seules les vues marquées ``@replica_reads`` (catalogue, statistiques du
+tableau de bord) lisent sur ``settings.REPLICA_DATABASE`` ; tout le reste, et
+toutes les écritures, restent sur ``default``.
+
+Après une écriture, le navigateur reçoit un cookie ``primary_db`` valable
+``REPLICA_STICKY_SECONDS`` : pendant ce délai ses lectures restent sur la base
+principale, pour qu'il voie ses propres modifications malgré le retard de
+réplication. L'état de la requête en cours est porté par ``routing_state``,
+posé par ``core.middleware.ReplicaRoutingMiddleware``.
+"""
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+# Toujours lus sur la base principale (données modifiées à chaque requête)
+PRIMARY_ONLY_APPS = {'sessions', 'cart'}
+# Écritures qui ne rendent pas la session « collante » (lues sur la base principale)
+UNTRACKED_WRITE_APPS = {'sessions'}
+
+
+class RoutingState:
+    """Routage de la requête en cours"""
+
+    __slots__ = ('replica', 'pinned', 'wrote')
+
+    def __init__(self, pinned=False):
+        self.replica = False
+        self.pinned = pinned
+        self.wrote = False
+
+
+routing_state = ContextVar('routing_state', default=None)
+
+
+def replica_reads(view):
+    """Autorise la vue à lire sur le réplica (sauf session collante)"""
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        state = routing_state.get()
+        if state is None:
+            return view(request, *args, **kwargs)
+        previous, state.replica = state.replica, True
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            state.replica = previous
+    return wrapped
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        alias = settings.REPLICA_DATABASE
+        state = routing_state.get()
+        if not alias or state is None or not state.replica or state.pinned or state.wrote:
+            return None
+        if model._meta.app_label in PRIMARY_ONLY_APPS:
+            return None
+        return alias
+
+    def db_for_write(self, model, **hints):
+        if not settings.REPLICA_DATABASE:
+            return None
+        state = routing_state.get()
+        if state is not None and model._meta.app_label not in UNTRACKED_WRITE_APPS:
+            state.wrote = True
+        # Explicite: sinon Django écrirait sur la base d'origine de l'instance (réplica)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if not settings.REPLICA_DATABASE:
+            return None
+        aliases = {DEFAULT_DB_ALIAS, settings.REPLICA_DATABASE}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Le réplica reçoit le schéma par la réplication PostgreSQL : aucune
+        # migration n'y est jouée (sauf base de test distincte, REPLICA_MIGRATE)
+        if settings.REPLICA_DATABASE and db == settings.REPLICA_DATABASE and not settings.REPLICA_MIGRATE:
+            return db == DEFAULT_DB_ALIAS
+        return None
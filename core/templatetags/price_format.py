@@ -1,48 +1,87 @@
+"""
+Formatage des prix en FCFA selon les standards ivoiriens
+
+Les montants sont convertis une seule fois en centimes entiers (tronqués,
+jamais arrondis) et le texte est construit par arithmétique entière. Les
+résultats récents sont gardés en cache (LRU) : une page liste ou le tableau de
+bord affichent souvent les mêmes prix des dizaines de fois.
+
+Le résultat est identique à l'ancienne implémentation à base de ``Decimal`` et
+de ``str()`` ; seules les chaînes invalides renvoient désormais la valeur par
+défaut au lieu de lever une exception.
+"""
+from decimal import Decimal, InvalidOperation
+from functools import lru_cache
+
 from django import template
-from django.template.defaultfilters import floatformat
-from decimal import Decimal
 
 register = template.Library()
 
+CACHE_SIZE = 4096
+
+
+def to_cents(value):
+    """
+    Montant en centimes (partie décimale tronquée à 2 chiffres) et indicateur
+    « nombre entier ». Lève ValueError/TypeError si la valeur n'est pas un prix.
+    """
+    if type(value) is int:
+        return value * 100, True
+    if isinstance(value, float):
+        # Passer par str() comme l'ancien filtre: 15000.99 -> "15000.99"
+        value = Decimal(str(value))
+    elif isinstance(value, str):
+        try:
+            value = Decimal(value)
+        except InvalidOperation:
+            raise ValueError(value)
+    elif not isinstance(value, Decimal):
+        value = Decimal(value)
+    cents = int(value * 100)
+    return cents, cents % 100 == 0 and value == int(value)
+
+
+def _format_price(value, currency, compact):
+    suffix = " FCFA" if currency else ""
+    if value is None:
+        return f"0,00{suffix}"
+    try:
+        cents, is_whole = to_cents(value)
+    except (ValueError, TypeError, AttributeError):
+        return f"0,00{suffix}"
+
+    whole, fraction = divmod(-cents if cents < 0 else cents, 100)
+    if cents < 0 and whole:
+        # Le signe d'une partie entière nulle est perdu, comme avec l'ancien filtre
+        whole = -whole
+    text = f"{whole:,}".replace(",", " ")
+    if compact and is_whole:
+        return f"{text}{suffix}"
+    return f"{text},{fraction:02d}{suffix}"
+
+
+# Des montants égaux (15000, Decimal('15000.00'), 15000.0) ont le même texte:
+# la clé du cache est la valeur elle-même.
+_cached_format_price = lru_cache(maxsize=CACHE_SIZE)(_format_price)
+
+
+def format_price(value, currency=True, compact=False):
+    """Formate un montant; ``compact`` omet les décimales des montants entiers"""
+    try:
+        return _cached_format_price(value, currency, compact)
+    except TypeError:
+        # Valeur non hachable
+        return _format_price(value, currency, compact)
+
+
 @register.filter
 def price_format(value):
     """
     Formate un prix selon les standards ivoiriens
     Exemple: 15000.50 -> 15 000,50 FCFA
     """
-    if value is None:
-        return "0,00 FCFA"
-    
-    try:
-        # Convertir en Decimal pour une manipulation précise
-        if isinstance(value, str):
-            value = Decimal(value)
-        elif isinstance(value, (int, float)):
-            value = Decimal(str(value))
-        
-        # Séparer la partie entière et décimale
-        integer_part = int(value)
-        decimal_part = value - integer_part
-        
-        # Formater la partie entière avec des espaces pour les milliers
-        formatted_integer = "{:,}".format(integer_part).replace(",", " ")
-        
-        # Formater la partie décimale
-        if decimal_part == 0:
-            formatted_decimal = "00"
-        else:
-            # Garder 2 décimales maximum
-            formatted_decimal = str(decimal_part).split('.')[1][:2]
-            if len(formatted_decimal) == 1:
-                formatted_decimal += "0"
-        
-        # Assembler le prix
-        formatted_price = f"{formatted_integer},{formatted_decimal} FCFA"
-        
-        return formatted_price
-        
-    except (ValueError, TypeError, AttributeError):
-        return "0,00 FCFA"
+    return format_price(value)
+
 
 @register.filter
 def price_format_no_currency(value):
@@ -50,63 +89,22 @@ def price_format_no_currency(value):
     Formate un prix sans la devise
     Exemple: 15000.50 -> 15 000,50
     """
-    if value is None:
-        return "0,00"
-    
-    try:
-        # Convertir en Decimal pour une manipulation précise
-        if isinstance(value, str):
-            value = Decimal(value)
-        elif isinstance(value, (int, float)):
-            value = Decimal(str(value))
-        
-        # Séparer la partie entière et décimale
-        integer_part = int(value)
-        decimal_part = value - integer_part
-        
-        # Formater la partie entière avec des espaces pour les milliers
-        formatted_integer = "{:,}".format(integer_part).replace(",", " ")
-        
-        # Formater la partie décimale
-        if decimal_part == 0:
-            formatted_decimal = "00"
-        else:
-            # Garder 2 décimales maximum
-            formatted_decimal = str(decimal_part).split('.')[1][:2]
-            if len(formatted_decimal) == 1:
-                formatted_decimal += "0"
-        
-        # Assembler le prix
-        formatted_price = f"{formatted_integer},{formatted_decimal}"
-        
-        return formatted_price
-        
-    except (ValueError, TypeError, AttributeError):
-        return "0,00"
+    return format_price(value, currency=False)
+
 
 @register.filter
 def price_format_compact(value):
     """
     Formate un prix de manière compacte
-    Exemple: 15000.50 -> 15 000,50 FCFA
+    Exemple: 15000 -> 15 000 FCFA, 15000.50 -> 15 000,50 FCFA
     """
-    if value is None:
-        return "0,00 FCFA"
-    
-    try:
-        # Convertir en Decimal pour une manipulation précise
-        if isinstance(value, str):
-            value = Decimal(value)
-        elif isinstance(value, (int, float)):
-            value = Decimal(str(value))
-        
-        # Si le prix est un nombre entier
-        if value == int(value):
-            formatted_integer = "{:,}".format(int(value)).replace(",", " ")
-            return f"{formatted_integer} FCFA"
-        else:
-            # Utiliser le formatage normal
-            return price_format(value)
-        
-    except (ValueError, TypeError, AttributeError):
-        return "0,00 FCFA"
+    return format_price(value, compact=True)
+
+
+@register.simple_tag
+def price_format_many(*values):
+    """
+    Formate plusieurs prix en un seul appel
+    Exemple: {% price_format_many subtotal total as prices %} puis {{ prices.0 }}
+    """
+    return [format_price(value) for value in values]
@@ -0,0 +1,404 @@
+import io
+import json
+import logging
+import random
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from decimal import Decimal
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.cache import caches
+from django.core.cache.backends.filebased import FileBasedCache
+from django.db import connection
+from django.http import HttpResponse
+from django.template import Context, Template
+from django.urls import reverse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from .cache import FileLock, build_caches, bump_generation, compute_lock, generation, get_or_compute
+from .db import configure_sqlite, write_atomic
+from .log import JsonFormatter, QueueLogHandler, parse_levels, request_id_var
+from .middleware import ReplicaRoutingMiddleware, RequestIdMiddleware
+from .routers import ReplicaRouter, RoutingState, routing_state
+from .templatetags.price_format import price_format, price_format_compact, price_format_no_currency
+from .warmup import WARMUP_STEPS, compile_templates, template_names, warmup
+
+
+class StructuredLoggingTest(SimpleTestCase):
+    """Tests pour la journalisation structurée"""
+
+    def test_json_formatter_includes_extra_fields(self):
+        record = logging.LogRecord('payments', logging.INFO, __file__, 1, 'paydunya_request', (), None)
+        record.order_id = 42
+        record.request_id = 'abc'
+        payload = json.loads(JsonFormatter().format(record))
+        self.assertEqual(payload['event'], 'paydunya_request')
+        self.assertEqual(payload['order_id'], 42)
+        self.assertEqual(payload['request_id'], 'abc')
+        self.assertEqual(payload['level'], 'INFO')
+
+    def test_queue_handler_writes_in_background(self):
+        handler = QueueLogHandler()
+        stream = io.StringIO()
+        handler.target.setStream(stream)
+        logger = logging.getLogger('core.tests.queue')
+        logger.addHandler(handler)
+        logger.propagate = False
+        token = request_id_var.set('req-1')
+        try:
+            logger.warning('stock_updated', extra={'product_id': 7})
+        finally:
+            request_id_var.reset(token)
+            logger.removeHandler(handler)
+            handler.close()
+        payload = json.loads(stream.getvalue().splitlines()[0])
+        self.assertEqual(payload['event'], 'stock_updated')
+        self.assertEqual(payload['product_id'], 7)
+        self.assertEqual(payload['request_id'], 'req-1')
+
+    def test_closed_handlers_are_forgotten(self):
+        from . import log
+
+        handlers = [QueueLogHandler() for _ in range(3)]
+        self.assertTrue(set(handlers) <= set(log._live_handlers))
+        for handler in handlers:
+            handler.close()
+        self.assertFalse(set(handlers) & set(log._live_handlers))
+
+    def test_parse_levels(self):
+        self.assertEqual(
+            parse_levels('payments=debug, products=WARNING'),
+            {'payments': 'DEBUG', 'products': 'WARNING'},
+        )
+        self.assertEqual(parse_levels(''), {})
+
+    def test_request_id_middleware(self):
+        seen = {}
+
+        def view(request):
+            seen['request_id'] = request_id_var.get()
+            return HttpResponse('ok')
+
+        middleware = RequestIdMiddleware(view)
+        response = middleware(RequestFactory().get('/', HTTP_X_REQUEST_ID='from-nginx'))
+        self.assertEqual(response['X-Request-ID'], 'from-nginx')
+        self.assertEqual(seen['request_id'], 'from-nginx')
+        self.assertEqual(request_id_var.get(), '-')
+
+        response = middleware(RequestFactory().get('/'))
+        self.assertEqual(len(response['X-Request-ID']), 16)
+
+
+def legacy_price_format(value, currency=" FCFA"):
+    """Ancienne implémentation (référence pour les tests d'équivalence)"""
+    if value is None:
+        return f"0,00{currency}"
+    try:
+        if isinstance(value, str):
+            value = Decimal(value)
+        elif isinstance(value, (int, float)):
+            value = Decimal(str(value))
+        integer_part = int(value)
+        decimal_part = value - integer_part
+        formatted_integer = "{:,}".format(integer_part).replace(",", " ")
+        if decimal_part == 0:
+            formatted_decimal = "00"
+        else:
+            formatted_decimal = str(decimal_part).split('.')[1][:2]
+            if len(formatted_decimal) == 1:
+                formatted_decimal += "0"
+        return f"{formatted_integer},{formatted_decimal}{currency}"
+    except (ValueError, TypeError, AttributeError):
+        return f"0,00{currency}"
+
+
+def legacy_price_format_compact(value):
+    if value is None:
+        return "0,00 FCFA"
+    try:
+        if isinstance(value, str):
+            value = Decimal(value)
+        elif isinstance(value, (int, float)):
+            value = Decimal(str(value))
+        if value == int(value):
+            return "{:,}".format(int(value)).replace(",", " ") + " FCFA"
+        return legacy_price_format(value)
+    except (ValueError, TypeError, AttributeError):
+        return "0,00 FCFA"
+
+
+def price_corpus(size=3000, seed=20240601):
+    """Montants aléatoires: entiers, Decimal jusqu'à 6 décimales, floats, chaînes, négatifs"""
+    rng = random.Random(seed)
+    values = [None, 0, 1, -1, 999, 1000, 15000, Decimal('0'), Decimal('-0.5'), Decimal('15000.50'), 0.1 + 0.2, 1e16]
+    for _ in range(size):
+        whole = rng.choice([0, rng.randint(0, 999), rng.randint(0, 10 ** 6), rng.randint(0, 10 ** 12)])
+        places = rng.randint(0, 6)
+        digits = rng.randint(0, 10 ** places - 1) if places else 0
+        text = f"{whole}.{digits:0{places}d}" if places else str(whole)
+        if rng.random() < 0.2:
+            text = '-' + text
+        kind = rng.randrange(4)
+        if kind == 0:
+            values.append(Decimal(text))
+        elif kind == 1:
+            values.append(text)
+        elif kind == 2:
+            values.append(float(text))
+        else:
+            values.append(int(Decimal(text)))
+    return values
+
+
+class PriceFormatTest(SimpleTestCase):
+    """Tests pour le formatage des prix"""
+
+    def test_examples(self):
+        self.assertEqual(price_format(Decimal('15000.5')), "15 000,50 FCFA")
+        self.assertEqual(price_format_no_currency(1000000), "1 000 000,00")
+        self.assertEqual(price_format_compact(15000), "15 000 FCFA")
+        self.assertEqual(price_format_compact('15000.99'), "15 000,99 FCFA")
+        self.assertEqual(price_format('invalide'), "0,00 FCFA")
+
+    def test_identical_to_legacy_filters(self):
+        for value in price_corpus():
+            with self.subTest(value=value):
+                self.assertEqual(price_format(value), legacy_price_format(value))
+                self.assertEqual(price_format_no_currency(value), legacy_price_format(value, currency=""))
+                self.assertEqual(price_format_compact(value), legacy_price_format_compact(value))
+
+    def test_batch_tag(self):
+        template = Template("{% load price_format %}{% price_format_many a b|add:1000 as prices %}{{ prices.0 }}|{{ prices.1 }}")
+        self.assertEqual(template.render(Context({'a': Decimal('2500.5'), 'b': 500})), "2 500,50 FCFA|1 500,00 FCFA")
+
+
+class WarmupTest(TestCase):
+    """Tests pour le préchauffage des workers"""
+
+    def test_all_project_templates_compile(self):
+        from django.template import engines
+
+        compiled, failed = compile_templates()
+        self.assertEqual(failed, [])
+        self.assertEqual(compiled, len(list(template_names(engines['django'].engine))))
+        self.assertIn('base.html', template_names(engines['django'].engine))
+
+    def test_warmup_runs_every_step(self):
+        with self.assertNoLogs('core.warmup', level='ERROR'):
+            timings = warmup()
+        self.assertEqual(list(timings), [name for name, _, _ in WARMUP_STEPS])
+        self.assertEqual(
+            list(warmup(fork_safe_only=True)),
+            [name for name, _, fork_safe in WARMUP_STEPS if fork_safe],
+        )
+
+
+class SQLiteProfileTest(TransactionTestCase):
+    """Tests pour le profil SQLite (PRAGMA et BEGIN IMMEDIATE)"""
+
+    @override_settings(SQLITE_PRAGMAS={'cache_size': -4000, 'busy_timeout': 2500})
+    def test_pragmas_applied_on_connection(self):
+        configure_sqlite(sender=None, connection=connection)
+        with connection.cursor() as cursor:
+            self.assertEqual(cursor.execute('PRAGMA cache_size').fetchone()[0], -4000)
+            self.assertEqual(cursor.execute('PRAGMA busy_timeout').fetchone()[0], 2500)
+
+    def test_write_atomic_begins_immediate(self):
+        with CaptureQueriesContext(connection) as captured:
+            with write_atomic():
+                with write_atomic():
+                    User.objects.create(username='client')
+        statements = [query['sql'] for query in captured]
+        self.assertEqual(statements[0], 'BEGIN IMMEDIATE')
+        self.assertEqual(statements.count('BEGIN IMMEDIATE'), 1)
+        self.assertNotIn('_start_transaction_under_autocommit', connection.__dict__)
+
+    def test_write_atomic_rolls_back(self):
+        with self.assertRaises(ValueError):
+            with write_atomic():
+                User.objects.create(username='client')
+                raise ValueError
+        self.assertFalse(User.objects.exists())
+
+
+@override_settings(REPLICA_DATABASE='replica')
+class ReplicaRouterTest(TestCase):
+    """Tests pour le routage des lectures vers le réplica"""
+
+    def read_alias(self, state, model):
+        token = routing_state.set(state)
+        try:
+            return ReplicaRouter().db_for_read(model)
+        finally:
+            routing_state.reset(token)
+
+    def test_only_replica_views_read_from_replica(self):
+        from products.models import Product
+
+        state = RoutingState()
+        self.assertIsNone(self.read_alias(state, Product))
+        state.replica = True
+        self.assertEqual(self.read_alias(state, Product), 'replica')
+        self.assertIsNone(self.read_alias(state, Session))
+        self.assertIsNone(self.read_alias(RoutingState(pinned=True), Product))
+
+    def test_write_sticks_to_primary(self):
+        from products.models import Product
+
+        state = RoutingState()
+        state.replica = True
+        token = routing_state.set(state)
+        try:
+            self.assertEqual(ReplicaRouter().db_for_write(Session), 'default')
+            self.assertFalse(state.wrote)
+            self.assertEqual(ReplicaRouter().db_for_write(Product), 'default')
+        finally:
+            routing_state.reset(token)
+        self.assertTrue(state.wrote)
+        self.assertIsNone(self.read_alias(state, Product))
+
+    def test_no_migrations_on_replica(self):
+        router = ReplicaRouter()
+        self.assertFalse(router.allow_migrate('replica', 'products'))
+        self.assertIsNone(router.allow_migrate('default', 'products'))
+        with self.settings(REPLICA_MIGRATE=True):
+            self.assertIsNone(router.allow_migrate('replica', 'products'))
+
+    def test_middleware_sets_sticky_cookie_after_write(self):
+        def writing_view(request):
+            User.objects.create(username='client')
+            return HttpResponse()
+
+        request = RequestFactory().post('/')
+        response = ReplicaRoutingMiddleware(writing_view)(request)
+        self.assertEqual(response.cookies['primary_db']['max-age'], settings.REPLICA_STICKY_SECONDS)
+        response = ReplicaRoutingMiddleware(lambda request: HttpResponse())(RequestFactory().get('/'))
+        self.assertNotIn('primary_db', response.cookies)
+
+
+@unittest.skipUnless('replica' in settings.DATABASES, "DJANGO_SETTINGS_MODULE=ecom_maillot.settings_replica_test")
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class ReplicaIntegrationTest(TestCase):
+    """Routage avec deux bases locales distinctes (settings_replica_test)"""
+
+    databases = '__all__'
+
+    def setUp(self):
+        from products.models import Category, Product, Team
+
+        for alias, name in (('default', "Maillot principal"), ('replica', "Maillot réplica")):
+            category = Category.objects.using(alias).create(name="Maillots", slug='maillots')
+            team = Team.objects.using(alias).create(name="ASEC Mimosas", slug='asec', country="Côte d'Ivoire")
+            self.product = Product.objects.using(alias).create(
+                pk=1, name=name, slug='maillot', category=category, team=team, description="-",
+                price=Decimal('15000'), available_sizes=['M'], stock_quantity=5,
+            )
+
+        self.user = User.objects.create_user(pk=1, username='client', password='secret')
+        User.objects.using('replica').create(pk=1, username='client', password=self.user.password)
+
+    def listed_names(self):
+        response = self.client.get(reverse('products:product_list'))
+        return [card.name for card in response.context['products']]
+
+    def test_catalog_reads_replica_until_write(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.listed_names(), ["Maillot réplica"])
+
+        response = self.client.post(reverse('cart:cart_add'), {'product_id': 1, 'size': 'M', 'quantity': 1})
+        self.assertIn('primary_db', response.cookies)
+        self.assertEqual(self.listed_names(), ["Maillot principal"])
+
+
+class CacheTest(SimpleTestCase):
+    """Tests pour les caches nommés et get_or_compute"""
+
+    def setUp(self):
+        self.cache = caches['default']
+        self.cache.clear()
+        self.calls = 0
+
+    def compute(self, value='valeur', duration=0):
+        def compute():
+            self.calls += 1
+            time.sleep(duration)
+            return value
+        return compute
+
+    def test_build_caches(self):
+        for backend in ('locmem', 'file', 'redis'):
+            config = build_caches(backend, '/tmp/cache' if backend == 'file' else 'redis://127.0.0.1:6379/1')
+            self.assertEqual(set(config), {'default', 'catalog', 'sessions', 'template_fragments', 'ratelimit'})
+            self.assertEqual(config['catalog']['KEY_PREFIX'], 'ecom:catalog')
+        self.assertEqual(build_caches('file', '/tmp/cache')['sessions']['LOCATION'], '/tmp/cache/sessions')
+        with self.assertRaises(ValueError):
+            build_caches('memcached')
+
+    def test_computes_once_then_serves_cache(self):
+        self.assertEqual(get_or_compute('home', self.compute()), 'valeur')
+        self.assertEqual(get_or_compute('home', self.compute()), 'valeur')
+        self.assertIsNone(get_or_compute('vide', self.compute(None)))
+        self.assertIsNone(get_or_compute('vide', self.compute(None)))
+        self.assertEqual(self.calls, 2)
+
+    def concurrent_misses(self, cache='default', count=20):
+        results = []
+
+        def request():
+            results.append(get_or_compute('home', self.compute(duration=0.2), cache=cache))
+
+        threads = [threading.Thread(target=request) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_concurrent_misses_compute_once(self):
+        self.assertEqual(self.concurrent_misses(), ['valeur'] * 20)
+        self.assertEqual(self.calls, 1)
+
+    def test_file_backend_locks_with_flock(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        with override_settings(CACHES=build_caches('file', directory)):
+            self.assertIsInstance(compute_lock(caches['catalog'], 'home', 10), FileLock)
+            # FileBasedCache.add (lecture puis écriture) n'est pas un verrou
+            with mock.patch.object(FileBasedCache, 'add', side_effect=AssertionError):
+                self.assertEqual(self.concurrent_misses('catalog', count=10), ['valeur'] * 10)
+        self.assertEqual(self.calls, 1)
+
+    @mock.patch('core.cache.random.random', return_value=0.5)
+    def test_early_expiration_refreshes_before_deadline(self, _):
+        # Calcul coûteux (delta = 60 s) qui expire dans 1 s: recalcul anticipé
+        self.cache.set('home', ('ancienne', 60, time.time() + 1), 300)
+        self.assertEqual(get_or_compute('home', self.compute('nouvelle')), 'nouvelle')
+
+        # Recalcul déjà en cours ailleurs: l'ancienne valeur est servie sans attendre
+        self.cache.set('home', ('ancienne', 60, time.time() + 1), 300)
+        self.cache.add('home:lock', 1, 10)
+        self.assertEqual(get_or_compute('home', self.compute('nouvelle')), 'ancienne')
+
+        # Loin de l'échéance: pas de recalcul
+        self.cache.set('home', ('fraiche', 0.001, time.time() + 300), 300)
+        self.assertEqual(get_or_compute('home', self.compute('nouvelle')), 'fraiche')
+        self.assertEqual(self.calls, 1)
+
+    def test_waiter_computes_when_lock_released_without_value(self):
+        self.cache.add('home:lock', 1, 10)
+        threading.Timer(0.1, self.cache.delete, ['home:lock']).start()
+        self.assertEqual(get_or_compute('home', self.compute()), 'valeur')
+        self.assertEqual(self.calls, 1)
+
+    def test_generation_bump(self):
+        first = generation('catalog')
+        self.assertEqual(generation('catalog'), first)
+        bump_generation('catalog')
+        self.assertNotEqual(generation('catalog'), first)
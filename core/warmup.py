@@ -0,0 +1,134 @@
+"""
+Préchauffage des processus gunicorn
+
+Avec ``gunicorn --preload``, l'application est chargée une seule fois dans le
+processus maître et les workers sont recréés toutes les ``--max-requests``
+requêtes. Sans préchauffage, la première requête de chaque worker paie la
+compilation des templates, l'import des vues (résolution des URLs), le
+chargement du manifeste des fichiers statiques et l'ouverture de la
+connexion à la base.
+
+Deux moments dans ``gunicorn.conf.py`` :
+
+- ``when_ready`` (maître, avant le fork) : étapes sans connexion ni socket
+  (``fork_safe``), partagées ensuite par copy-on-write avec tous les workers ;
+- ``post_fork`` (chaque worker) : toutes les étapes ; celles déjà faites dans
+  le maître sont instantanées, les connexions sont ouvertes dans le worker.
+
+``python manage.py warmup`` exécute les mêmes étapes et affiche leur durée.
+"""
+import logging
+import time
+from pathlib import Path
+
+from django.db import connections
+from django.template import engines
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_PATTERNS = ('*.html', '*.txt')
+
+
+def template_names(engine):
+    """Noms de tous les templates des dossiers ``DIRS`` (``templates/``)"""
+    for directory in engine.dirs:
+        root = Path(directory)
+        for pattern in TEMPLATE_PATTERNS:
+            for path in sorted(root.rglob(pattern)):
+                yield path.relative_to(root).as_posix()
+
+
+def compile_templates(backend='django'):
+    """
+    Compile (et met en cache) tous les templates du projet.
+    Retourne (nombre de templates compilés, noms en erreur).
+    """
+    started = time.perf_counter()
+    engine = engines[backend]
+    compiled, failed = 0, []
+    for name in template_names(engine.engine):
+        try:
+            engine.get_template(name)
+        except Exception:
+            logger.exception('template_compile_failed', extra={'template': name})
+            failed.append(name)
+        else:
+            compiled += 1
+
+    logger.info('templates_compiled', extra={
+        'templates': compiled,
+        'failed': len(failed),
+        'duration_ms': int((time.perf_counter() - started) * 1000),
+    })
+    return compiled, failed
+
+
+def load_url_resolvers():
+    """Importe toutes les vues et remplit les tables de reverse() de chaque namespace"""
+    from django.urls import get_resolver
+
+    pending = [get_resolver()]
+    while pending:
+        resolver = pending.pop()
+        resolver.reverse_dict
+        pending.extend(sub for _, sub in resolver.namespace_dict.values())
+
+
+def load_static_manifest():
+    """Charge le manifeste de whitenoise/ManifestStaticFilesStorage"""
+    from django.contrib.staticfiles.storage import staticfiles_storage
+
+    staticfiles_storage.base_url
+
+
+def connect_databases():
+    for connection in connections.all():
+        connection.ensure_connection()
+
+
+def prime_catalog():
+    """Caches en mémoire de Django (site, types de contenu) et page d'accueil (cache ``catalog``)"""
+    from django.apps import apps
+    from django.contrib.contenttypes.models import ContentType
+    from django.contrib.sites.models import Site
+
+    from products.cache import home_sections
+
+    Site.objects.get_current()
+    ContentType.objects.get_for_models(*apps.get_models())
+    home_sections()
+
+
+# (nom, fonction, exécutable dans le maître avant le fork)
+WARMUP_STEPS = [
+    ('url_resolvers', load_url_resolvers, True),
+    ('templates', compile_templates, True),
+    ('static_manifest', load_static_manifest, True),
+    ('databases', connect_databases, False),
+    ('catalog', prime_catalog, False),
+]
+
+
+def warmup(fork_safe_only=False):
+    """
+    Exécute les étapes de préchauffage; une étape en erreur n'empêche pas les
+    suivantes. Retourne {étape: durée en ms}.
+    """
+    started = time.perf_counter()
+    timings = {}
+    for name, step, fork_safe in WARMUP_STEPS:
+        if fork_safe_only and not fork_safe:
+            continue
+        step_started = time.perf_counter()
+        try:
+            step()
+        except Exception:
+            logger.exception('warmup_step_failed', extra={'step': name})
+        timings[name] = round((time.perf_counter() - step_started) * 1000, 1)
+
+    logger.info('warmup_done', extra={
+        'steps': timings,
+        'fork_safe_only': fork_safe_only,
+        'duration_ms': int((time.perf_counter() - started) * 1000),
+    })
+    return timings
@@ -0,0 +1,273 @@
+"""
+Exports CSV / XLSX en flux continu (commandes, paiements, clients, catalogue)
+
+Les lignes sont produites par des générateurs qui parcourent la base
+``settings.EXPORTS_DATABASE`` avec ``.iterator(chunk_size=...)`` (curseur côté
+serveur sous PostgreSQL) et sont envoyées au client au fur et à mesure via
+``StreamingHttpResponse``. La mémoire utilisée reste constante quel que soit
+le nombre de lignes exportées.
+
+Le format XLSX est écrit directement (SpreadsheetML dans une archive zip
+en flux), sans dépendance supplémentaire.
+"""
+import csv
+import re
+import zipfile
+from datetime import date, datetime
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.db.models import Count, Prefetch
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from orders.models import OrderItem, OrderItemCustomization
+from products.catalog import CATALOG_FIELDS, FORMULA_PREFIXES, catalog_rows
+
+CHUNK_SIZE = 1000
+
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+
+# --- Sources de données -------------------------------------------------------
+
+ORDER_HEADER = [
+    'Commande', 'Date', 'Client', 'Email', 'Téléphone', 'Ville', 'Statut', 'Paiement',
+    'Méthode', 'Sous-total', 'Livraison', 'Total', 'Produit', 'Taille', 'Quantité',
+    'Prix unitaire', 'Total article', 'Personnalisations',
+]
+
+
+def order_rows(orders):
+    """Une ligne par article de commande (une ligne vide d'article si la commande n'en a pas)"""
+    orders = orders.select_related('user', 'shipping_address').prefetch_related(
+        Prefetch('items', queryset=OrderItem.objects.order_by('pk').prefetch_related(
+            Prefetch('customizations', queryset=OrderItemCustomization.objects.select_related('customization')),
+        )),
+    )
+    for order in orders.iterator(chunk_size=CHUNK_SIZE):
+        address = order.shipping_address
+        base = [
+            order.order_number,
+            order.created_at,
+            order.user.get_full_name() or order.user.username,
+            order.user.email,
+            address.phone if address else '',
+            address.city if address else '',
+            order.get_status_display(),
+            order.get_payment_status_display(),
+            order.payment_method,
+            order.subtotal,
+            order.shipping_cost,
+            order.total,
+        ]
+        items = order.items.all()
+        if not items:
+            yield base + [''] * 6
+        for item in items:
+            customizations = ' | '.join(
+                f"{custom.custom_text or custom.customization.name} ({custom.price})"
+                for custom in item.customizations.all()
+            )
+            yield base + [item.product_name, item.size, item.quantity, item.price, item.total_price, customizations]
+
+
+PAYMENT_HEADER = [
+    'Paiement', 'Commande', 'Date', 'Client', 'Email', 'Téléphone', 'Méthode', 'Statut',
+    'Montant', 'Devise', 'Transaction Wave', 'Référence PayDunya', 'Terminé le',
+]
+
+
+def payment_rows(payments):
+    payments = payments.select_related('order')
+    for payment in payments.iterator(chunk_size=CHUNK_SIZE):
+        yield [
+            payment.payment_id,
+            payment.order.order_number,
+            payment.created_at,
+            payment.customer_name,
+            payment.customer_email,
+            payment.customer_phone,
+            payment.get_payment_method_display(),
+            payment.get_status_display(),
+            payment.amount,
+            payment.currency,
+            payment.wave_transaction_id,
+            payment.paydunya_reference,
+            payment.completed_at,
+        ]
+
+
+USER_HEADER = ['Identifiant', 'Prénom', 'Nom', 'Email', 'Inscrit le', 'Dernière connexion', 'Actif', 'Staff', 'Commandes']
+
+
+def user_rows(users):
+    users = users.annotate(order_count=Count('orders')).values_list(
+        'username', 'first_name', 'last_name', 'email', 'date_joined', 'last_login',
+        'is_active', 'is_staff', 'order_count',
+    )
+    for row in users.iterator(chunk_size=CHUNK_SIZE):
+        yield list(row)
+
+
+DATASETS = {
+    'orders': (ORDER_HEADER, order_rows),
+    'payments': (PAYMENT_HEADER, payment_rows),
+    'users': (USER_HEADER, user_rows),
+    # Même format que l'import du catalogue (manage.py import_catalog)
+    'catalog': (CATALOG_FIELDS, catalog_rows),
+}
+
+
+# --- Écriture CSV -------------------------------------------------------------
+
+class Echo:
+    """Pseudo-fichier: ``write`` retourne la ligne au lieu de la stocker"""
+
+    def write(self, value):
+        return value
+
+
+def _cell_text(value):
+    if isinstance(value, str):
+        # Un texte commençant par =, +, -, @, tabulation ou retour chariot est une
+        # formule pour Excel et LibreOffice (injection CSV) : apostrophe en tête
+        return "'" + value if value.startswith(FORMULA_PREFIXES) else value
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        if timezone.is_aware(value):
+            value = timezone.localtime(value)
+        return value.strftime('%Y-%m-%d %H:%M')
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, bool):
+        return 'oui' if value else 'non'
+    return value
+
+
+def stream_csv(header, rows):
+    writer = csv.writer(Echo(), delimiter=';')
+    # BOM pour qu'Excel détecte l'UTF-8
+    yield '﻿' + writer.writerow(header)
+    for row in rows:
+        yield writer.writerow([_cell_text(value) for value in row])
+
+
+# --- Écriture XLSX ------------------------------------------------------------
+
+_XML_ILLEGAL = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+_CONTENT_TYPES_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '</Types>'
+)
+_ROOT_RELS_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+_WORKBOOK_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="Export" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+_WORKBOOK_RELS_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '</Relationships>'
+)
+_SHEET_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+_SHEET_END = '</sheetData></worksheet>'
+
+
+class _ZipStream:
+    """Fichier non positionnable qui accumule les octets écrits par zipfile"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _xlsx_cell(value):
+    value = _cell_text(value)
+    if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+        return f'<c><v>{value}</v></c>'
+    text = _XML_ILLEGAL.sub('', str(value))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{escape(text)}</t></is></c>'
+
+
+def _xlsx_row(row):
+    return '<row>' + ''.join(_xlsx_cell(value) for value in row) + '</row>'
+
+
+def stream_xlsx(header, rows, flush_every=200):
+    stream = _ZipStream()
+    with zipfile.ZipFile(stream, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('[Content_Types].xml', _CONTENT_TYPES_XML)
+        archive.writestr('_rels/.rels', _ROOT_RELS_XML)
+        archive.writestr('xl/workbook.xml', _WORKBOOK_XML)
+        archive.writestr('xl/_rels/workbook.xml.rels', _WORKBOOK_RELS_XML)
+        yield stream.pop()
+
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(_SHEET_START.encode())
+            sheet.write(_xlsx_row(header).encode())
+            for count, row in enumerate(rows, start=1):
+                sheet.write(_xlsx_row(row).encode())
+                if count % flush_every == 0:
+                    data = stream.pop()
+                    if data:
+                        yield data
+            sheet.write(_SHEET_END.encode())
+    yield stream.pop()
+
+
+WRITERS = {
+    'csv': stream_csv,
+    'xlsx': stream_xlsx,
+}
+
+
+def export_response(dataset, queryset, export_format='csv'):
+    """Construit la réponse en flux pour un jeu de données et un format"""
+    header, rows = DATASETS[dataset]
+    writer = WRITERS[export_format]
+    queryset = queryset.using(settings.EXPORTS_DATABASE)
+    response = StreamingHttpResponse(writer(header, rows(queryset)), content_type=CONTENT_TYPES[export_format])
+    filename = f"{dataset}_{timezone.localdate():%Y%m%d}.{export_format}"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
@@ -0,0 +1,172 @@
+import csv
+import io
+import zipfile
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from orders.models import Order, OrderItem
+from payments.models import Payment
+from products.models import Category, Product, Team
+
+
+class DashboardOrdersBulkTest(TestCase):
+    """Tests pour les actions groupées sur les commandes"""
+
+    def setUp(self):
+        self.admin = User.objects.create_user(username='admin', password='testpass123', is_staff=True)
+        self.customer = User.objects.create_user(username='client', password='testpass123')
+        self.orders = [
+            Order.objects.create(
+                user=self.customer, subtotal=Decimal('10000'), shipping_cost=Decimal('1000'), total=Decimal('11000'),
+            )
+            for _ in range(3)
+        ]
+        self.client.login(username='admin', password='testpass123')
+
+    def statuses(self):
+        return list(Order.objects.order_by('pk').values_list('status', flat=True))
+
+    def test_selected_orders_are_transitioned(self):
+        response = self.client.post(reverse('dashboard:orders_bulk'), {
+            'action': 'processing',
+            'order_ids': [self.orders[0].pk, self.orders[1].pk],
+        })
+        self.assertRedirects(response, reverse('dashboard:orders'), fetch_redirect_response=False)
+        self.assertEqual(self.statuses(), ['processing', 'processing', 'pending'])
+
+    def test_invalid_transitions_are_skipped(self):
+        self.client.post(reverse('dashboard:orders_bulk'), {
+            'action': 'delivered',
+            'order_ids': [order.pk for order in self.orders],
+        })
+        self.assertEqual(self.statuses(), ['pending'] * 3)
+
+    def test_filtered_scope_applies_to_all_matching_orders(self):
+        self.client.post(reverse('dashboard:orders_bulk'), {
+            'action': 'cancelled',
+            'scope': 'filtered',
+            'status': 'pending',
+        })
+        self.assertEqual(self.statuses(), ['cancelled'] * 3)
+
+    def test_requires_staff(self):
+        self.client.login(username='client', password='testpass123')
+        self.client.post(reverse('dashboard:orders_bulk'), {
+            'action': 'cancelled',
+            'order_ids': [self.orders[0].pk],
+        })
+        self.assertEqual(self.statuses(), ['pending'] * 3)
+
+    @override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+    def test_orders_page_renders_bulk_form(self):
+        response = self.client.get(reverse('dashboard:orders'))
+        self.assertContains(response, 'bulk-orders-form')
+
+
+class DashboardExportTest(TestCase):
+    """Tests pour les exports CSV / XLSX en flux"""
+
+    def setUp(self):
+        self.admin = User.objects.create_user(username='admin', password='testpass123', is_staff=True)
+        self.customer = User.objects.create_user(username='client', email='client@example.com', password='testpass123')
+        product = Product.objects.create(
+            name="Maillot ASEC", category=Category.objects.create(name="Maillots"),
+            team=Team.objects.create(name="ASEC Mimosas", country="Côte d'Ivoire"),
+            description="-", price=Decimal('15000'), available_sizes=['M'], stock_quantity=10,
+        )
+        for status in ('pending', 'cancelled'):
+            order = Order.objects.create(
+                user=self.customer, status=status,
+                subtotal=Decimal('30000'), shipping_cost=Decimal('1000'), total=Decimal('31000'),
+            )
+            for size in ('M', 'L'):
+                OrderItem.objects.create(order=order, product=product, size=size, quantity=1, price=Decimal('15000'))
+        Payment.objects.create(
+            order=order, payment_id='PAY-1', amount=Decimal('31000'),
+            customer_name='Client Test', customer_email='client@example.com', customer_phone='0700000000',
+        )
+        self.client.login(username='admin', password='testpass123')
+
+    def export(self, dataset, **params):
+        response = self.client.get(reverse('dashboard:export', args=[dataset]), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content)
+
+    def read_csv(self, content):
+        return list(csv.reader(io.StringIO(content.decode('utf-8-sig')), delimiter=';'))
+
+    def test_orders_csv_has_one_row_per_item_and_applies_filters(self):
+        rows = self.read_csv(self.export('orders', format='csv'))
+        self.assertEqual(rows[0][0], 'Commande')
+        self.assertEqual(len(rows), 5)
+
+        rows = self.read_csv(self.export('orders', format='csv', status='cancelled'))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual({row[6] for row in rows[1:]}, {'Annulé'})
+
+    @override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+    def test_malformed_dates_are_ignored(self):
+        rows = self.read_csv(self.export('orders', format='csv', date_from='2025-13-45', date_to='hier'))
+        self.assertEqual(len(rows), 5)
+        response = self.client.get(reverse('dashboard:orders'), {'date_from': '2025-02-30'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_orders_query_count_does_not_depend_on_rows(self):
+        # session lue dans le cache, utilisateur/adresse jointes, articles et
+        # personnalisations préchargés
+        with self.assertNumQueries(4):
+            self.export('orders', format='csv')
+
+    def test_xlsx_is_a_valid_workbook(self):
+        archive = zipfile.ZipFile(io.BytesIO(self.export('payments', format='xlsx')))
+        self.assertIn('xl/workbook.xml', archive.namelist())
+        sheet = archive.read('xl/worksheets/sheet1.xml').decode()
+        self.assertIn('PAY-1', sheet)
+        self.assertEqual(sheet.count('<row>'), 2)
+
+    def test_formulas_are_neutralised(self):
+        self.customer.first_name = '=HYPERLINK("http://example.com")'
+        self.customer.last_name = '-2+3'
+        self.customer.save()
+        rows = self.read_csv(self.export('users', search='client'))
+        self.assertEqual(rows[1][1:3], ['\'=HYPERLINK("http://example.com")', "'-2+3"])
+        sheet = zipfile.ZipFile(io.BytesIO(self.export('users', format='xlsx'))).read('xl/worksheets/sheet1.xml').decode()
+        self.assertIn("'-2+3", sheet)
+
+    def test_users_export_and_unknown_dataset(self):
+        rows = self.read_csv(self.export('users', search='client'))
+        self.assertEqual(rows[1][0], 'client')
+        self.assertEqual(rows[1][-1], '2')
+        response = self.client.get(reverse('dashboard:export', args=['products']))
+        self.assertEqual(response.status_code, 404)
+
+
+class DashboardCatalogImportTest(TestCase):
+    """Tests pour l'import du catalogue depuis le dashboard"""
+
+    def setUp(self):
+        User.objects.create_user(username='admin', password='testpass123', is_staff=True)
+        self.client.login(username='admin', password='testpass123')
+        Category.objects.create(name="Maillots")
+        Team.objects.create(name="ASEC Mimosas", country="Côte d'Ivoire")
+        self.content = b"name;category;team;price\nMaillot ASEC;maillots;asec-mimosas;15000\n"
+
+    def upload(self):
+        return self.client.post(reverse('dashboard:catalog_import'), {
+            'catalog_file': SimpleUploadedFile('catalogue.csv', self.content),
+        })
+
+    def test_small_file_is_imported(self):
+        self.upload()
+        self.assertEqual(Product.objects.count(), 1)
+
+    def test_large_file_is_refused(self):
+        with self.settings(CATALOG_IMPORT_MAX_UPLOAD_SIZE=len(self.content) - 1):
+            response = self.upload()
+        self.assertRedirects(response, reverse('dashboard:products'), fetch_redirect_response=False)
+        self.assertEqual(Product.objects.count(), 0)
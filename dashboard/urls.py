@@ -10,6 +10,7 @@ urlpatterns = [
     # Gestion des produits
     path('products/', views.dashboard_products, name='products'),
     path('products/<int:product_id>/edit/', views.dashboard_product_edit, name='product_edit'),
+    path('products/import/', views.dashboard_catalog_import, name='catalog_import'),
     
     # Gestion des catégories
     path('categories/', views.dashboard_categories, name='categories'),
@@ -23,6 +24,7 @@ urlpatterns = [
     
     # Gestion des commandes
     path('orders/', views.dashboard_orders, name='orders'),
+    path('orders/bulk/', views.dashboard_orders_bulk, name='orders_bulk'),
     
     # Gestion des paiements
     path('payments/', views.dashboard_payments, name='payments'),
@@ -33,6 +35,9 @@ urlpatterns = [
     # Analyses et rapports
     path('analytics/', views.dashboard_analytics, name='analytics'),
     
+    # Exports CSV / XLSX
+    path('export/<str:dataset>/', views.dashboard_export, name='export'),
+    
     # Paramètres
     path('settings/', views.dashboard_settings, name='settings'),
 ]
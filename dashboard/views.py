@@ -1,17 +1,26 @@
+from django.conf import settings
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.db.models import Count, Sum, Avg, Q, F
 from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.utils.http import url_has_allowed_host_and_scheme
 from datetime import datetime, timedelta
-from django.http import JsonResponse
+from django.http import Http404, JsonResponse
+from django.views.decorators.http import require_POST
 from django.contrib import messages
 from django.core.paginator import Paginator
 from django.db import transaction
 from products.models import Product, Category, Team, JerseyCustomization
+from products.catalog import detect_format, import_catalog
 from orders.models import Order, OrderItem
+from orders.transitions import transition_orders
 from payments.models import Payment
 from django.contrib.auth.models import User
 from cart.models import Cart, CartItem
+from core.routers import replica_reads
+from .exports import DATASETS as EXPORT_DATASETS, WRITERS as EXPORT_FORMATS, export_response
+import io
 import json
 
 def is_admin(user):
@@ -19,6 +28,7 @@ def is_admin(user):
 
 @login_required
 @user_passes_test(is_admin)
+@replica_reads
 def dashboard_home(request):
     """Dashboard principal avec toutes les statistiques"""
     
@@ -105,6 +115,33 @@ def dashboard_home(request):
     
     return render(request, 'dashboard/home.html', context)
 
+def parse_filter_date(value):
+    """Date AAAA-MM-JJ d'un filtre, None si absente ou invalide (filtre ignoré)"""
+    try:
+        return parse_date(value or '')
+    except ValueError:
+        return None
+
+
+def filter_by_status_and_dates(queryset, status_filter='', date_from='', date_to=''):
+    """
+    Applique les filtres statut et période à un queryset ayant les champs
+    ``status`` et ``created_at`` (commandes, paiements). Une date invalide
+    est ignorée.
+    """
+    if status_filter:
+        queryset = queryset.filter(status=status_filter)
+    
+    date_from = parse_filter_date(date_from)
+    if date_from:
+        queryset = queryset.filter(created_at__date__gte=date_from)
+    
+    date_to = parse_filter_date(date_to)
+    if date_to:
+        queryset = queryset.filter(created_at__date__lte=date_to)
+    
+    return queryset
+
 @login_required
 @user_passes_test(is_admin)
 def dashboard_orders(request):
@@ -116,16 +153,10 @@ def dashboard_orders(request):
     date_to = request.GET.get('date_to', '')
     
     # Base des commandes pour les filtres
-    orders = Order.objects.select_related('user', 'shipping_address').order_by('-created_at')
-    
-    if status_filter:
-        orders = orders.filter(status=status_filter)
-    
-    if date_from:
-        orders = orders.filter(created_at__date__gte=date_from)
-    
-    if date_to:
-        orders = orders.filter(created_at__date__lte=date_to)
+    orders = filter_by_status_and_dates(
+        Order.objects.select_related('user', 'shipping_address').order_by('-created_at'),
+        status_filter, date_from, date_to,
+    )
     
     # Statistiques GLOBALES (toutes les commandes, pas seulement les filtrées)
     all_orders = Order.objects.all()
@@ -162,17 +193,58 @@ def dashboard_orders(request):
     
     return render(request, 'dashboard/orders.html', context)
 
+# Actions groupées disponibles sur la page commandes
+BULK_ORDER_ACTIONS = {
+    'processing': 'en cours de traitement',
+    'shipped': 'expédiée(s)',
+    'delivered': 'livrée(s)',
+    'cancelled': 'annulée(s)',
+}
+BULK_ORDER_BATCH_SIZE = 500
+
 @login_required
 @user_passes_test(is_admin)
-def dashboard_products(request):
-    """Gestion des produits"""
-    products = Product.objects.select_related('category', 'team').order_by('-created_at')
-    
-    # Filtres
-    category_filter = request.GET.get('category', '')
-    team_filter = request.GET.get('team', '')
-    search_query = request.GET.get('search', '')
-    
+@require_POST
+def dashboard_orders_bulk(request):
+    """Changer le statut d'un lot de commandes (une transition groupée par lot)"""
+    action = request.POST.get('action', '')
+    if action not in BULK_ORDER_ACTIONS:
+        messages.error(request, 'Action inconnue.')
+        return redirect('dashboard:orders')
+    
+    if request.POST.get('scope') == 'filtered':
+        # Toutes les commandes correspondant aux filtres, pas seulement la page affichée
+        order_ids = list(filter_by_status_and_dates(
+            Order.objects.order_by(),
+            request.POST.get('status', ''),
+            request.POST.get('date_from', ''),
+            request.POST.get('date_to', ''),
+        ).values_list('id', flat=True))
+    else:
+        order_ids = [int(pk) for pk in request.POST.getlist('order_ids') if pk.isdigit()]
+    
+    if not order_ids:
+        messages.warning(request, 'Aucune commande sélectionnée.')
+        return redirect('dashboard:orders')
+    
+    updated = skipped = 0
+    for start in range(0, len(order_ids), BULK_ORDER_BATCH_SIZE):
+        result = transition_orders(order_ids[start:start + BULK_ORDER_BATCH_SIZE], action)
+        updated += len(result.updated)
+        skipped += len(result.skipped)
+    
+    if updated:
+        messages.success(request, f'{updated} commande(s) {BULK_ORDER_ACTIONS[action]}.')
+    if skipped:
+        messages.warning(request, f'{skipped} commande(s) ignorée(s): changement de statut non autorisé.')
+    
+    next_url = request.POST.get('next', '')
+    if url_has_allowed_host_and_scheme(next_url, allowed_hosts={request.get_host()}):
+        return redirect(next_url)
+    return redirect('dashboard:orders')
+
+def filter_products(products, category_filter='', team_filter='', search_query=''):
+    """Applique les filtres de la page produits (catégorie, équipe, recherche)"""
     if category_filter:
         products = products.filter(category__slug=category_filter)
     if team_filter:
@@ -182,6 +254,19 @@ def dashboard_products(request):
             Q(name__icontains=search_query) | 
             Q(description__icontains=search_query)
         )
+    return products
+
+@login_required
+@user_passes_test(is_admin)
+def dashboard_products(request):
+    """Gestion des produits"""
+    # Filtres
+    category_filter = request.GET.get('category', '')
+    team_filter = request.GET.get('team', '')
+    search_query = request.GET.get('search', '')
+    
+    products = Product.objects.select_related('category', 'team').order_by('-created_at')
+    products = filter_products(products, category_filter, team_filter, search_query)
     
     # Pagination
     paginator = Paginator(products, 20)
@@ -202,6 +287,50 @@ def dashboard_products(request):
     
     return render(request, 'dashboard/products.html', context)
 
+@login_required
+@user_passes_test(is_admin)
+@require_POST
+def dashboard_catalog_import(request):
+    """Import du catalogue depuis un fichier CSV / JSONL envoyé par l'administrateur"""
+    upload = request.FILES.get('catalog_file')
+    if not upload:
+        messages.error(request, "Veuillez choisir un fichier CSV ou JSONL.")
+        return redirect('dashboard:products')
+    
+    # L'import tourne dans la requête : les gros fichiers passent par la commande
+    max_size = settings.CATALOG_IMPORT_MAX_UPLOAD_SIZE
+    if upload.size > max_size:
+        messages.error(
+            request,
+            f"Fichier trop volumineux (max {max_size // 1024} Ko). "
+            "Utilisez la commande « manage.py import_catalog » pour les gros catalogues."
+        )
+        return redirect('dashboard:products')
+    
+    dry_run = request.POST.get('dry_run') == 'on'
+    stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+    try:
+        report = import_catalog(
+            stream, detect_format(upload.name),
+            create_missing=request.POST.get('create_missing') == 'on',
+            dry_run=dry_run,
+        )
+    except UnicodeDecodeError:
+        messages.error(request, "Le fichier doit être encodé en UTF-8.")
+        return redirect('dashboard:products')
+    
+    prefix = "Simulation : " if dry_run else ""
+    messages.success(
+        request,
+        f"{prefix}{report.created} produit(s) créé(s), {report.updated} mis à jour."
+    )
+    if report.errors:
+        details = " ; ".join(f"ligne {line} : {message}" for line, message in report.errors[:10])
+        more = f" (+{len(report.errors) - 10} autres)" if len(report.errors) > 10 else ""
+        messages.warning(request, f"{len(report.errors)} ligne(s) ignorée(s) — {details}{more}")
+    
+    return redirect('dashboard:products')
+
 @login_required
 @user_passes_test(is_admin)
 def dashboard_product_edit(request, product_id):
@@ -273,14 +402,8 @@ def dashboard_teams(request):
     context = {'teams': teams}
     return render(request, 'dashboard/teams.html', context)
 
-@login_required
-@user_passes_test(is_admin)
-def dashboard_users(request):
-    """Gestion des utilisateurs"""
-    users = User.objects.all().order_by('-date_joined')
-    
-    # Filtres
-    search_query = request.GET.get('search', '')
+def filter_users(users, search_query=''):
+    """Recherche par identifiant, email, prénom ou nom"""
     if search_query:
         users = users.filter(
             Q(username__icontains=search_query) | 
@@ -288,6 +411,14 @@ def dashboard_users(request):
             Q(first_name__icontains=search_query) |
             Q(last_name__icontains=search_query)
         )
+    return users
+
+@login_required
+@user_passes_test(is_admin)
+def dashboard_users(request):
+    """Gestion des utilisateurs"""
+    search_query = request.GET.get('search', '')
+    users = filter_users(User.objects.all().order_by('-date_joined'), search_query)
     
     # Pagination
     paginator = Paginator(users, 20)
@@ -356,6 +487,7 @@ def dashboard_customizations(request):
 
 @login_required
 @user_passes_test(is_admin)
+@replica_reads
 def dashboard_analytics(request):
     """Analyses et rapports"""
     
@@ -416,15 +548,7 @@ def dashboard_payments(request):
     date_to = request.GET.get('date_to', '')
     
     payments = Payment.objects.select_related('order', 'order__user').order_by('-created_at')
-    
-    if status_filter:
-        payments = payments.filter(status=status_filter)
-    
-    if date_from:
-        payments = payments.filter(created_at__date__gte=date_from)
-    
-    if date_to:
-        payments = payments.filter(created_at__date__lte=date_to)
+    payments = filter_by_status_and_dates(payments, status_filter, date_from, date_to)
     
     # Statistiques des paiements
     total_payments = payments.count()
@@ -450,6 +574,32 @@ def dashboard_payments(request):
     
     return render(request, 'dashboard/payments.html', context)
 
+@login_required
+@user_passes_test(is_admin)
+def dashboard_export(request, dataset):
+    """Export CSV / XLSX en flux des commandes, paiements, clients ou du catalogue (filtres de la page)"""
+    export_format = request.GET.get('format', 'csv')
+    if dataset not in EXPORT_DATASETS or export_format not in EXPORT_FORMATS:
+        raise Http404("Export inconnu")
+    
+    status_filter = request.GET.get('status', '')
+    date_from = request.GET.get('date_from', '')
+    date_to = request.GET.get('date_to', '')
+    
+    if dataset == 'orders':
+        queryset = filter_by_status_and_dates(Order.objects.order_by('-created_at'), status_filter, date_from, date_to)
+    elif dataset == 'payments':
+        queryset = filter_by_status_and_dates(Payment.objects.order_by('-created_at'), status_filter, date_from, date_to)
+    elif dataset == 'users':
+        queryset = filter_users(User.objects.order_by('-date_joined'), request.GET.get('search', ''))
+    else:
+        queryset = filter_products(
+            Product.objects.order_by('pk'),
+            request.GET.get('category', ''), request.GET.get('team', ''), request.GET.get('search', ''),
+        )
+    
+    return export_response(dataset, queryset, export_format)
+
 @login_required
 @user_passes_test(is_admin)
 def dashboard_settings(request):
@@ -13,6 +13,8 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 import os
 from pathlib import Path
 from decouple import config
+from core.cache import build_caches
+from core.log import build_logging_config, parse_levels
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -62,6 +64,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.RequestIdMiddleware',
+    'core.middleware.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -69,6 +73,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'cart.middleware.CartCookieMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'allauth.account.middleware.AccountMiddleware',
@@ -106,6 +111,36 @@ DATABASES = {
     }
 }
 
+# Profil SQLite pour plusieurs workers gunicorn (voir core/db.py)
+SQLITE_HIGH_CONCURRENCY = config('SQLITE_HIGH_CONCURRENCY', default=False, cast=bool)
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 10000,          # ms
+    'mmap_size': 64 * 1024 * 1024,  # octets
+    'cache_size': -16000,           # Kio (valeur négative)
+} if SQLITE_HIGH_CONCURRENCY else {}
+
+# Base utilisée par les exports en flux (curseurs côté serveur sous PostgreSQL)
+EXPORTS_DATABASE = 'default'
+
+# Réplica en lecture pour le catalogue et les statistiques (voir core/routers.py)
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+REPLICA_DATABASE = None
+# Durée pendant laquelle un navigateur qui vient d'écrire lit sur la base principale
+REPLICA_STICKY_SECONDS = 15
+# Migrations jouées aussi sur le réplica (seulement pour une base de test indépendante)
+REPLICA_MIGRATE = False
+
+
+# Caches nommés: default, catalog, sessions, template_fragments, ratelimit (voir core/cache.py)
+# CACHE_BACKEND: locmem (par processus), file (dossier CACHE_URL) ou redis (URL CACHE_URL)
+# locmem: invalidations et calcul unique limités au processus (développement
+# seulement) ; file: un seul serveur ; redis: plusieurs serveurs
+CACHE_BACKEND = config('CACHE_BACKEND', default='locmem')
+CACHE_URL = config('CACHE_URL', default=str(BASE_DIR / 'cache'))
+CACHES = build_caches(CACHE_BACKEND, CACHE_URL)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -211,6 +246,26 @@ SITE_URL = config('SITE_URL', default='http://localhost:8000')
 
 # Cart session
 CART_SESSION_ID = 'cart'
+# Panier des visiteurs anonymes: cookie signé (voir cart/cart.py)
+CART_COOKIE_NAME = 'cart'
+CART_COOKIE_AGE = 60 * 60 * 24 * 30
+
+# Sessions lues dans le cache 'sessions', écrites en base seulement si elles changent
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+SESSION_CACHE_ALIAS = 'sessions'
+
+# Numérotation des commandes: nombre de numéros réservés par processus à la fois
+ORDER_NUMBER_BLOCK_SIZE = config('ORDER_NUMBER_BLOCK_SIZE', default=20, cast=int)
+
+# Import du catalogue depuis le dashboard: taille maximale du fichier envoyé
+# (au-delà, utiliser la commande import_catalog hors requête web)
+CATALOG_IMPORT_MAX_UPLOAD_SIZE = config('CATALOG_IMPORT_MAX_UPLOAD_SIZE', default=2 * 1024 * 1024, cast=int)
+
+# Logging structuré (JSON) via une file non bloquante
+# LOG_LEVELS permet d'ajuster un module: "payments=DEBUG,products=WARNING"
+LOG_LEVEL = config('LOG_LEVEL', default='INFO')
+LOG_LEVELS = config('LOG_LEVELS', default='', cast=parse_levels)
+LOGGING = build_logging_config(level=LOG_LEVEL, module_levels=LOG_LEVELS)
 
 # Messages
 from django.contrib.messages import constants as messages
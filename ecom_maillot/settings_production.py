@@ -18,6 +18,9 @@ SECURE_HSTS_SECONDS = 31536000
 SECURE_HSTS_INCLUDE_SUBDOMAINS = True
 SECURE_HSTS_PRELOAD = True
 
+# Templates : Django utilise déjà le loader en cache (APP_DIRS=True, sans
+# 'loaders'). Avec gunicorn --preload, core.warmup les compile dans le maître.
+
 # Configuration des fichiers statiques et media
 STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
@@ -33,6 +36,15 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
 # Configuration de la base de données (à adapter selon votre hébergeur)
+# Connexions persistantes: une connexion par worker, réutilisée entre les
+# requêtes et vérifiée avant réutilisation (CONN_HEALTH_CHECKS).
+# Le gain n'a pas été mesuré sur PostgreSQL (bench_db_connections.py n'a
+# tourné que sur SQLite) : 60 s est un point de départ, à ajuster sur le serveur.
+DB_CONN_MAX_AGE = int(os.environ.get('DB_CONN_MAX_AGE', '60'))
+# Mode pgbouncer (pool_mode = transaction): pas de curseurs côté serveur,
+# comme le demande la documentation Django pour ce mode (non testé ici).
+DB_PGBOUNCER = os.environ.get('DB_PGBOUNCER', 'False').lower() == 'true'
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
@@ -41,9 +53,48 @@ DATABASES = {
         'PASSWORD': os.environ.get('DB_PASSWORD', ''),
         'HOST': os.environ.get('DB_HOST', ''),
         'PORT': os.environ.get('DB_PORT', '5432'),
+        'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
+        'DISABLE_SERVER_SIDE_CURSORS': DB_PGBOUNCER,
+        'OPTIONS': {
+            'connect_timeout': 5,
+        },
     }
 }
 
+# Derrière pgbouncer, les exports (curseurs côté serveur) passent par une
+# connexion directe à PostgreSQL si DB_DIRECT_PORT est défini.
+if DB_PGBOUNCER and os.environ.get('DB_DIRECT_PORT'):
+    DATABASES['direct'] = {
+        **DATABASES['default'],
+        'HOST': os.environ.get('DB_DIRECT_HOST', DATABASES['default']['HOST']),
+        'PORT': os.environ['DB_DIRECT_PORT'],
+        'CONN_MAX_AGE': 0,
+        'DISABLE_SERVER_SIDE_CURSORS': False,
+        'TEST': {'MIRROR': 'default'},
+    }
+    EXPORTS_DATABASE = 'direct'
+
+# Réplica PostgreSQL en lecture (streaming replication) si DB_REPLICA_HOST est défini
+if os.environ.get('DB_REPLICA_HOST'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': os.environ['DB_REPLICA_HOST'],
+        'PORT': os.environ.get('DB_REPLICA_PORT', DATABASES['default']['PORT']),
+        'TEST': {'MIRROR': 'default'},
+    }
+    REPLICA_DATABASE = 'replica'
+    if not DB_PGBOUNCER:
+        # Les exports du tableau de bord ne chargent plus la base principale
+        EXPORTS_DATABASE = 'replica'
+
+# Caches partagés par les workers (voir core/cache.py): dossier local par
+# défaut, serveur Redis avec CACHE_BACKEND=redis et CACHE_URL=redis://...
+# Avec plusieurs serveurs, seul redis partage les invalidations et le verrou
+# de calcul unique (le dossier local ne vaut que pour un serveur).
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'file')
+CACHES = build_caches(CACHE_BACKEND, os.environ.get('CACHE_URL', str(BASE_DIR / 'cache')))
+
 # Configuration des emails (à adapter selon votre fournisseur)
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = os.environ.get('EMAIL_HOST', '')
@@ -52,26 +103,13 @@ EMAIL_USE_TLS = os.environ.get('EMAIL_USE_TLS', 'True').lower() == 'true'
 EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER', '')
 EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
 
-# Configuration des logs
-LOGGING = {
-    'version': 1,
-    'disable_existing_loggers': False,
-    'handlers': {
-        'file': {
-            'level': 'INFO',
-            'class': 'logging.FileHandler',
-            'filename': BASE_DIR / 'logs' / 'django.log',
-        },
-    },
-    'loggers': {
-        'django': {
-            'handlers': ['file'],
-            'level': 'INFO',
-            'propagate': True,
-        },
-    },
-}
-
 # Créer le dossier logs s'il n'existe pas
 LOGS_DIR = BASE_DIR / 'logs'
 LOGS_DIR.mkdir(exist_ok=True)
+
+# Configuration des logs (JSON, écrits par un thread d'arrière-plan)
+LOGGING = build_logging_config(
+    level=LOG_LEVEL,
+    module_levels={'django': 'INFO', **LOG_LEVELS},
+    filename=LOGS_DIR / 'django.log',
+)
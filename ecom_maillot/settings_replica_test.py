@@ -0,0 +1,25 @@
+"""
+Deux bases SQLite locales pour tester le routage vers le réplica
+
+La base « replica » n'est pas un miroir: ce qui y est lu prouve que la
+requête a été routée vers elle.
+
+    DJANGO_SETTINGS_MODULE=ecom_maillot.settings_replica_test python manage.py test core
+"""
+
+from .settings import *
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+    },
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db_replica.sqlite3',
+    },
+}
+
+REPLICA_DATABASE = 'replica'
+# Base de test indépendante: le schéma n'arrive pas par réplication
+REPLICA_MIGRATE = True
@@ -0,0 +1,54 @@
+"""
+Configuration gunicorn (lue automatiquement depuis la racine du projet)
+
+Ce fichier ne fixe aucun réglage par lui-même : chaque valeur vient d'une
+variable d'environnement et, si elle n'est pas définie, gunicorn garde sa
+valeur par défaut (ou celle de la ligne de commande). L'adresse d'écoute reste
+donnée par la ligne de commande (--bind, ou $PORT sur Heroku). Voir
+OPTIMISATION_VPS_1GB.md pour le service systemd.
+
+    GUNICORN_WORKERS              --workers
+    GUNICORN_TIMEOUT              --timeout
+    GUNICORN_KEEPALIVE            --keep-alive
+    GUNICORN_MAX_REQUESTS         --max-requests
+    GUNICORN_MAX_REQUESTS_JITTER  --max-requests-jitter
+    GUNICORN_PRELOAD              --preload (1 / 0)
+
+Les hooks ci-dessous préchauffent le maître (avec --preload) et chaque worker.
+"""
+import os
+
+ENV_SETTINGS = {
+    'workers': ('GUNICORN_WORKERS', int),
+    'timeout': ('GUNICORN_TIMEOUT', int),
+    'keepalive': ('GUNICORN_KEEPALIVE', int),
+    'max_requests': ('GUNICORN_MAX_REQUESTS', int),
+    'max_requests_jitter': ('GUNICORN_MAX_REQUESTS_JITTER', int),
+    'preload_app': ('GUNICORN_PRELOAD', lambda value: value.lower() in ('1', 'true', 'yes', 'on')),
+}
+
+for _setting, (_variable, _cast) in ENV_SETTINGS.items():
+    if os.environ.get(_variable):
+        globals()[_setting] = _cast(os.environ[_variable])
+
+
+def when_ready(server):
+    """Maître prêt, application préchargée: préchauffage partagé avec les workers (copy-on-write)"""
+    if not server.cfg.preload_app:
+        return
+    from django.db import connections
+
+    from core.warmup import warmup
+
+    timings = warmup(fork_safe_only=True)
+    # Aucune connexion ne doit être héritée par les workers
+    connections.close_all()
+    server.log.info("Préchauffage du maître: %s", timings)
+
+
+def post_fork(server, worker):
+    """Worker créé (démarrage ou recyclage): connexions et caches avant la première requête"""
+    from core.warmup import warmup
+
+    timings = warmup()
+    server.log.info("Préchauffage du worker %s: %s", worker.pid, timings)
@@ -1,6 +1,25 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
 from django.utils.html import format_html
 from .models import Order, OrderItem, Address, OrderItemCustomization
+from .transitions import InvalidTransition, can_transition, transition_orders
+
+
+class OrderAdminForm(forms.ModelForm):
+    class Meta:
+        model = Order
+        fields = '__all__'
+
+    def clean_status(self):
+        """Refuser les changements de statut non autorisés par la machine à états"""
+        status = self.cleaned_data['status']
+        current = self.initial.get('status')
+        if self.instance.pk and status != current and not can_transition(current, status):
+            raise forms.ValidationError(
+                f"Impossible de passer la commande de '{self.instance.get_status_display()}' à "
+                f"'{dict(Order.STATUS_CHOICES).get(status, status)}'."
+            )
+        return status
 
 
 class OrderItemCustomizationInline(admin.TabularInline):
@@ -20,11 +39,13 @@ class OrderItemInline(admin.TabularInline):
 
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
+    form = OrderAdminForm
     list_display = ['order_number', 'user', 'status', 'payment_status', 'total', 'created_at']
     list_filter = ['status', 'payment_status', 'created_at']
     search_fields = ['order_number', 'user__username', 'user__email']
     readonly_fields = ['order_number', 'created_at', 'updated_at', 'paid_at']
     inlines = [OrderItemInline]
+    actions = ['mark_as_processing', 'mark_as_shipped', 'mark_as_delivered', 'mark_as_cancelled']
     
     fieldsets = (
         ('Informations de commande', {
@@ -51,6 +72,49 @@ class OrderAdmin(admin.ModelAdmin):
     def total(self, obj):
         return f"{obj.total} FCFA"
     total.short_description = 'Total'
+    
+    def save_model(self, request, obj, form, change):
+        """Les changements de statut passent par la machine à états"""
+        if change and 'status' in form.changed_data:
+            new_status = obj.status
+            obj.status = form.initial['status']
+            super().save_model(request, obj, form, change)
+            try:
+                obj.transition_to(new_status)
+            except InvalidTransition:
+                self.message_user(
+                    request,
+                    f"Impossible de passer la commande de '{obj.get_status_display()}' à '{new_status}'.",
+                    level=messages.ERROR,
+                )
+        else:
+            super().save_model(request, obj, form, change)
+    
+    def _transition(self, request, queryset, status):
+        result = transition_orders(queryset, status)
+        self.message_user(request, f"{len(result.updated)} commande(s) mise(s) à jour.")
+        if result.skipped:
+            self.message_user(
+                request,
+                f"{len(result.skipped)} commande(s) ignorée(s): transition non autorisée.",
+                level=messages.WARNING,
+            )
+    
+    def mark_as_processing(self, request, queryset):
+        self._transition(request, queryset, 'processing')
+    mark_as_processing.short_description = "Marquer comme en cours de traitement"
+    
+    def mark_as_shipped(self, request, queryset):
+        self._transition(request, queryset, 'shipped')
+    mark_as_shipped.short_description = "Marquer comme expédié"
+    
+    def mark_as_delivered(self, request, queryset):
+        self._transition(request, queryset, 'delivered')
+    mark_as_delivered.short_description = "Marquer comme livré"
+    
+    def mark_as_cancelled(self, request, queryset):
+        self._transition(request, queryset, 'cancelled')
+    mark_as_cancelled.short_description = "Annuler"
 
 
 @admin.register(OrderItem)
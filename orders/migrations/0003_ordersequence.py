@@ -0,0 +1,30 @@
+# Generated by Django 4.2.7 on 2026-10-19 12:56
+
+from django.db import migrations, models
+
+
+def create_order_sequence(apps, schema_editor):
+    OrderSequence = apps.get_model('orders', 'OrderSequence')
+    OrderSequence.objects.get_or_create(name='order')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0002_orderitemcustomization'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderSequence',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False, verbose_name='Nom')),
+                ('last_value', models.PositiveBigIntegerField(default=0, verbose_name='Dernière valeur réservée')),
+            ],
+            options={
+                'verbose_name': 'Séquence de numérotation',
+                'verbose_name_plural': 'Séquences de numérotation',
+            },
+        ),
+        migrations.RunPython(create_order_sequence, migrations.RunPython.noop),
+    ]
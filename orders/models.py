@@ -1,6 +1,9 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
+from django.utils import timezone
 from products.models import Product
+from .numbering import next_order_number
+from .signals import order_paid
 
 
 class Address(models.Model):
@@ -31,6 +34,19 @@ class Address(models.Model):
         super().save(*args, **kwargs)
 
 
+class OrderSequence(models.Model):
+    """Compteur en base utilisé pour numéroter les commandes"""
+    name = models.CharField(max_length=50, primary_key=True, verbose_name="Nom")
+    last_value = models.PositiveBigIntegerField(default=0, verbose_name="Dernière valeur réservée")
+
+    class Meta:
+        verbose_name = "Séquence de numérotation"
+        verbose_name_plural = "Séquences de numérotation"
+
+    def __str__(self):
+        return f"{self.name} ({self.last_value})"
+
+
 class Order(models.Model):
     STATUS_CHOICES = [
         ('pending', 'En attente'),
@@ -81,13 +97,31 @@ class Order(models.Model):
     def __str__(self):
         return f"Commande {self.order_number} - {self.user.username}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._saved_payment_status = instance.__dict__.get('payment_status')
+        return instance
+
     def save(self, *args, **kwargs):
         if not self.order_number:
-            # Générer un numéro de commande unique
-            import datetime
-            now = datetime.datetime.now()
-            self.order_number = f"CMD{now.strftime('%Y%m%d%H%M%S')}{self.user.id}"
-        super().save(*args, **kwargs)
+            # Générer un numéro de commande unique (compteur réservé par blocs)
+            self.order_number = next_order_number()
+        newly_paid = self.payment_status == 'paid' and getattr(self, '_saved_payment_status', None) != 'paid'
+        if newly_paid and self.paid_at is None:
+            # Date de paiement toujours renseignée (products.recommendations s'en sert)
+            self.paid_at = timezone.now()
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'paid_at'}
+        if not newly_paid:
+            super().save(*args, **kwargs)
+            self._saved_payment_status = self.payment_status
+            return
+        # Paiement et effets de order_paid (achats conjoints) validés ensemble
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            self._saved_payment_status = self.payment_status
+            order_paid.send(sender=Order, order=self)
 
     @property
     def is_paid(self):
@@ -97,6 +131,12 @@ class Order(models.Model):
     def can_be_cancelled(self):
         return self.status in ['pending', 'processing']
 
+    def transition_to(self, status):
+        """Change le statut via la machine à états (stock, ventes, notifications)"""
+        from .transitions import transition_orders
+        transition_orders([self.pk], status, strict=True)
+        self.status = status
+
     def get_total_items(self):
         return sum(item.quantity for item in self.items.all())
 
@@ -146,10 +186,5 @@ class OrderItemCustomization(models.Model):
     
     def save(self, *args, **kwargs):
         # Calculer le prix total
-        if self.customization.customization_type == 'name' and self.custom_text:
-            # Pour les noms/numéros, le prix dépend du nombre de caractères
-            self.price = self.customization.price * len(self.custom_text) * self.quantity
-        else:
-            # Pour les badges, prix fixe
-            self.price = self.customization.price * self.quantity
+        self.price = self.customization.price_for(self.custom_text, self.quantity)
         super().save(*args, **kwargs)
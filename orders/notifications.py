@@ -0,0 +1,43 @@
+"""
+Notifications envoyées aux clients lors des changements de statut
+"""
+import logging
+
+from django.conf import settings
+from django.core.mail import send_mass_mail
+from django.dispatch import receiver
+
+from .models import Order
+from .signals import order_status_changed
+
+logger = logging.getLogger(__name__)
+
+STATUS_MESSAGES = {
+    'shipped': "Votre commande {number} a été expédiée.",
+    'delivered': "Votre commande {number} a été livrée. Merci pour votre achat !",
+    'cancelled': "Votre commande {number} a été annulée.",
+    'refunded': "Votre commande {number} a été remboursée.",
+}
+
+
+@receiver(order_status_changed)
+def notify_customers(sender, order_ids, status, **kwargs):
+    """Envoie un email par commande, en une seule connexion SMTP pour tout le lot"""
+    template = STATUS_MESSAGES.get(status)
+    if not template:
+        return
+
+    rows = Order.objects.filter(pk__in=order_ids).exclude(user__email='').values_list('order_number', 'user__email')
+    messages = [
+        (f"Commande {number}", template.format(number=number), settings.DEFAULT_FROM_EMAIL, [email])
+        for number, email in rows
+    ]
+    if not messages:
+        return
+
+    try:
+        sent = send_mass_mail(messages, fail_silently=False)
+    except Exception:
+        logger.exception('order_notifications_failed', extra={'status': status, 'count': len(messages)})
+    else:
+        logger.info('order_notifications_sent', extra={'status': status, 'count': sent})
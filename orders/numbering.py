@@ -0,0 +1,112 @@
+"""
+Génération des numéros de commande
+
+Les numéros proviennent d'un compteur en base (``OrderSequence``) réservé par
+blocs : chaque processus réserve ``ORDER_NUMBER_BLOCK_SIZE`` valeurs en une
+seule requête UPDATE puis les distribue depuis sa mémoire. Deux commandes ne
+peuvent donc jamais recevoir le même numéro, sans boucle de réessai.
+
+Les numéros sont croissants au sein d'un processus ; entre workers, l'ordre
+suit l'ordre de réservation des blocs.
+
+Le bloc est mis en cache dès sa réservation, même dans une transaction. Si
+elle est annulée, le compteur en base revient en arrière : le bloc est alors
+oublié (sa confirmation, enregistrée par ``transaction.on_commit``, a disparu
+de la connexion) et ses valeurs ne sont jamais distribuées deux fois.
+
+Format : ``CMDN00001234``. La lettre ``N`` (nouvelle série) se classe après
+les chiffres des anciens numéros (``CMD<AAAAMMJJHHMMSS><id utilisateur>``) :
+le tri par numéro reste chronologique.
+"""
+import threading
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from core.db import write_atomic
+
+ORDER_SEQUENCE = 'order'
+ORDER_NUMBER_PREFIX = 'CMD'
+ORDER_NUMBER_SERIES = 'N'
+
+
+def format_order_number(value):
+    """Formate une valeur du compteur: 1234 -> CMDN00001234"""
+    return f"{ORDER_NUMBER_PREFIX}{ORDER_NUMBER_SERIES}{value:08d}"
+
+
+class BlockAllocator:
+    """Distribue les valeurs d'un compteur réservé par blocs"""
+
+    def __init__(self, name, block_size=None):
+        self.name = name
+        self._block_size = block_size
+        self._lock = threading.Lock()
+        self._next = 0
+        self._end = 0
+        # Confirmation (on_commit) du bloc réservé dans une transaction en cours
+        self._pending = None
+
+    @property
+    def block_size(self):
+        return self._block_size or getattr(settings, 'ORDER_NUMBER_BLOCK_SIZE', 20)
+
+    def reserve_block(self, size):
+        """Réserve ``size`` valeurs en base et retourne l'intervalle [début, fin["""
+        from .models import OrderSequence
+
+        with write_atomic():
+            updated = OrderSequence.objects.filter(name=self.name).update(
+                last_value=F('last_value') + size
+            )
+            if not updated:
+                OrderSequence.objects.get_or_create(name=self.name)
+                OrderSequence.objects.filter(name=self.name).update(
+                    last_value=F('last_value') + size
+                )
+            end = OrderSequence.objects.filter(name=self.name).values_list('last_value', flat=True).get()
+        return end - size + 1, end + 1
+
+    def _rolled_back(self, connection):
+        """Le bloc en cache a été réservé dans une transaction annulée depuis"""
+        if self._pending is None:
+            return False
+        return not any(entry[1] is self._pending for entry in connection.run_on_commit)
+
+    def next_value(self):
+        connection = transaction.get_connection()
+        with self._lock:
+            if self._rolled_back(connection):
+                self._next = self._end = 0
+                self._pending = None
+            if self._next < self._end:
+                value = self._next
+                self._next += 1
+                return value
+
+        start, end = self.reserve_block(self.block_size)
+        confirm = None
+        if connection.in_atomic_block:
+            def confirm():
+                with self._lock:
+                    if self._pending is confirm:
+                        self._pending = None
+            transaction.on_commit(confirm)
+        with self._lock:
+            self._next, self._end, self._pending = start + 1, end, confirm
+        return start
+
+    def reset(self):
+        """Oublie le bloc en cache (tests, changement de base)"""
+        with self._lock:
+            self._next = self._end = 0
+            self._pending = None
+
+
+order_numbers = BlockAllocator(ORDER_SEQUENCE)
+
+
+def next_order_number():
+    """Retourne un nouveau numéro de commande unique"""
+    return format_order_number(order_numbers.next_value())
@@ -0,0 +1,10 @@
+from django.dispatch import Signal
+
+# Envoyé une fois par lot après un changement de statut (voir orders.transitions)
+# Arguments: order_ids (liste des commandes modifiées), status (nouveau statut)
+order_status_changed = Signal()
+
+# Envoyé quand une commande passe au statut de paiement 'paid', dans la
+# transaction qui enregistre le paiement
+# Arguments: order
+order_paid = Signal()
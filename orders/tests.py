@@ -1,3 +1,171 @@
-from django.test import TestCase
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.core import mail
+from django.forms.models import model_to_dict
+from django.db import transaction
+from django.test import RequestFactory, TestCase
+
+from products.models import Category, Product, Team
+from .models import Address, Order, OrderItem, OrderSequence
+from .numbering import BlockAllocator, format_order_number
+from .transitions import InvalidTransition, transition_orders
+
+
+class OrderNumberTest(TestCase):
+    """Tests pour la numérotation des commandes"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='buyer', password='testpass123')
+
+    def create_order(self):
+        return Order.objects.create(
+            user=self.user,
+            subtotal=Decimal('10000'),
+            shipping_cost=Decimal('1000'),
+            total=Decimal('11000'),
+        )
+
+    def test_same_user_same_second_gets_distinct_numbers(self):
+        numbers = [self.create_order().order_number for _ in range(5)]
+        self.assertEqual(len(set(numbers)), 5)
+        self.assertEqual(numbers, sorted(numbers))
+        self.assertTrue(all(n.startswith('CMDN') and len(n) == 12 for n in numbers))
+
+    def test_block_is_reserved_once_per_process(self):
+        allocator = BlockAllocator('test', block_size=10)
+        first = allocator.next_value()
+        with self.assertNumQueries(0):
+            values = [allocator.next_value() for _ in range(9)]
+        self.assertEqual(values, list(range(first + 1, first + 10)))
+        self.assertEqual(OrderSequence.objects.get(name='test').last_value, first + 9)
+
+    def test_block_reused_by_later_transactions(self):
+        allocator = BlockAllocator('test', block_size=10)
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                first = allocator.next_value()
+        with transaction.atomic(), self.assertNumQueries(0):
+            self.assertEqual(allocator.next_value(), first + 1)
+
+    def test_rolled_back_block_is_forgotten(self):
+        allocator = BlockAllocator('test', block_size=10)
+        try:
+            with transaction.atomic():
+                first = allocator.next_value()
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        # Le compteur est revenu en arrière: les valeurs sont réservées à nouveau
+        self.assertEqual(allocator.next_value(), first)
+        self.assertEqual(OrderSequence.objects.get(name='test').last_value, first + 9)
+
+    def test_format(self):
+        self.assertEqual(format_order_number(1234), 'CMDN00001234')
+        # Les nouveaux numéros se classent après les anciens (CMD<date><id>)
+        self.assertEqual(sorted(['CMDN00000001', 'CMD2025101913450112']), ['CMD2025101913450112', 'CMDN00000001'])
+
+
+class OrderTransitionTest(TestCase):
+    """Tests pour la machine à états des commandes"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='buyer', email='buyer@example.com', password='testpass123')
+        category = Category.objects.create(name="Maillots")
+        team = Team.objects.create(name="ASEC Mimosas", country="Côte d'Ivoire")
+        self.products = [
+            Product.objects.create(
+                name=f"Maillot {i}", category=category, team=team, description="-",
+                price=Decimal('10000'), available_sizes=['M'], stock_quantity=10,
+            )
+            for i in range(3)
+        ]
+        self.orders = []
+        for _ in range(4):
+            order = Order.objects.create(
+                user=self.user, subtotal=Decimal('20000'), shipping_cost=Decimal('1000'), total=Decimal('21000'),
+            )
+            for product in self.products:
+                OrderItem.objects.create(order=order, product=product, size='M', quantity=2, price=Decimal('10000'))
+            self.orders.append(order)
+
+    def stock(self):
+        return list(Product.objects.order_by('pk').values_list('stock_quantity', 'sales_count', 'is_active'))
+
+    def test_processing_reserves_stock_once(self):
+        transition_orders(self.orders[:2], 'processing')
+        self.assertEqual(self.stock(), [(6, 4, True)] * 3)
+
+        # Modifier les notes ne touche plus au stock
+        order = Order.objects.get(pk=self.orders[0].pk)
+        order.notes = "Livrer le matin"
+        order.save()
+        transition_orders(self.orders[:2], 'shipped')
+        self.assertEqual(self.stock(), [(6, 4, True)] * 3)
+
+    def test_cancel_restores_only_committed_stock(self):
+        transition_orders(self.orders[:1], 'processing')
+        result = transition_orders(self.orders[:2], 'cancelled')
+        self.assertEqual(len(result), 2)
+        self.assertEqual(self.stock(), [(10, 0, True)] * 3)
+
+    def test_refund_does_not_restock(self):
+        transition_orders(self.orders[:1], 'processing')
+        transition_orders(self.orders[:1], 'shipped')
+        transition_orders(self.orders[:1], 'delivered')
+        transition_orders(self.orders[:1], 'refunded')
+        self.assertEqual(self.stock(), [(8, 2, True)] * 3)
+
+    def test_out_of_stock_products_are_deactivated_and_restored(self):
+        transition_orders(self.orders, 'processing')
+        self.assertEqual(self.stock(), [(2, 8, True)] * 3)
+        Product.objects.update(stock_quantity=4)
+        transition_orders(self.orders[:1], 'cancelled')
+        transition_orders([self.orders[1].pk], 'shipped')
+        self.assertEqual(self.stock(), [(6, 6, True)] * 3)
+
+    def test_batch_query_count_is_constant(self):
+        # savepoint, verrou, UPDATE commandes, agrégat, UPDATE stock, statut actif, release
+        with self.assertNumQueries(7):
+            transition_orders(self.orders, 'processing')
+        Product.objects.update(is_active=False)
+        with self.assertNumQueries(7):
+            transition_orders(self.orders, 'cancelled')
+
+    def test_invalid_transitions_are_skipped_or_rejected(self):
+        result = transition_orders(self.orders, 'delivered')
+        self.assertEqual(result.updated, [])
+        self.assertEqual(len(result.skipped), 4)
+        with self.assertRaises(InvalidTransition):
+            self.orders[0].transition_to('delivered')
+        self.orders[0].transition_to('cancelled')
+        self.assertEqual(Order.objects.get(pk=self.orders[0].pk).status, 'cancelled')
+
+    def test_customers_are_notified_in_bulk(self):
+        transition_orders(self.orders, 'processing')
+        with self.captureOnCommitCallbacks(execute=True):
+            transition_orders(self.orders, 'shipped')
+        self.assertEqual(len(mail.outbox), 4)
+        self.assertEqual(mail.outbox[0].to, ['buyer@example.com'])
+
+    def admin_form(self, order, **changes):
+        request = RequestFactory().post('/admin/')
+        request.user = User(username='staff', is_staff=True, is_superuser=True)
+        form_class = admin.site._registry[Order].get_form(request, order, change=True)
+        data = {key: value for key, value in model_to_dict(order).items() if value is not None}
+        data.update(changes)
+        return form_class(data, instance=order, initial=model_to_dict(order))
+
+    def test_admin_form_rejects_invalid_transition(self):
+        order = Order.objects.get(pk=self.orders[0].pk)
+        form = self.admin_form(order, status='delivered', notes="Livrer le matin")
+        self.assertFalse(form.is_valid())
+        self.assertIn('status', form.errors)
+        self.assertEqual(Order.objects.get(pk=order.pk).status, 'pending')
+
+        order.shipping_address = Address.objects.create(
+            user=self.user, first_name='Didier', last_name='Drogba', phone='+2250102030405',
+            email='buyer@example.com', address='Rue 12', city='Abidjan', postal_code='00225', country="Côte d'Ivoire",
+        )
+        self.assertTrue(self.admin_form(order, status='processing').is_valid())
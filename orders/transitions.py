@@ -0,0 +1,157 @@
+"""
+Machine à états des commandes
+
+    pending -> processing -> shipped -> delivered -> refunded
+       |            |
+       +------------+--> cancelled
+
+Stock :
+
+    pending -> processing            décompte le stock, compte les ventes
+    processing -> cancelled          rend le stock, décompte les ventes
+    delivered -> refunded            aucun effet : la marchandise livrée n'est
+                                     pas forcément retournée ; un retour se
+                                     réintègre à la main (stock du produit)
+
+Chaque changement de statut passe par ``transition_orders`` qui applique les
+effets de bord une seule fois par lot : mise à jour du stock et du compteur de
+ventes des produits, puis envoi du signal ``order_status_changed`` (notifications).
+Le nombre de requêtes ne dépend ni du nombre de commandes ni du nombre d'articles.
+"""
+import logging
+from dataclasses import dataclass, field
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Q, Sum, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from core.db import write_atomic
+from products.models import Product
+from .models import Order, OrderItem
+from .signals import order_status_changed
+
+logger = logging.getLogger(__name__)
+
+TRANSITIONS = {
+    'pending': {'processing', 'cancelled'},
+    'processing': {'shipped', 'cancelled'},
+    'shipped': {'delivered'},
+    'delivered': {'refunded'},
+    'cancelled': set(),
+    'refunded': set(),
+}
+
+# Statuts pour lesquels le stock des articles a été décompté
+STOCK_COMMITTED = {'processing', 'shipped', 'delivered'}
+# Statuts qui rendent le stock décompté (annulation avant expédition seulement)
+STOCK_RELEASED = {'cancelled'}
+
+
+class InvalidTransition(ValueError):
+    """Changement de statut non autorisé"""
+
+
+@dataclass
+class TransitionResult:
+    target: str
+    updated: list = field(default_factory=list)
+    skipped: list = field(default_factory=list)
+
+    def __len__(self):
+        return len(self.updated)
+
+
+def can_transition(source, target):
+    return target in TRANSITIONS.get(source, set())
+
+
+def transition_orders(orders, target, strict=False):
+    """
+    Fait passer un lot de commandes (instances, ids ou queryset) au statut ``target``.
+
+    Les commandes dont le statut actuel n'autorise pas la transition sont
+    ignorées (ou provoquent ``InvalidTransition`` si ``strict``).
+    """
+    if target not in TRANSITIONS:
+        raise InvalidTransition(f"Statut inconnu: {target}")
+
+    if hasattr(orders, 'values_list'):
+        ids = orders.values_list('pk', flat=True)
+    else:
+        ids = [getattr(order, 'pk', order) for order in orders]
+
+    result = TransitionResult(target=target)
+    with write_atomic():
+        rows = list(Order.objects.select_for_update().filter(pk__in=ids).order_by().values_list('pk', 'status'))
+        reserve, release = [], []
+        for pk, status in rows:
+            if not can_transition(status, target):
+                result.skipped.append(pk)
+                continue
+            result.updated.append(pk)
+            if target in STOCK_COMMITTED and status not in STOCK_COMMITTED:
+                reserve.append(pk)
+            elif target in STOCK_RELEASED and status in STOCK_COMMITTED:
+                release.append(pk)
+
+        if strict and result.skipped:
+            raise InvalidTransition(f"Transition vers '{target}' impossible pour les commandes {result.skipped}")
+        if not result.updated:
+            return result
+
+        Order.objects.filter(pk__in=result.updated).update(status=target, updated_at=timezone.now())
+        apply_stock_deltas(stock_deltas(reserve, release))
+
+        transaction.on_commit(lambda: order_status_changed.send(
+            sender=Order, order_ids=result.updated, status=target,
+        ))
+
+    logger.info('orders_transitioned', extra={
+        'status': target,
+        'count': len(result.updated),
+        'skipped': len(result.skipped),
+        'reserved': len(reserve),
+        'released': len(release),
+    })
+    return result
+
+
+def stock_deltas(reserve_ids, release_ids):
+    """
+    Quantités à retirer du stock par produit: positives pour les commandes
+    confirmées, négatives pour celles annulées. Une seule requête agrégée.
+    """
+    if not reserve_ids and not release_ids:
+        return {}
+    rows = (
+        OrderItem.objects
+        .filter(Q(order_id__in=reserve_ids) | Q(order_id__in=release_ids))
+        .values('product_id')
+        .annotate(delta=Sum(Case(
+            When(order_id__in=reserve_ids, then=F('quantity')),
+            default=-F('quantity'),
+            output_field=IntegerField(),
+        )))
+    )
+    return {row['product_id']: row['delta'] for row in rows if row['delta']}
+
+
+def apply_stock_deltas(deltas):
+    """Applique les variations de stock et de ventes en une requête UPDATE"""
+    if not deltas:
+        return
+    stock_cases = [When(pk=pk, then=Value(delta)) for pk, delta in deltas.items()]
+    delta = Case(*stock_cases, default=Value(0), output_field=IntegerField())
+    Product.objects.filter(pk__in=deltas).update(
+        stock_quantity=Greatest(F('stock_quantity') - delta, Value(0)),
+        sales_count=Greatest(F('sales_count') + delta, Value(0)),
+    )
+
+    # Rupture de stock: désactiver; stock restauré: réactiver
+    reserved = [pk for pk, value in deltas.items() if value > 0]
+    released = [pk for pk, value in deltas.items() if value < 0]
+    if reserved:
+        Product.objects.filter(pk__in=reserved, stock_quantity=0, is_active=True).update(is_active=False)
+    if released:
+        Product.objects.filter(pk__in=released, stock_quantity__gt=0, is_active=False).update(is_active=True)
@@ -1,10 +1,10 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db import transaction
-from decimal import Decimal
+from core.db import write_atomic
 from .models import Order, OrderItem, Address, OrderItemCustomization
 from .forms import OrderCreateForm, AddressForm
+from .transitions import InvalidTransition
 from cart.cart import Cart
 
 
@@ -20,38 +20,21 @@ def order_create(request):
     if request.method == 'POST':
         form = OrderCreateForm(request.POST)
         if form.is_valid():
-            with transaction.atomic():
+            with write_atomic():
                 # Créer la commande
                 order = form.save(commit=False)
                 order.user = request.user
                 
-                # Calculer les totaux
-                subtotal = cart.get_total_price()
-                shipping_cost = Decimal('1000')  # Frais de livraison fixes
-                total = subtotal + shipping_cost
-                
-                order.subtotal = subtotal
-                order.shipping_cost = shipping_cost
-                order.total = total
+                # Totaux et lignes du chiffrage du panier (celui affiché au client)
+                pricing = cart.pricing()
+                order.subtotal = pricing.subtotal
+                order.shipping_cost = pricing.shipping_cost
+                order.total = pricing.total
                 order.save()
                 
                 # Créer les articles de commande avec personnalisations
+                customizations = []
                 for item in cart:
-                    # Récupérer le cart_item pour les personnalisations
-                    from cart.models import CartItem
-                    cart_item = CartItem.objects.filter(
-                        cart__user=request.user,
-                        product=item['product'],
-                        size=item['size']
-                    ).first()
-                    
-                    # Calculer le prix total avec personnalisations
-                    if cart_item:
-                        total_price = cart_item.total_price
-                    else:
-                        total_price = item['total_price']
-                    
-                    # Créer l'article de commande
                     order_item = OrderItem.objects.create(
                         order=order,
                         product=item['product'],
@@ -59,19 +42,18 @@ def order_create(request):
                         size=item['size'],
                         quantity=item['quantity'],
                         price=item['price'],
-                        total_price=total_price
+                        total_price=item['total_price']
+                    )
+                    customizations.extend(
+                        OrderItemCustomization(
+                            order_item=order_item,
+                            customization_id=custom.option_id,
+                            custom_text=custom.custom_text,
+                            price=custom.price
+                        )
+                        for custom in item['customizations']
                     )
-                    
-                    # Copier les personnalisations du cart_item vers l'order_item
-                    if cart_item:
-                        for cart_custom in cart_item.customizations.all():
-                            OrderItemCustomization.objects.create(
-                                order_item=order_item,
-                                customization=cart_custom.customization,
-                                custom_text=cart_custom.custom_text,
-                                quantity=cart_custom.quantity,
-                                price=cart_custom.price
-                            )
+                OrderItemCustomization.objects.bulk_create(customizations)
                 
                 # Vider le panier
                 cart.clear()
@@ -90,6 +72,7 @@ def order_create(request):
     
     context = {
         'cart': cart,
+        'pricing': cart.pricing(),
         'form': form,
     }
     return render(request, 'orders/order_create.html', context)
@@ -99,11 +82,12 @@ def order_create(request):
 def order_detail(request, order_id):
     """Afficher le détail d'une commande"""
     # Permettre aux administrateurs de voir toutes les commandes
+    orders = Order.objects.prefetch_related('items__product__primary_image')
     if request.user.is_staff or request.user.is_superuser:
-        order = get_object_or_404(Order, id=order_id)
+        order = get_object_or_404(orders, id=order_id)
     else:
         # Les utilisateurs normaux ne peuvent voir que leurs propres commandes
-        order = get_object_or_404(Order, id=order_id, user=request.user)
+        order = get_object_or_404(orders, id=order_id, user=request.user)
     
     context = {
         'order': order,
@@ -120,6 +104,7 @@ def order_list(request):
     else:
         # Les utilisateurs normaux ne peuvent voir que leurs propres commandes
         orders = Order.objects.filter(user=request.user).order_by('-created_at')
+    orders = orders.prefetch_related('items__product__primary_image')
     
     context = {
         'orders': orders,
@@ -137,11 +122,10 @@ def order_cancel(request, order_id):
         # Les utilisateurs normaux ne peuvent annuler que leurs propres commandes
         order = get_object_or_404(Order, id=order_id, user=request.user)
     
-    if order.can_be_cancelled:
-        order.status = 'cancelled'
-        order.save()
+    try:
+        order.transition_to('cancelled')
         messages.success(request, f"Commande {order.order_number} annulée avec succès.")
-    else:
+    except InvalidTransition:
         messages.error(request, "Cette commande ne peut pas être annulée.")
     
     return redirect('orders:order_detail', order_id=order.id)
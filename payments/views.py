@@ -6,10 +6,11 @@ from django.views.decorators.csrf import csrf_exempt
 from django.utils import timezone
 from django.conf import settings
 import json
-import requests
+import logging
 from .models import Payment, PaymentLog
 from orders.models import Order
 
+logger = logging.getLogger(__name__)
 
 
 @login_required
@@ -117,14 +118,26 @@ def process_payment(request, order_id):
             messages.success(request, "Mode test activé - Paiement simulé avec succès !")
             return redirect(f'/payments/success/?token={payment.paydunya_token}')
         
-        # Appel à l'API PayDunya DMP
-        print(f"PayDunya Config: {paydunya_config}")
-        print(f"PayDunya Data: {paydunya_data}")
+        # Appel à l'API PayDunya DMP (les clés ne sont jamais journalisées)
+        logger.info('paydunya_request', extra={
+            'order_id': order.id,
+            'payment_id': payment.payment_id,
+            'mode': paydunya_config['mode'],
+            'amount': paydunya_data['amount'],
+        })
         
+        # Import différé: requests (et urllib3) coûtent ~80 ms au démarrage de chaque worker
+        import requests
+
         response = requests.post(api_url, headers=headers, json=paydunya_data)
         response_data = response.json()
         
-        print(f"PayDunya Response: {response_data}")
+        logger.info('paydunya_response', extra={
+            'order_id': order.id,
+            'payment_id': payment.payment_id,
+            'response_code': response_data.get('response-code'),
+        })
+        logger.debug('paydunya_response_body', extra={'order_id': order.id, 'body': response_data})
         
         PaymentLog.objects.create(
             payment=payment,
@@ -198,7 +211,7 @@ def process_payment(request, order_id):
             data={}
         )
         
-        print(f"Exception PayDunya: {str(e)}")
+        logger.exception('paydunya_error', extra={'order_id': order.id, 'payment_id': payment.payment_id})
         messages.error(request, f"Erreur lors du traitement du paiement: {str(e)}")
         return redirect('orders:order_detail', order_id=order.id)
 
@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import Category, Team, Product, ProductImage, Review, JerseyCustomization, CartItemCustomization
+from .models import Category, Team, Product, ProductImage, Review, JerseyCustomization, CartItemCustomization, SlugRedirect
 
 
 @admin.register(Category)
@@ -42,7 +42,12 @@ class ProductAdmin(admin.ModelAdmin):
         ('Statut', {
             'fields': ('is_featured', 'is_active')
         }),
+        ('Statistiques', {
+            'fields': ('sales_count', 'rating_avg', 'rating_count')
+        }),
     )
+    # Champs dénormalisés : affichés seulement, jamais réécrits par le formulaire
+    readonly_fields = ['sales_count', 'rating_avg', 'rating_count']
     
     def current_price(self, obj):
         return f"{obj.current_price} FCFA"
@@ -97,3 +102,10 @@ class CartItemCustomizationAdmin(admin.ModelAdmin):
     list_filter = ['customization__customization_type', 'created_at']
     search_fields = ['cart_item__product__name', 'custom_text']
     readonly_fields = ['price', 'created_at']
+
+
+@admin.register(SlugRedirect)
+class SlugRedirectAdmin(admin.ModelAdmin):
+    list_display = ['old_slug', 'new_slug', 'kind', 'created_at']
+    list_filter = ['kind']
+    search_fields = ['old_slug', 'new_slug']
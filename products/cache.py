@@ -0,0 +1,61 @@
+"""
+Données du catalogue mises en cache (cache ``catalog``)
+
+Les clés incluent la génération ``catalog`` : tout enregistrement ou
+suppression d'un produit, d'une catégorie, d'une équipe ou d'une image
+l'incrémente, ce qui invalide d'un coup toutes les entrées du catalogue.
+Les mises à jour en masse (``update()``, ``F()``: stock, ventes) ne
+l'incrémentent pas ; elles restent visibles au plus tard à l'expiration.
+L'import du catalogue (``bulk_create``) appelle ``catalog_changed`` à la fin.
+
+La génération ``prices`` (``price_version``) suit les prix des produits et
+des personnalisations ; elle entre dans la clé des paniers chiffrés
+(``cart.pricing``).
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.cache import bump_generation, generation, get_or_compute
+
+from .cards import product_cards
+from .models import Category, JerseyCustomization, Product, ProductImage, Team
+
+CATALOG_CACHE = 'catalog'
+
+
+def price_version():
+    """Version des prix (produits et personnalisations), pour les clés des paniers chiffrés"""
+    return generation('prices', cache=CATALOG_CACHE)
+
+
+def catalog_key(name):
+    return f"{name}:{generation('catalog', cache=CATALOG_CACHE)}"
+
+
+def _home_sections():
+    return {
+        'featured_products': product_cards(Product.objects.filter(is_featured=True, is_active=True)[:8]),
+        'sale_products': product_cards(Product.objects.filter(sale_price__isnull=False, is_active=True)[:8]),
+        'latest_products': product_cards(Product.objects.filter(is_active=True)[:12]),
+        'categories': list(Category.objects.all()[:6]),
+    }
+
+
+def home_sections():
+    """Sections de la page d'accueil (cartes produit et catégories)"""
+    return get_or_compute(catalog_key('home'), _home_sections, cache=CATALOG_CACHE)
+
+
+@receiver([post_save, post_delete], sender=Product, dispatch_uid='catalog_product_changed')
+@receiver([post_save, post_delete], sender=Category, dispatch_uid='catalog_category_changed')
+@receiver([post_save, post_delete], sender=Team, dispatch_uid='catalog_team_changed')
+@receiver([post_save, post_delete], sender=ProductImage, dispatch_uid='catalog_image_changed')
+def catalog_changed(sender, **kwargs):
+    bump_generation('catalog', cache=CATALOG_CACHE)
+    if sender is Product:
+        bump_generation('prices', cache=CATALOG_CACHE)
+
+
+@receiver([post_save, post_delete], sender=JerseyCustomization, dispatch_uid='prices_customization_changed')
+def prices_changed(sender, **kwargs):
+    bump_generation('prices', cache=CATALOG_CACHE)
@@ -0,0 +1,99 @@
+"""
+Cartes produit des listes (accueil, catalogue, catégorie, équipe, recherche,
+produits similaires)
+
+``card_queryset`` ne charge que les colonnes affichées, avec l'équipe, la
+catégorie et l'image principale (``Product.primary_image``) jointes dans une
+seule requête. Les templates reçoivent des ``ProductCard`` légers plutôt que
+des instances complètes de ``Product``.
+"""
+from django.urls import reverse
+
+from .models import Product
+
+CARD_FIELDS = (
+    'id', 'slug', 'name', 'price', 'sale_price', 'stock_quantity', 'rating_avg', 'rating_count',
+    'team__name', 'category__name', 'primary_image__image',
+)
+
+
+def card_queryset(queryset=None):
+    """Prépare un queryset de produits pour l'affichage en cartes"""
+    if queryset is None:
+        queryset = Product.objects.filter(is_active=True)
+    return queryset.select_related('team', 'category', 'primary_image').only(*CARD_FIELDS)
+
+
+class ProductCard:
+    """Données d'une carte produit"""
+
+    __slots__ = (
+        'id', 'slug', 'name', 'team_name', 'category_name',
+        'price', 'sale_price', 'stock_quantity', 'image_url',
+        'rating_avg', 'rating_count', 'rating_stars',
+    )
+
+    def __init__(self, id, slug, name, team_name, category_name, price, sale_price, stock_quantity, image_url,
+                 rating_avg=0, rating_count=0, rating_stars=0):
+        self.id = id
+        self.slug = slug
+        self.name = name
+        self.team_name = team_name
+        self.category_name = category_name
+        self.price = price
+        self.sale_price = sale_price
+        self.stock_quantity = stock_quantity
+        self.image_url = image_url
+        self.rating_avg = rating_avg
+        self.rating_count = rating_count
+        self.rating_stars = rating_stars
+
+    @classmethod
+    def from_product(cls, product):
+        return cls(
+            id=product.id,
+            slug=product.slug,
+            name=product.name,
+            team_name=product.team.name,
+            category_name=product.category.name,
+            price=product.price,
+            sale_price=product.sale_price,
+            stock_quantity=product.stock_quantity,
+            image_url=product.image_url,
+            rating_avg=product.rating_avg,
+            rating_count=product.rating_count,
+            rating_stars=product.rating_stars,
+        )
+
+    def __repr__(self):
+        return f"<ProductCard {self.slug}>"
+
+    # Mêmes propriétés que Product pour les templates
+
+    @property
+    def current_price(self):
+        return self.sale_price if self.sale_price else self.price
+
+    @property
+    def is_on_sale(self):
+        return bool(self.sale_price and self.sale_price < self.price)
+
+    @property
+    def discount_percentage(self):
+        if self.sale_price and self.price > self.sale_price:
+            return int(((self.price - self.sale_price) / self.price) * 100)
+        return 0
+
+    def get_absolute_url(self):
+        return reverse('products:product_detail', args=[self.slug])
+
+
+def product_cards(queryset=None):
+    """Évalue un queryset de produits en liste de ``ProductCard``"""
+    return [ProductCard.from_product(product) for product in card_queryset(queryset)]
+
+
+def paginate_cards(page):
+    """Remplace les produits d'une page par leurs cartes (après pagination)"""
+    page.object_list = [ProductCard.from_product(product) for product in page.object_list]
+    return page
@@ -0,0 +1,438 @@
+"""
+Import / export du catalogue en masse (CSV ou JSONL)
+
+Le fichier est lu en flux et traité par lots de ``chunk_size`` lignes :
+
+- validation de chaque ligne, y compris par les validateurs des champs du
+  modèle (les lignes invalides sont signalées et ignorées) ;
+- résolution des équipes et catégories par slug depuis un dictionnaire en mémoire ;
+- une requête pour retrouver les produits existants du lot, une pour réserver
+  les slugs des nouveaux produits (``SlugAllocator``), puis
+  ``bulk_create`` / ``bulk_update`` ;
+- copie des images depuis un dossier local dans un pool de threads, puis
+  création des ``ProductImage`` en une requête.
+
+Une ligne possédant un ``slug`` existant met le produit à jour ; seules les
+colonnes présentes sont modifiées (JSONL partiel possible). Sans ``slug``, ou
+avec un slug inconnu, le produit est créé.
+
+Format des colonnes (séparateur ``;`` ou ``,`` en CSV) ::
+
+    slug;name;category;team;description;price;sale_price;sizes;stock;is_featured;is_active;images
+
+``sizes`` et ``images`` sont des listes séparées par ``|`` en CSV et des
+tableaux en JSONL. ``export_catalog`` produit le même format.
+"""
+import csv
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+from itertools import chain, islice
+from pathlib import Path
+
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import slugify
+
+from .cache import catalog_changed
+from .models import Category, Product, ProductImage, Team, refresh_primary_images
+from .slugs import SlugAllocator
+
+logger = logging.getLogger(__name__)
+
+CATALOG_FIELDS = [
+    'slug', 'name', 'category', 'team', 'description', 'price', 'sale_price',
+    'sizes', 'stock', 'is_featured', 'is_active', 'images',
+]
+LIST_SEPARATOR = '|'
+# Préfixes de formule, neutralisés par une apostrophe à l'export
+# (dashboard.exports) et retirée à l'import
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+VALID_SIZES = [code for code, _ in Product.SIZES]
+TRUE_VALUES = {'1', 'true', 'vrai', 'oui', 'yes', 'x'}
+REQUIRED_FOR_CREATE = ['name', 'category', 'team', 'price']
+
+# Colonne du fichier -> champ du modèle
+COLUMN_FIELDS = {
+    'name': 'name',
+    'category': 'category',
+    'team': 'team',
+    'description': 'description',
+    'price': 'price',
+    'sale_price': 'sale_price',
+    'sizes': 'available_sizes',
+    'stock': 'stock_quantity',
+    'is_featured': 'is_featured',
+    'is_active': 'is_active',
+}
+
+
+class CatalogError(ValueError):
+    """Ligne de catalogue invalide"""
+
+
+@dataclass
+class ImportReport:
+    created: int = 0
+    updated: int = 0
+    images: int = 0
+    errors: list = field(default_factory=list)
+
+    def add_error(self, line, message):
+        self.errors.append((line, message))
+
+
+def detect_format(filename):
+    return 'jsonl' if str(filename).lower().endswith(('.jsonl', '.ndjson', '.json')) else 'csv'
+
+
+def read_rows(stream, fmt='csv'):
+    """Itère sur les couples (numéro de ligne, dict) d'un flux texte"""
+    if fmt == 'jsonl':
+        for line, text in enumerate(stream, start=1):
+            if not text.strip():
+                continue
+            try:
+                row = json.loads(text)
+            except ValueError:
+                row = None
+            yield line, row if isinstance(row, dict) else None
+        return
+
+    header = next(stream, '')
+    delimiter = ';' if header.count(';') >= header.count(',') else ','
+    reader = csv.DictReader(chain([header], stream), delimiter=delimiter)
+    for row in reader:
+        yield reader.line_num, row
+
+
+# --- Validation ---------------------------------------------------------------
+
+def _text(value):
+    text = '' if value is None else str(value)
+    if text.startswith("'") and text[1:].startswith(FORMULA_PREFIXES):
+        # Apostrophe ajoutée par l'export contre les formules (dashboard.exports)
+        text = text[1:]
+    return text.strip()
+
+
+def _list(value):
+    if isinstance(value, (list, tuple)):
+        return [_text(item) for item in value if _text(item)]
+    return [item.strip() for item in _text(value).split(LIST_SEPARATOR) if item.strip()]
+
+
+def _decimal(value, label, required=False):
+    text = _text(value).replace(' ', '').replace(',', '.')
+    if not text:
+        if required:
+            raise CatalogError(f"{label} manquant")
+        return None
+    try:
+        number = Decimal(text)
+    except InvalidOperation:
+        raise CatalogError(f"{label} invalide: {value}")
+    if number < 0 or not number.is_finite():
+        raise CatalogError(f"{label} invalide: {value}")
+    return number
+
+
+def _integer(value, label):
+    text = _text(value)
+    if not text:
+        return 0
+    try:
+        number = int(text)
+    except ValueError:
+        raise CatalogError(f"{label} invalide: {value}")
+    if number < 0:
+        raise CatalogError(f"{label} invalide: {value}")
+    return number
+
+
+def _boolean(value):
+    if isinstance(value, bool):
+        return value
+    return _text(value).lower() in TRUE_VALUES
+
+
+def _validate_fields(model, values):
+    """
+    Applique les validateurs des champs du modèle (longueur, précision des
+    décimaux, choix...) : une valeur hors contraintes devient une erreur de
+    ligne au lieu de faire échouer tout le lot à l'écriture. Les valeurs vides
+    restent acceptées comme avant (description ou pays vides).
+    """
+    opts = model._meta
+    for field_name, value in values.items():
+        model_field = opts.get_field(field_name)
+        if model_field.is_relation or value in model_field.empty_values:
+            continue
+        try:
+            model_field.clean(value, None)
+        except ValidationError as exc:
+            raise CatalogError(f"{model_field.verbose_name} invalide: {' '.join(exc.messages)}")
+
+
+class CatalogImporter:
+    """Importe un flux de lignes de catalogue par lots"""
+
+    def __init__(self, images_dir=None, chunk_size=1000, create_missing=False, dry_run=False, workers=4):
+        self.images_dir = Path(images_dir) if images_dir else None
+        self.chunk_size = chunk_size
+        self.create_missing = create_missing
+        self.dry_run = dry_run
+        self.workers = workers
+        self.report = ImportReport()
+
+        self.categories = {category.slug: category for category in Category.objects.all()}
+        self.teams = {team.slug: team for team in Team.objects.all()}
+        self.slugs = SlugAllocator(Product)
+        self.seen_slugs = set()
+
+    def run(self, rows):
+        rows = iter(rows)
+        while True:
+            chunk = list(islice(rows, self.chunk_size))
+            if not chunk:
+                break
+            self.import_chunk(chunk)
+
+        if not self.dry_run and (self.report.created or self.report.updated):
+            # bulk_create / bulk_update n'envoient pas post_save
+            catalog_changed(sender=Product)
+
+        logger.info('catalog_imported', extra={
+            'products_created': self.report.created,
+            'products_updated': self.report.updated,
+            'images': self.report.images,
+            'errors': len(self.report.errors),
+            'dry_run': self.dry_run,
+        })
+        return self.report
+
+    # Résolution des relations
+
+    def _related(self, mapping, model, value, row, column, label):
+        slug = slugify(_text(value))
+        if not slug:
+            raise CatalogError(f"{label} manquante")
+        if slug in mapping:
+            return mapping[slug]
+        if not self.create_missing:
+            raise CatalogError(f"{label} inconnue: {value}")
+
+        # Création à la volée (--create-missing), avec les colonnes facultatives
+        # category_name, team_name, team_country, team_league
+        name = _text(row.get(f'{column}_name')) or slug.replace('-', ' ').title()
+        instance = model(name=name, slug=slug)
+        if model is Team:
+            instance.country = _text(row.get('team_country'))
+            instance.league = _text(row.get('team_league'))
+        _validate_fields(model, {
+            field_name: getattr(instance, field_name)
+            for field_name in ('name', 'slug', 'country', 'league') if hasattr(instance, field_name)
+        })
+        if not self.dry_run:
+            instance.save()
+        mapping[slug] = instance
+        return instance
+
+    def clean(self, row):
+        """Retourne (slug, valeurs des champs présents, images) ou lève CatalogError"""
+        if row is None:
+            raise CatalogError("Ligne illisible")
+
+        slug = slugify(_text(row.get('slug')))
+        if slug and slug in self.seen_slugs:
+            raise CatalogError(f"Slug en double dans le fichier: {slug}")
+        if slug:
+            _validate_fields(Product, {'slug': slug})
+
+        values = {}
+        for column, field_name in COLUMN_FIELDS.items():
+            if column not in row:
+                continue
+            value = row[column]
+            if column == 'name':
+                value = _text(value)
+                if not value:
+                    raise CatalogError("Nom manquant")
+            elif column == 'category':
+                value = self._related(self.categories, Category, value, row, column, "Catégorie")
+            elif column == 'team':
+                value = self._related(self.teams, Team, value, row, column, "Équipe")
+            elif column == 'description':
+                value = _text(value)
+            elif column == 'price':
+                value = _decimal(value, "Prix", required=True)
+            elif column == 'sale_price':
+                value = _decimal(value, "Prix promo")
+            elif column == 'sizes':
+                value = [size.upper() for size in _list(value)]
+                unknown = [size for size in value if size not in VALID_SIZES]
+                if unknown:
+                    raise CatalogError(f"Tailles inconnues: {', '.join(unknown)}")
+            elif column == 'stock':
+                value = _integer(value, "Stock")
+            else:
+                value = _boolean(value)
+            values[field_name] = value
+
+        if values.get('sale_price') is not None and 'price' in values and values['sale_price'] >= values['price']:
+            values['sale_price'] = None
+
+        _validate_fields(Product, values)
+        return slug, values, _list(row.get('images'))
+
+    # Traitement d'un lot
+
+    def import_chunk(self, chunk):
+        valid = []
+        for line, row in chunk:
+            try:
+                slug, values, images = self.clean(row)
+            except CatalogError as exc:
+                self.report.add_error(line, str(exc))
+                continue
+            if slug:
+                self.seen_slugs.add(slug)
+            valid.append((line, slug, values, images))
+
+        existing = Product.objects.in_bulk([slug for _, slug, _, _ in valid if slug], field_name='slug')
+        now = timezone.now()
+        to_create, to_update, pending_images, slug_candidates = [], [], [], []
+        update_fields = {'updated_at'}
+        for line, slug, values, images in valid:
+            product = existing.get(slug)
+            if product is None:
+                missing = [column for column in REQUIRED_FOR_CREATE if COLUMN_FIELDS[column] not in values]
+                if missing:
+                    self.report.add_error(line, f"Colonnes obligatoires manquantes: {', '.join(missing)}")
+                    continue
+                product = Product()
+                to_create.append(product)
+                slug_candidates.append(slug or values['name'])
+            else:
+                update_fields.update(values)
+                to_update.append(product)
+            for field_name, value in values.items():
+                setattr(product, field_name, value)
+            product.updated_at = now
+            if images:
+                pending_images.append((line, product, images))
+
+        # Slugs uniques pour tout le lot en une requête (slug souhaité conservé s'il est libre)
+        for product, slug in zip(to_create, self.slugs.allocate_many(slug_candidates)):
+            product.slug = slug
+
+        self.report.created += len(to_create)
+        self.report.updated += len(to_update)
+        if self.dry_run:
+            return
+
+        with transaction.atomic():
+            Product.objects.bulk_create(to_create, batch_size=500)
+            if to_update:
+                Product.objects.bulk_update(to_update, sorted(update_fields), batch_size=500)
+
+        if pending_images and self.images_dir:
+            self.attach_images(pending_images)
+
+    # Images
+
+    def _store_image(self, filename):
+        path = self.images_dir / filename
+        with path.open('rb') as handle:
+            return default_storage.save(f"products/{path.name}", File(handle))
+
+    def attach_images(self, pending):
+        """Copie les fichiers en parallèle puis crée les ProductImage en une requête"""
+        # Les images ne sont ajoutées qu'aux produits qui n'en ont pas encore
+        with_images = set(
+            ProductImage.objects.filter(product__in=[product for _, product, _ in pending])
+            .values_list('product_id', flat=True).distinct()
+        )
+        jobs = [
+            (line, product, position, filename)
+            for line, product, images in pending if product.pk not in with_images
+            for position, filename in enumerate(images)
+        ]
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = [pool.submit(self._store_image, filename) for _, _, _, filename in jobs]
+
+        product_images = []
+        for (line, product, position, filename), future in zip(jobs, futures):
+            try:
+                stored = future.result()
+            except OSError as exc:
+                self.report.add_error(line, f"Image {filename}: {exc.strerror or exc}")
+                continue
+            product_images.append(ProductImage(
+                product=product, image=stored, alt_text=product.name,
+                is_primary=position == 0, order=position,
+            ))
+        ProductImage.objects.bulk_create(product_images, batch_size=500)
+        refresh_primary_images({image.product_id for image in product_images})
+        self.report.images += len(product_images)
+
+
+def import_catalog(stream, fmt='csv', **options):
+    """Importe un flux texte CSV/JSONL et retourne un ``ImportReport``"""
+    importer = CatalogImporter(**options)
+    return importer.run(read_rows(stream, fmt))
+
+
+# --- Export -------------------------------------------------------------------
+
+def catalog_records(products=None, chunk_size=1000):
+    """Produits au format d'import (listes pour ``sizes`` et ``images``)"""
+    if products is None:
+        products = Product.objects.order_by('pk')
+    products = products.select_related('category', 'team').prefetch_related('images')
+    for product in products.iterator(chunk_size=chunk_size):
+        yield {
+            'slug': product.slug,
+            'name': product.name,
+            'category': product.category.slug,
+            'team': product.team.slug,
+            'description': product.description,
+            'price': product.price,
+            'sale_price': product.sale_price,
+            'sizes': list(product.available_sizes or []),
+            'stock': product.stock_quantity,
+            'is_featured': product.is_featured,
+            'is_active': product.is_active,
+            'images': [Path(image.image.name).name for image in product.images.all()],
+        }
+
+
+def catalog_rows(products=None):
+    """Lignes à plat (CSV / XLSX) dans l'ordre de ``CATALOG_FIELDS``"""
+    for record in catalog_records(products):
+        yield [
+            LIST_SEPARATOR.join(value) if isinstance(value, list) else value
+            for value in (record[name] for name in CATALOG_FIELDS)
+        ]
+
+
+def export_catalog(stream, fmt='csv', products=None):
+    """Écrit le catalogue dans un flux texte; retourne le nombre de produits"""
+    count = 0
+    if fmt == 'jsonl':
+        for record in catalog_records(products):
+            stream.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+            count += 1
+        return count
+
+    writer = csv.writer(stream, delimiter=';')
+    writer.writerow(CATALOG_FIELDS)
+    for row in catalog_rows(products):
+        writer.writerow(['' if value is None else value for value in row])
+        count += 1
+    return count
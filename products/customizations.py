@@ -0,0 +1,85 @@
+"""
+Catalogue des options de personnalisation, en mémoire du processus
+
+Les options (``JerseyCustomization``) sont peu nombreuses et changent
+rarement : chaque worker les charge une fois, en une requête, et les garde
+en mémoire. Le catalogue porte la génération ``customizations`` du cache
+``catalog`` ; tout enregistrement ou suppression d'une option l'incrémente
+(``customizations_changed``), et chaque worker recharge son catalogue au
+prochain accès. Un accès sans changement ne coûte qu'une lecture du cache.
+"""
+import threading
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.cache import bump_generation, generation
+
+from .cache import CATALOG_CACHE
+from .models import JerseyCustomization
+
+CUSTOMIZATIONS_GENERATION = 'customizations'
+NAME_OPTION = 'Nom et Numéro'
+
+_lock = threading.Lock()
+_catalog = None
+
+
+def badge_option_name(badge_type):
+    return f"Badge {badge_type.title()}"
+
+
+class CustomizationCatalog:
+    """Options de personnalisation d'une génération donnée"""
+
+    def __init__(self, version, options):
+        self.version = version
+        self.options = {option.id: option for option in options}
+        self._by_key = {
+            (option.customization_type, option.badge_type, option.name): option for option in options
+        }
+
+    def __len__(self):
+        return len(self.options)
+
+    def get(self, option_id):
+        return self.options.get(option_id)
+
+    def in_bulk(self, option_ids):
+        """Comme ``QuerySet.in_bulk`` : {id: option} pour les ids connus"""
+        return {option_id: self.options[option_id] for option_id in option_ids if option_id in self.options}
+
+    def name_option(self):
+        """Option nom/numéro, créée si elle n'existe pas encore"""
+        option = self._by_key.get(('name', '', NAME_OPTION))
+        return option or JerseyCustomization.get_or_create_name_customization()
+
+    def badge_option(self, badge_type):
+        """Option badge de ``badge_type``, créée si elle n'existe pas encore"""
+        option = self._by_key.get(('badge', badge_type, badge_option_name(badge_type)))
+        return option or JerseyCustomization.get_or_create_badge_customization(badge_type)
+
+
+def customization_catalog():
+    """Catalogue du processus, rechargé si la génération a changé"""
+    global _catalog
+    version = generation(CUSTOMIZATIONS_GENERATION, cache=CATALOG_CACHE)
+    catalog = _catalog
+    if catalog is not None and catalog.version == version:
+        return catalog
+    with _lock:
+        if _catalog is None or _catalog.version != version:
+            _catalog = CustomizationCatalog(version, list(JerseyCustomization.objects.all()))
+        return _catalog
+
+
+def reset_customization_catalog():
+    """Oublie le catalogue du processus (rechargé au prochain accès)"""
+    global _catalog
+    _catalog = None
+
+
+@receiver([post_save, post_delete], sender=JerseyCustomization, dispatch_uid='customization_catalog_changed')
+def customizations_changed(sender, **kwargs):
+    bump_generation(CUSTOMIZATIONS_GENERATION, cache=CATALOG_CACHE)
+    reset_customization_catalog()
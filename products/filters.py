@@ -1,11 +1,20 @@
 import django_filters
-from .models import Product
+from .models import Category, Product, Team
+
+
+# Querysets construits à chaque requête (et non à l'import du module)
+def active_categories(request):
+    return Category.objects.filter(products__is_active=True).distinct()
+
+
+def active_teams(request):
+    return Team.objects.filter(products__is_active=True).distinct()
 
 
 class ProductFilter(django_filters.FilterSet):
     name = django_filters.CharFilter(lookup_expr='icontains', label='Nom du produit')
-    category = django_filters.ModelChoiceFilter(queryset=Product.objects.values_list('category', flat=True).distinct(), label='Catégorie')
-    team = django_filters.ModelChoiceFilter(queryset=Product.objects.values_list('team', flat=True).distinct(), label='Équipe')
+    category = django_filters.ModelChoiceFilter(queryset=active_categories, label='Catégorie')
+    team = django_filters.ModelChoiceFilter(queryset=active_teams, label='Équipe')
     min_price = django_filters.NumberFilter(field_name='price', lookup_expr='gte', label='Prix minimum')
     max_price = django_filters.NumberFilter(field_name='price', lookup_expr='lte', label='Prix maximum')
     on_sale = django_filters.BooleanFilter(method='filter_on_sale', label='En promotion')
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from products.models import Product, refresh_primary_images
+
+
+class Command(BaseCommand):
+    help = "Recalcule l'image principale dénormalisée (Product.primary_image) de tous les produits"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Produits mis à jour par requête")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        ids = Product.objects.order_by('pk').values_list('pk', flat=True)
+        last_pk, updated = 0, 0
+        while True:
+            batch = list(ids.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            updated += refresh_primary_images(batch)
+            last_pk = batch[-1]
+        missing = Product.objects.filter(primary_image__isnull=True).count()
+        self.stdout.write(self.style.SUCCESS(f"{updated} produits mis à jour, {missing} sans image"))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from products.catalog import detect_format, export_catalog
+
+
+class Command(BaseCommand):
+    help = "Exporte le catalogue de produits au format d'import (CSV ou JSONL)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', help="Fichier de sortie (sortie standard par défaut)")
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help="Format (déduit de l'extension par défaut)")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or (detect_format(path) if path else 'csv')
+        if path:
+            with open(path, 'w', encoding='utf-8', newline='') as stream:
+                count = export_catalog(stream, fmt)
+            self.stderr.write(self.style.SUCCESS(f"{count} produits exportés vers {path}"))
+        else:
+            export_catalog(self.stdout, fmt)
@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from products.catalog import detect_format, import_catalog
+
+
+class Command(BaseCommand):
+    help = "Importe un catalogue de produits (CSV ou JSONL) par lots"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Fichier CSV ou JSONL")
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help="Format (déduit de l'extension par défaut)")
+        parser.add_argument('--images-dir', help="Dossier contenant les images référencées par la colonne images")
+        parser.add_argument('--chunk-size', type=int, default=1000, help="Lignes traitées par lot")
+        parser.add_argument('--workers', type=int, default=4, help="Threads de copie des images")
+        parser.add_argument('--create-missing', action='store_true', help="Créer les équipes et catégories inconnues")
+        parser.add_argument('--dry-run', action='store_true', help="Valider le fichier sans rien écrire")
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or detect_format(options['path'])
+        started = time.monotonic()
+        try:
+            with open(options['path'], encoding='utf-8-sig', newline='') as stream:
+                report = import_catalog(
+                    stream, fmt,
+                    images_dir=options['images_dir'],
+                    chunk_size=options['chunk_size'],
+                    workers=options['workers'],
+                    create_missing=options['create_missing'],
+                    dry_run=options['dry_run'],
+                )
+        except OSError as exc:
+            raise CommandError(f"Impossible de lire {options['path']}: {exc}")
+
+        for line, message in report.errors[:50]:
+            self.stderr.write(f"Ligne {line}: {message}")
+        if len(report.errors) > 50:
+            self.stderr.write(f"... {len(report.errors) - 50} autres erreurs")
+
+        prefix = "[simulation] " if options['dry_run'] else ""
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}{report.created} produits créés, {report.updated} mis à jour, "
+            f"{report.images} images, {len(report.errors)} erreurs en {time.monotonic() - started:.1f}s"
+        ))
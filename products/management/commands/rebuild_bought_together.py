@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from products.recommendations import BOUGHT_TOGETHER_N, rebuild_bought_together
+
+
+class Command(BaseCommand):
+    help = "Recalcule les produits souvent achetés ensemble à partir des commandes payées (à lancer la nuit par cron)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=BOUGHT_TOGETHER_N, help="Paires conservées par produit")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Lignes insérées par requête")
+
+    def handle(self, *args, **options):
+        count = rebuild_bought_together(top_n=options['top'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"{count} paires enregistrées"))
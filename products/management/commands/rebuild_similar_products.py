@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from products.recommendations import last_rebuild, rebuild_similar_products, stale_products
+
+
+class Command(BaseCommand):
+    help = "Recalcule les produits similaires (incrémental par défaut, à lancer par cron)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help="Recalculer tous les produits")
+        parser.add_argument('--since', help="Date ISO de départ du mode incrémental (dernier calcul par défaut)")
+        parser.add_argument('--batch-size', type=int, default=500, help="Produits traités par lot")
+
+    def parse_since(self, value):
+        try:
+            since = parse_datetime(value)
+        except ValueError:
+            since = None
+        if since is None:
+            raise CommandError(f"Date --since invalide: {value} (format attendu: 2024-01-31T08:00)")
+        return timezone.make_aware(since) if timezone.is_naive(since) else since
+
+    def handle(self, *args, **options):
+        since = self.parse_since(options['since']) if options['since'] else last_rebuild()
+        if options['full'] or since is None:
+            count = rebuild_similar_products(batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f"{count} produits recalculés (complet)"))
+            return
+
+        product_ids = stale_products(since)
+        count = rebuild_similar_products(product_ids, batch_size=options['batch_size']) if product_ids else 0
+        self.stdout.write(self.style.SUCCESS(f"{count} produits recalculés depuis {since:%Y-%m-%d %H:%M}"))
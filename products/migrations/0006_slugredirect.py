@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-19 13:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_product_sales_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlugRedirect',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('product', 'Produit'), ('category', 'Catégorie'), ('team', 'Équipe')], max_length=20, verbose_name='Type')),
+                ('old_slug', models.SlugField(max_length=200, verbose_name='Ancien slug')),
+                ('new_slug', models.SlugField(max_length=200, verbose_name='Nouveau slug')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Créé le')),
+            ],
+            options={
+                'verbose_name': 'Redirection de slug',
+                'verbose_name_plural': 'Redirections de slugs',
+                'unique_together': {('kind', 'old_slug')},
+            },
+        ),
+    ]
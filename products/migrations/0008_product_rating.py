@@ -0,0 +1,44 @@
+# Generated by Django 4.2.7 on 2026-10-19 13:10
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce, Greatest
+
+
+def backfill_ratings(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    Review = apps.get_model('products', 'Review')
+    reviews = Review.objects.filter(product=OuterRef('pk')).order_by().values('product')
+    count = Coalesce(Subquery(reviews.annotate(value=Count('pk')).values('value')), 0)
+    total = Coalesce(Subquery(reviews.annotate(value=Sum('rating')).values('value')), 0)
+    Product.objects.update(
+        rating_count=count,
+        rating_sum=total,
+        rating_avg=Cast(total, models.FloatField()) / Greatest(count, Value(1)),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0007_product_primary_image'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='rating_avg',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=3, verbose_name='Note moyenne'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, verbose_name="Nombre d'avis"),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, verbose_name='Somme des notes'),
+        ),
+        migrations.RunPython(backfill_ratings, migrations.RunPython.noop),
+    ]
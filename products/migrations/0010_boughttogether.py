@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-19 13:15
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0009_similarproduct'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BoughtTogether',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('orders', models.PositiveIntegerField(default=0, verbose_name='Commandes communes')),
+                ('other', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bought_with', to='products.product', verbose_name='Acheté avec')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bought_together', to='products.product', verbose_name='Produit')),
+            ],
+            options={
+                'verbose_name': 'Achat conjoint',
+                'verbose_name_plural': 'Achats conjoints',
+                'indexes': [models.Index(fields=['product', '-orders'], name='products_bt_top_idx')],
+                'unique_together': {('product', 'other')},
+            },
+        ),
+    ]
@@ -1,10 +1,68 @@
-from django.db import models
+from decimal import Decimal
+
+from django.db import models, transaction
+from django.db.models import Count, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce, Greatest
 from django.urls import reverse
-from django.utils.text import slugify
 from django.core.validators import MinValueValidator, MaxValueValidator
 
+from .slugs import unique_slug
+
+
+class SlugRedirect(models.Model):
+    """Ancien slug conservé après un renommage, pour rediriger les liens existants"""
+    KINDS = [
+        ('product', 'Produit'),
+        ('category', 'Catégorie'),
+        ('team', 'Équipe'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KINDS, verbose_name="Type")
+    old_slug = models.SlugField(max_length=200, verbose_name="Ancien slug")
+    new_slug = models.SlugField(max_length=200, verbose_name="Nouveau slug")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Créé le")
+
+    class Meta:
+        verbose_name = "Redirection de slug"
+        verbose_name_plural = "Redirections de slugs"
+        unique_together = ['kind', 'old_slug']
+
+    def __str__(self):
+        return f"{self.old_slug} -> {self.new_slug}"
+
+    @classmethod
+    def record(cls, kind, old_slug, new_slug):
+        """Enregistre un renommage en aplatissant les chaînes de redirections"""
+        cls.objects.filter(kind=kind, new_slug=old_slug).update(new_slug=new_slug)
+        cls.objects.filter(kind=kind, old_slug=new_slug).delete()
+        cls.objects.update_or_create(kind=kind, old_slug=old_slug, defaults={'new_slug': new_slug})
+
+    @classmethod
+    def resolve(cls, kind, slug):
+        return cls.objects.filter(kind=kind, old_slug=slug).values_list('new_slug', flat=True).first()
+
+
+class SluggedModel:
+    """Slug unique attribué à la création et redirection gardée en cas de renommage"""
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._saved_slug = instance.__dict__.get('slug')
+        return instance
+
+    def save(self, *args, **kwargs):
+        if not self.slug:
+            self.slug = unique_slug(self, self.name)
+        super().save(*args, **kwargs)
+
+        saved_slug = getattr(self, '_saved_slug', None)
+        if saved_slug and saved_slug != self.slug:
+            SlugRedirect.record(self._meta.model_name, saved_slug, self.slug)
+        self._saved_slug = self.slug
 
-class Category(models.Model):
+
+class Category(SluggedModel, models.Model):
     name = models.CharField(max_length=200, verbose_name="Nom")
     slug = models.SlugField(max_length=200, unique=True, verbose_name="Slug")
     description = models.TextField(blank=True, verbose_name="Description")
@@ -20,16 +78,11 @@ class Category(models.Model):
     def __str__(self):
         return self.name
 
-    def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = slugify(self.name)
-        super().save(*args, **kwargs)
-
     def get_absolute_url(self):
         return reverse('products:category_detail', args=[self.slug])
 
 
-class Team(models.Model):
+class Team(SluggedModel, models.Model):
     name = models.CharField(max_length=200, verbose_name="Nom de l'équipe")
     slug = models.SlugField(max_length=200, unique=True, verbose_name="Slug")
     country = models.CharField(max_length=100, verbose_name="Pays")
@@ -45,13 +98,8 @@ class Team(models.Model):
     def __str__(self):
         return self.name
 
-    def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = slugify(self.name)
-        super().save(*args, **kwargs)
-
 
-class Product(models.Model):
+class Product(SluggedModel, models.Model):
     SIZES = [
         ('XS', 'Extra Small'),
         ('S', 'Small'),
@@ -61,10 +109,16 @@ class Product(models.Model):
         ('XXL', '2XL'),
         ('XXXL', '3XL'),
     ]
+    DENORMALIZED_FIELDS = ('primary_image', 'sales_count', 'rating_avg', 'rating_count', 'rating_sum')
 
     name = models.CharField(max_length=200, verbose_name="Nom")
     slug = models.SlugField(max_length=200, unique=True, verbose_name="Slug")
     image = models.ImageField(upload_to='products/', blank=True, null=True, verbose_name="Image du produit")
+    # Image affichée dans les listes, maintenue par ProductImage.save/delete
+    primary_image = models.ForeignKey(
+        'ProductImage', on_delete=models.SET_NULL, null=True, blank=True, editable=False,
+        related_name='+', verbose_name="Image principale"
+    )
     category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='products', verbose_name="Catégorie")
     team = models.ForeignKey(Team, on_delete=models.CASCADE, related_name='products', verbose_name="Équipe")
     description = models.TextField(verbose_name="Description")
@@ -72,6 +126,12 @@ class Product(models.Model):
     sale_price = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True, verbose_name="Prix en promotion")
     available_sizes = models.JSONField(default=list, verbose_name="Tailles disponibles")
     stock_quantity = models.PositiveIntegerField(default=0, verbose_name="Quantité en stock")
+    # Maintenu par orders.transitions
+    sales_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="Nombre de ventes")
+    # Agrégats des avis, maintenus par Review.save/delete
+    rating_avg = models.DecimalField(max_digits=3, decimal_places=2, default=0, editable=False, verbose_name="Note moyenne")
+    rating_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="Nombre d'avis")
+    rating_sum = models.PositiveIntegerField(default=0, editable=False, verbose_name="Somme des notes")
     is_featured = models.BooleanField(default=False, verbose_name="Produit vedette")
     is_active = models.BooleanField(default=True, verbose_name="Actif")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Créé le")
@@ -86,13 +146,24 @@ class Product(models.Model):
         return self.name
 
     def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = slugify(self.name)
+        # Les champs dénormalisés ne sont écrits que par des UPDATE ciblés
+        # (F(), sous-requêtes) : une sauvegarde complète d'une instance chargée
+        # plus tôt (admin, dashboard) écraserait des valeurs plus récentes.
+        if not self._state.adding and not args and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                model_field.name for model_field in self._meta.concrete_fields
+                if not model_field.primary_key and model_field.name not in self.DENORMALIZED_FIELDS
+            ]
         super().save(*args, **kwargs)
 
     def get_absolute_url(self):
         return reverse('products:product_detail', args=[self.slug])
 
+    @property
+    def image_url(self):
+        """URL de l'image principale (chaîne vide si le produit n'a pas d'image)"""
+        return self.primary_image.image.url if self.primary_image_id else ''
+
     @property
     def current_price(self):
         """Retourne le prix actuel (promotion ou prix normal)"""
@@ -110,6 +181,11 @@ class Product(models.Model):
         """Vérifie si le produit est en promotion"""
         return bool(self.sale_price and self.sale_price < self.price)
 
+    @property
+    def rating_stars(self):
+        """Note moyenne arrondie à l'étoile la plus proche"""
+        return int(self.rating_avg + Decimal('0.5')) if self.rating_count else 0
+
     @property
     def is_available(self):
         """Vérifie si le produit est disponible (en stock et actif)"""
@@ -147,6 +223,56 @@ class ProductImage(models.Model):
             # Désactiver les autres images principales pour ce produit
             ProductImage.objects.filter(product=self.product, is_primary=True).update(is_primary=False)
         super().save(*args, **kwargs)
+        refresh_primary_images([self.product_id])
+
+
+def primary_image_subquery():
+    """Image principale d'un produit: celle marquée principale, sinon la première affichée"""
+    return Subquery(
+        ProductImage.objects.filter(product=OuterRef('pk'))
+        .order_by('-is_primary', 'order', 'created_at')
+        .values('pk')[:1]
+    )
+
+
+def refresh_primary_images(product_ids=None):
+    """Recalcule ``Product.primary_image`` en une requête UPDATE (tous les produits si None)"""
+    products = Product.objects.all() if product_ids is None else Product.objects.filter(pk__in=product_ids)
+    return products.update(primary_image=primary_image_subquery())
+
+
+class SimilarProduct(models.Model):
+    """Voisin précalculé d'un produit (voir products.recommendations)"""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='neighbours', verbose_name="Produit")
+    similar = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='similar_to', verbose_name="Produit similaire")
+    rank = models.PositiveSmallIntegerField(verbose_name="Rang")
+    score = models.FloatField(verbose_name="Score")
+    computed_at = models.DateTimeField(verbose_name="Calculé le")
+
+    class Meta:
+        verbose_name = "Produit similaire"
+        verbose_name_plural = "Produits similaires"
+        ordering = ['product', 'rank']
+        unique_together = ['product', 'rank']
+
+    def __str__(self):
+        return f"{self.product_id} -> {self.similar_id} (#{self.rank})"
+
+
+class BoughtTogether(models.Model):
+    """Nombre de commandes payées contenant deux produits (voir products.recommendations)"""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='bought_together', verbose_name="Produit")
+    other = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='bought_with', verbose_name="Acheté avec")
+    orders = models.PositiveIntegerField(default=0, verbose_name="Commandes communes")
+
+    class Meta:
+        verbose_name = "Achat conjoint"
+        verbose_name_plural = "Achats conjoints"
+        unique_together = ['product', 'other']
+        indexes = [models.Index(fields=['product', '-orders'], name='products_bt_top_idx')]
+
+    def __str__(self):
+        return f"{self.product_id} + {self.other_id} ({self.orders})"
 
 
 class Review(models.Model):
@@ -169,6 +295,41 @@ class Review(models.Model):
     def __str__(self):
         return f"Avis de {self.user.username} sur {self.product.name}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._saved_rating = instance.__dict__.get('rating')
+        return instance
+
+    def save(self, *args, **kwargs):
+        # Agrégats du produit mis à jour dans la même transaction (products.signals)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+
+def rating_average(count, total):
+    return Cast(total, models.FloatField()) / Greatest(count, Value(1))
+
+
+def apply_rating_delta(product_id, count_delta, sum_delta):
+    """Met à jour les agrégats d'avis d'un produit en une requête, sans relire les avis"""
+    count = F('rating_count') + count_delta
+    total = F('rating_sum') + sum_delta
+    Product.objects.filter(pk=product_id).update(
+        rating_count=count,
+        rating_sum=total,
+        rating_avg=rating_average(count, total),
+    )
+
+
+def refresh_ratings(product_ids=None):
+    """Recalcule les agrégats d'avis depuis la table des avis (tous les produits si None)"""
+    reviews = Review.objects.filter(product=OuterRef('pk')).order_by().values('product')
+    count = Coalesce(Subquery(reviews.annotate(value=Count('pk')).values('value')), 0)
+    total = Coalesce(Subquery(reviews.annotate(value=Sum('rating')).values('value')), 0)
+    products = Product.objects.all() if product_ids is None else Product.objects.filter(pk__in=product_ids)
+    return products.update(rating_count=count, rating_sum=total, rating_avg=rating_average(count, total))
+
 
 class JerseyCustomization(models.Model):
     """Options de personnalisation pour les maillots"""
@@ -215,6 +376,14 @@ class JerseyCustomization(models.Model):
         else:
             return f"{self.name} ({self.price} FCFA)"
     
+    def price_for(self, custom_text='', quantity=1):
+        """Prix de cette option pour un texte donné"""
+        if self.customization_type == 'name' and custom_text:
+            # Pour les noms/numéros, le prix dépend du nombre de caractères
+            return self.price * len(custom_text) * quantity
+        # Pour les badges, prix fixe
+        return self.price * quantity
+    
     @classmethod
     def get_or_create_name_customization(cls):
         """Récupérer ou créer l'option de personnalisation nom/numéro"""
@@ -270,12 +439,10 @@ class CartItemCustomization(models.Model):
         else:
             return f"{self.customization.name} sur {self.cart_item.product.name}"
     
+    def compute_price(self):
+        """Prix total de la personnalisation"""
+        return self.customization.price_for(self.custom_text, self.quantity)
+
     def save(self, *args, **kwargs):
-        # Calculer le prix total
-        if self.customization.customization_type == 'name' and self.custom_text:
-            # Pour les noms/numéros, le prix dépend du nombre de caractères
-            self.price = self.customization.price * len(self.custom_text) * self.quantity
-        else:
-            # Pour les badges, prix fixe
-            self.price = self.customization.price * self.quantity
+        self.price = self.compute_price()
         super().save(*args, **kwargs)
@@ -0,0 +1,362 @@
+"""
+Produits similaires précalculés
+
+``rebuild_similar_products`` calcule pour chaque produit actif ses
+``SIMILAR_PRODUCTS_K`` voisins les plus proches et les enregistre dans
+``SimilarProduct``. La page produit lit ensuite ces voisins par clé, sans
+parcourir le catalogue.
+
+Score d'un voisin ::
+
+    3 × même équipe + 2 × même catégorie + 1 × même ligue
+    + 1.5 × log(1 + nombre de commandes payées contenant les deux produits)
+
+Les candidats d'un produit sont limités à son équipe, aux produits les plus
+vendus de sa catégorie et de sa ligue, et aux produits achetés avec lui : le
+coût par produit ne dépend pas de la taille du catalogue. Le calcul se fait
+par lots de produits, avec une requête d'achats conjoints par lot.
+
+En mode incrémental, seuls les produits modifiés ou commandés depuis le
+dernier calcul sont recalculés, avec les produits dont ils peuvent changer les
+voisins (``stale_products``).
+
+Souvent achetés ensemble
+------------------------
+
+``rebuild_bought_together`` fait compter les paires de produits des commandes
+payées par la base, en une requête d'agrégation (auto-jointure des lignes de
+commande), hors transaction et sans verrou ; seules les
+``BOUGHT_TOGETHER_N`` meilleures paires de chaque produit sont gardées en
+mémoire, produit par produit. Entre deux recalculs, chaque commande payée
+incrémente ses paires (``record_bought_together``, signal ``order_paid``,
+dans la transaction du paiement).
+
+Le comptage s'arrête aux commandes payées avant ``maintenant -
+REAPPLY_WINDOW``. Le remplacement de la table se fait ensuite sous le verrou
+d'écriture de ``BoughtTogether`` (``lock_bought_together``), le temps de
+recompter les commandes payées depuis (peu nombreuses), de supprimer
+l'ancienne table et d'insérer la nouvelle : un paiement validé avant le
+verrou est recompté, un paiement validé après incrémente la nouvelle table ;
+aucune paire n'est perdue ni comptée deux fois tant qu'une transaction de
+paiement dure moins de ``REAPPLY_WINDOW``. Les paniers de plus de
+``MAX_BASKET_SIZE`` produits distincts sont ignorés : leur nombre de paires
+est quadratique et ils n'apportent pas d'information utile.
+"""
+import heapq
+import logging
+import math
+from collections import defaultdict
+from datetime import timedelta
+from itertools import groupby, islice
+from operator import itemgetter
+
+from django.db import connections, router, transaction
+from django.db.models import Count, F, Max, Q, Sum
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.db import write_atomic
+from orders.models import Order, OrderItem
+from orders.signals import order_paid
+from .models import BoughtTogether, Product, SimilarProduct
+
+logger = logging.getLogger(__name__)
+
+SIMILAR_PRODUCTS_K = 8
+# Nombre de meilleurs vendeurs de la catégorie / ligue retenus comme candidats
+CANDIDATE_POOL = 50
+WEIGHT_TEAM = 3.0
+WEIGHT_CATEGORY = 2.0
+WEIGHT_LEAGUE = 1.0
+WEIGHT_COPURCHASE = 1.5
+
+BOUGHT_TOGETHER_N = 20
+MAX_BASKET_SIZE = 30
+# Durée maximale entre la date de paiement d'une commande et la validation de
+# sa transaction : les commandes plus récentes sont recomptées sous le verrou
+REAPPLY_WINDOW = timedelta(minutes=10)
+
+
+class CatalogIndex:
+    """Produits actifs regroupés par équipe, catégorie et ligue (meilleures ventes d'abord)"""
+
+    def __init__(self, rows):
+        self.info = {}
+        self.by_team = defaultdict(list)
+        self.by_category = defaultdict(list)
+        self.by_league = defaultdict(list)
+        for pk, team_id, category_id, league, sales in sorted(rows, key=lambda row: (-row[4], row[0])):
+            self.info[pk] = (team_id, category_id, league, sales)
+            self.by_team[team_id].append(pk)
+            self.by_category[category_id].append(pk)
+            if league:
+                self.by_league[league].append(pk)
+
+    @classmethod
+    def load(cls):
+        return cls(
+            Product.objects.filter(is_active=True).order_by()
+            .values_list('pk', 'team_id', 'category_id', 'team__league', 'sales_count')
+        )
+
+    def neighbours(self, pk, copurchased, k=SIMILAR_PRODUCTS_K):
+        """Les ``k`` meilleurs voisins de ``pk``: liste de (id, score)"""
+        team_id, category_id, league, _ = self.info[pk]
+        candidates = set(self.by_team[team_id])
+        candidates.update(self.by_category[category_id][:CANDIDATE_POOL])
+        if league:
+            candidates.update(self.by_league[league][:CANDIDATE_POOL])
+        candidates.update(other for other in copurchased if other in self.info)
+        candidates.discard(pk)
+
+        scored = []
+        for other in candidates:
+            other_team, other_category, other_league, sales = self.info[other]
+            score = (
+                WEIGHT_TEAM * (other_team == team_id)
+                + WEIGHT_CATEGORY * (other_category == category_id)
+                + WEIGHT_LEAGUE * bool(league and other_league == league)
+                + WEIGHT_COPURCHASE * math.log1p(copurchased.get(other, 0))
+            )
+            scored.append((score, sales, -other))
+        return [(-other, score) for score, _, other in heapq.nlargest(k, scored)]
+
+
+def copurchase_counts(product_ids):
+    """Nombre de commandes payées communes: {produit: {autre produit: commandes}}"""
+    counts = defaultdict(dict)
+    rows = BoughtTogether.objects.filter(product_id__in=product_ids).values_list('product_id', 'other_id', 'orders')
+    for product_id, other_id, orders in rows:
+        counts[product_id][other_id] = orders
+    return counts
+
+
+def stale_products(since, index=None):
+    """
+    Produits à recalculer depuis ``since`` : les produits modifiés ou commandés,
+    les autres produits de leurs équipes, les produits dont la liste de voisins
+    contenait un produit modifié, et, pour un produit modifié parmi les
+    meilleures ventes de sa catégorie ou de sa ligue (donc candidat de tous ses
+    produits), toute cette catégorie ou ligue.
+    """
+    changed = set(Product.objects.filter(updated_at__gte=since).values_list('pk', flat=True))
+    changed.update(
+        OrderItem.objects.filter(order__paid_at__gte=since)
+        .values_list('product_id', flat=True).distinct()
+    )
+    if not changed:
+        return changed
+
+    stale = set(changed)
+    teams = Product.objects.filter(pk__in=changed).values('team_id')
+    stale.update(Product.objects.filter(team_id__in=teams).values_list('pk', flat=True))
+    stale.update(
+        SimilarProduct.objects.filter(similar_id__in=changed)
+        .values_list('product_id', flat=True).distinct()
+    )
+
+    index = index or CatalogIndex.load()
+    for pk in changed & index.info.keys():
+        _, category_id, league, _ = index.info[pk]
+        peers = index.by_category[category_id]
+        if pk in peers[:CANDIDATE_POOL]:
+            stale.update(peers)
+        peers = index.by_league[league] if league else []
+        if pk in peers[:CANDIDATE_POOL]:
+            stale.update(peers)
+    return stale
+
+
+def last_rebuild():
+    return SimilarProduct.objects.aggregate(last=Max('computed_at'))['last']
+
+
+def rebuild_similar_products(product_ids=None, batch_size=500, k=SIMILAR_PRODUCTS_K):
+    """
+    Recalcule les voisins de ``product_ids`` (tous les produits actifs si None).
+    Retourne le nombre de produits traités.
+    """
+    started = timezone.now()
+    index = CatalogIndex.load()
+    if product_ids is None:
+        targets = list(index.info)
+        SimilarProduct.objects.exclude(product_id__in=targets).delete()
+    else:
+        targets = [pk for pk in product_ids if pk in index.info]
+        SimilarProduct.objects.filter(product_id__in=set(product_ids) - set(targets)).delete()
+
+    targets = iter(sorted(targets))
+    processed = 0
+    while True:
+        batch = list(islice(targets, batch_size))
+        if not batch:
+            break
+        copurchases = copurchase_counts(batch)
+        rows = [
+            SimilarProduct(product_id=pk, similar_id=other, rank=rank, score=score, computed_at=started)
+            for pk in batch
+            for rank, (other, score) in enumerate(index.neighbours(pk, copurchases.get(pk, {}), k))
+        ]
+        with transaction.atomic():
+            SimilarProduct.objects.filter(product_id__in=batch).delete()
+            SimilarProduct.objects.bulk_create(rows, batch_size=1000)
+        processed += len(batch)
+
+    logger.info('similar_products_rebuilt', extra={
+        'products': processed,
+        'full': product_ids is None,
+        'duration_ms': int((timezone.now() - started).total_seconds() * 1000),
+    })
+    return processed
+
+
+def similar_products_for(product, limit=4):
+    """Voisins précalculés d'un produit, dans l'ordre du score"""
+    return (
+        Product.objects
+        .filter(similar_to__product=product, is_active=True)
+        .order_by('similar_to__rank')[:limit]
+    )
+
+
+def paid_baskets(since, chunk_size=5000):
+    """Produits distincts de chaque commande payée depuis ``since``, commande par commande"""
+    lines = (
+        OrderItem.objects.filter(order__payment_status='paid', order__paid_at__gte=since)
+        .order_by('order_id')
+        .values_list('order_id', 'product_id')
+        .iterator(chunk_size=chunk_size)
+    )
+    order_id, basket = None, set()
+    for line_order_id, product_id in lines:
+        if line_order_id != order_id:
+            if basket:
+                yield basket
+            order_id, basket = line_order_id, set()
+        basket.add(product_id)
+    if basket:
+        yield basket
+
+
+def basket_pairs(basket):
+    """Paires ordonnées (produit, autre) d'un panier, aucune si sa taille est hors limites"""
+    if len(basket) < 2 or len(basket) > MAX_BASKET_SIZE:
+        return []
+    return [(product_id, other_id) for product_id in basket for other_id in basket if other_id != product_id]
+
+
+def lock_bought_together():
+    """
+    Verrou d'écriture de ``BoughtTogether`` jusqu'à la fin de la transaction.
+    Les incréments (UPDATE/INSERT) des paiements attendent sa libération, et
+    il attend les paiements en cours qui ont déjà incrémenté des paires.
+    Sous SQLite, le verrou de la base pris par ``write_atomic`` suffit.
+    """
+    connection = connections[router.db_for_write(BoughtTogether)]
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(f'LOCK TABLE {BoughtTogether._meta.db_table} IN SHARE ROW EXCLUSIVE MODE')
+
+
+def count_bought_together(cutoff, chunk_size=5000):
+    """
+    Paires des commandes payées avant ``cutoff``, comptées par la base en une
+    requête : (produit, autre, commandes), par produit puis du plus au moins
+    fréquent.
+    """
+    paid = Q(order__paid_at__lt=cutoff) | Q(order__paid_at__isnull=True)
+    baskets = (
+        OrderItem.objects.filter(paid, order__payment_status='paid').order_by()
+        .values('order_id')
+        .annotate(size=Count('product_id', distinct=True))
+        .filter(size__gte=2, size__lte=MAX_BASKET_SIZE)
+        .values('order_id')
+    )
+    return (
+        OrderItem.objects.filter(order_id__in=baskets)
+        .annotate(other=F('order__items__product_id'))
+        .filter(Q(other__lt=F('product_id')) | Q(other__gt=F('product_id')))
+        .values('product_id', 'other')
+        .annotate(orders=Count('order_id', distinct=True))
+        .order_by('product_id', '-orders', 'other')
+        .values_list('product_id', 'other', 'orders')
+        .iterator(chunk_size=chunk_size)
+    )
+
+
+def top_pairs(pairs, top_n):
+    """Les ``top_n`` premières paires de chaque produit d'un flux trié par produit"""
+    for _, rows in groupby(pairs, key=itemgetter(0)):
+        yield from islice(rows, top_n)
+
+
+def rebuild_bought_together(top_n=BOUGHT_TOGETHER_N, batch_size=1000):
+    """Recalcule toutes les paires achetées ensemble. Retourne le nombre de paires enregistrées."""
+    started = timezone.now()
+    cutoff = started - REAPPLY_WINDOW
+
+    # Comptage hors transaction : aucun verrou pendant le parcours des commandes
+    counts = {
+        (product_id, other_id): orders
+        for product_id, other_id, orders in top_pairs(count_bought_together(cutoff), top_n)
+    }
+
+    with write_atomic():
+        # Sous le verrou des incréments : les commandes payées depuis ``cutoff``
+        # (non comptées ci-dessus) sont ajoutées, les suivantes incrémenteront
+        # la nouvelle table.
+        lock_bought_together()
+        reapplied = 0
+        for basket in paid_baskets(cutoff):
+            reapplied += 1
+            for pair in basket_pairs(basket):
+                counts[pair] = counts.get(pair, 0) + 1
+        BoughtTogether.objects.all().delete()
+        BoughtTogether.objects.bulk_create([
+            BoughtTogether(product_id=product_id, other_id=other_id, orders=orders)
+            for (product_id, other_id), orders in counts.items()
+        ], batch_size=batch_size)
+
+    logger.info('bought_together_rebuilt', extra={
+        'pairs': len(counts),
+        'reapplied_orders': reapplied,
+        'duration_ms': int((timezone.now() - started).total_seconds() * 1000),
+    })
+    return len(counts)
+
+
+def record_bought_together(order):
+    """Ajoute les paires d'une commande payée (les paires hors top N sont élaguées au recalcul)"""
+    basket = set(order.items.values_list('product_id', flat=True))
+    pairs = basket_pairs(basket)
+    if not pairs:
+        return
+    with transaction.atomic():
+        matching = BoughtTogether.objects.filter(product_id__in=basket, other_id__in=basket)
+        existing = set(matching.values_list('product_id', 'other_id'))
+        matching.update(orders=F('orders') + 1)
+        BoughtTogether.objects.bulk_create([
+            BoughtTogether(product_id=product_id, other_id=other_id, orders=1)
+            for product_id, other_id in pairs
+            if (product_id, other_id) not in existing
+        ], ignore_conflicts=True)
+
+
+@receiver(order_paid, sender=Order)
+def order_paid_bought_together(sender, order, **kwargs):
+    """Met à jour les achats conjoints sans bloquer la confirmation du paiement"""
+    try:
+        record_bought_together(order)
+    except Exception:
+        logger.exception('bought_together_update_failed', extra={'order_id': order.pk})
+
+
+def bought_together_for(product_ids, limit=4):
+    """Produits le plus souvent achetés avec ``product_ids`` (hors ``product_ids``)"""
+    return (
+        Product.objects
+        .filter(bought_with__product_id__in=product_ids, is_active=True)
+        .exclude(pk__in=product_ids)
+        .annotate(together=Sum('bought_with__orders'))
+        .order_by('-together', 'pk')[:limit]
+    )
@@ -1,93 +1,62 @@
-from django.db.models.signals import post_save
-from django.dispatch import receiver
+"""
+Champs dénormalisés des produits tenus à jour par signaux
+
+Les signaux ``post_delete`` sont envoyés pour chaque objet, y compris lors
+des suppressions en masse (``QuerySet.delete()``, action « supprimer » de
+l'admin) et des cascades, contrairement aux surcharges de ``delete()``.
+
+- ``Product.primary_image`` : la suppression d'une image la met à NULL
+  (``on_delete``) ; les produits touchés sont recalculés en un seul UPDATE
+  à la validation de la transaction.
+- ``Product.rating_count``, ``rating_sum`` et ``rating_avg`` : chaque avis
+  créé, modifié ou supprimé applique sa variation en une requête, dans la
+  transaction de l'écriture (``apply_rating_delta``).
+"""
+import threading
+
 from django.db import transaction
-from .models import Product
-from orders.models import Order, OrderItem
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import ProductImage, Review, apply_rating_delta, refresh_primary_images
+
+_pending = threading.local()
+
+
+def _pending_products():
+    if not hasattr(_pending, 'product_ids'):
+        _pending.product_ids = set()
+    return _pending.product_ids
+
+
+def _refresh_pending_primary_images():
+    product_ids = _pending_products()
+    if product_ids:
+        _pending.product_ids = set()
+        refresh_primary_images(product_ids)
+
+
+@receiver(post_delete, sender=ProductImage, dispatch_uid='product_image_deleted')
+def product_image_deleted(sender, instance, **kwargs):
+    _pending_products().add(instance.product_id)
+    # Un rappel par image, mais le premier exécuté recalcule tous les produits
+    transaction.on_commit(_refresh_pending_primary_images)
+
 
-@receiver(post_save, sender=Order)
-def update_product_stock_on_order(sender, instance, created, **kwargs):
-    """
-    Met à jour automatiquement le stock des produits lors de la création/modification d'une commande
-    """
-    if created or instance.status in ['confirmed', 'shipped', 'delivered']:
-        # Récupérer tous les articles de la commande
-        order_items = OrderItem.objects.filter(order=instance)
-        
-        with transaction.atomic():
-            for item in order_items:
-                try:
-                    # Récupérer le produit
-                    product = Product.objects.get(id=item.product_id)
-                    
-                    # Mettre à jour le stock
-                    if instance.status in ['confirmed', 'shipped', 'delivered']:
-                        # Diminuer le stock lors de la confirmation/expédition/livraison
-                        new_stock = max(0, product.stock_quantity - item.quantity)
-                        product.stock_quantity = new_stock
-                        
-                        # Marquer le produit comme en rupture si le stock est à 0
-                        if new_stock == 0:
-                            product.is_active = False
-                        
-                        product.save()
-                        
-                        print(f"Stock mis à jour pour {product.name}: {new_stock} restants")
-                    
-                except Product.DoesNotExist:
-                    print(f"Produit {item.product_id} non trouvé")
-                except Exception as e:
-                    print(f"Erreur lors de la mise à jour du stock: {e}")
+@receiver(post_save, sender=Review, dispatch_uid='review_saved')
+def review_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    saved_rating = getattr(instance, '_saved_rating', None)
+    if created:
+        apply_rating_delta(instance.product_id, 1, instance.rating)
+    elif saved_rating is not None and saved_rating != instance.rating:
+        apply_rating_delta(instance.product_id, 0, instance.rating - saved_rating)
+    instance._saved_rating = instance.rating
 
-@receiver(post_save, sender=Order)
-def restore_stock_on_cancellation(sender, instance, **kwargs):
-    """
-    Restaure le stock si une commande est annulée
-    """
-    if instance.status == 'cancelled':
-        # Récupérer tous les articles de la commande
-        order_items = OrderItem.objects.filter(order=instance)
-        
-        with transaction.atomic():
-            for item in order_items:
-                try:
-                    # Récupérer le produit
-                    product = Product.objects.get(id=item.product_id)
-                    
-                    # Restaurer le stock
-                    product.stock_quantity += item.quantity
-                    
-                    # Réactiver le produit s'il était en rupture
-                    if not product.is_active and product.stock_quantity > 0:
-                        product.is_active = True
-                    
-                    product.save()
-                    
-                    print(f"Stock restauré pour {product.name}: {product.stock_quantity} disponibles")
-                    
-                except Product.DoesNotExist:
-                    print(f"Produit {item.product_id} non trouvé")
-                except Exception as e:
-                    print(f"Erreur lors de la restauration du stock: {e}")
 
-@receiver(post_save, sender=Order)
-def update_product_sales_count(sender, instance, created, **kwargs):
-    """
-    Met à jour le compteur de ventes des produits
-    """
-    if instance.status in ['confirmed', 'shipped', 'delivered']:
-        order_items = OrderItem.objects.filter(order=instance)
-        
-        for item in order_items:
-            try:
-                product = Product.objects.get(id=item.product_id)
-                
-                # Incrémenter le compteur de ventes
-                if not hasattr(product, 'sales_count'):
-                    product.sales_count = 0
-                product.sales_count += item.quantity
-                product.save()
-                
-            except Product.DoesNotExist:
-                pass
-            except Exception as e:
-                print(f"Erreur lors de la mise à jour du compteur de ventes: {e}")
+@receiver(post_delete, sender=Review, dispatch_uid='review_deleted')
+def review_deleted(sender, instance, **kwargs):
+    saved_rating = getattr(instance, '_saved_rating', None)
+    rating = instance.rating if saved_rating is None else saved_rating
+    apply_rating_delta(instance.product_id, -1, -rating)
@@ -0,0 +1,90 @@
+"""
+Attribution de slugs uniques
+
+``SlugAllocator`` résout les collisions par suffixe (``maillot-asec``,
+``maillot-asec-2``, ...) en chargeant les slugs déjà pris avec une seule
+requête par lot : un filtre par préfixe sur la table du modèle, réuni (UNION)
+avec les anciens slugs conservés dans ``SlugRedirect`` pour que les liens
+existants continuent de rediriger vers le bon objet.
+
+Le même allocateur sert aux ``save()`` unitaires et aux imports en masse :
+les préfixes déjà chargés et les slugs déjà attribués restent en mémoire pour
+la durée de vie de l'instance. La contrainte d'unicité reste la garantie
+finale en cas d'écritures concurrentes.
+"""
+from django.db.models import Q
+from django.utils.text import slugify
+
+# Place réservée en fin de slug pour le suffixe "-12345"
+SUFFIX_RESERVE = 6
+# Nombre maximal de préfixes par requête
+PREFIXES_PER_QUERY = 200
+
+
+def base_slug(value, max_length=200, default='item'):
+    """Slug de base tronqué pour laisser la place d'un suffixe"""
+    return slugify(value)[:max_length - SUFFIX_RESERVE].strip('-') or default
+
+
+class SlugAllocator:
+    """Attribue des slugs uniques pour un modèle, par lots"""
+
+    def __init__(self, model, field_name='slug'):
+        self.model = model
+        self.field_name = field_name
+        self.max_length = model._meta.get_field(field_name).max_length or 50
+        self.kind = model._meta.model_name
+        self._loaded = set()
+        self._taken = set()
+
+    def _prefix_filter(self, field_name, bases):
+        condition = Q()
+        for base in bases:
+            condition |= Q(**{field_name: base}) | Q(**{f'{field_name}__startswith': f'{base}-'})
+        return condition
+
+    def load(self, bases):
+        """Charge les slugs pris pour les préfixes non encore connus"""
+        from .models import SlugRedirect
+
+        bases = sorted(set(bases) - self._loaded)
+        for start in range(0, len(bases), PREFIXES_PER_QUERY):
+            batch = bases[start:start + PREFIXES_PER_QUERY]
+            current = (
+                self.model._default_manager.order_by()
+                .filter(self._prefix_filter(self.field_name, batch))
+                .values_list(self.field_name, flat=True)
+            )
+            redirected = (
+                SlugRedirect.objects.order_by()
+                .filter(self._prefix_filter('old_slug', batch), kind=self.kind)
+                .values_list('old_slug', flat=True)
+            )
+            self._taken.update(current.union(redirected))
+            self._loaded.update(batch)
+
+    def allocate_many(self, values):
+        """
+        Retourne un slug unique pour chaque valeur (nom ou slug souhaité).
+        Un slug souhaité encore libre est conservé tel quel.
+        """
+        bases = [base_slug(value, self.max_length, self.kind) for value in values]
+        self.load(bases)
+
+        slugs = []
+        for base in bases:
+            slug, suffix = base, 1
+            while slug in self._taken:
+                suffix += 1
+                slug = f"{base}-{suffix}"
+            self._taken.add(slug)
+            slugs.append(slug)
+        return slugs
+
+    def allocate(self, value):
+        return self.allocate_many([value])[0]
+
+
+def unique_slug(instance, value):
+    """Slug unique pour une instance isolée (une requête)"""
+    return SlugAllocator(type(instance)).allocate(value)
@@ -1,3 +1,596 @@
-from django.test import TestCase
+import io
+import json
+import shutil
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .cache import CATALOG_CACHE, home_sections
+from .cards import ProductCard, product_cards
+from .views import review_page
+from .catalog import export_catalog, import_catalog
+from .customizations import customization_catalog
+from .models import BoughtTogether, Category, JerseyCustomization, Product, ProductImage, Review, SimilarProduct, SlugRedirect, Team, refresh_ratings
+from . import recommendations
+from .recommendations import (
+    bought_together_for, rebuild_bought_together, rebuild_similar_products, similar_products_for,
+)
+from .slugs import SlugAllocator
+
+
+class SlugAllocatorTest(TestCase):
+    """Tests pour l'attribution des slugs et les redirections"""
+
+    def setUp(self):
+        self.category = Category.objects.create(name="Maillots Domicile")
+        self.team = Team.objects.create(name="ASEC Mimosas", country="Côte d'Ivoire")
+
+    def create_product(self, name, **kwargs):
+        return Product.objects.create(
+            name=name, category=self.category, team=self.team, description="-",
+            price=Decimal('15000'), available_sizes=['M'], stock_quantity=5, **kwargs
+        )
+
+    def test_same_name_gets_suffixed_slugs(self):
+        slugs = [self.create_product("Maillot ASEC 2024").slug for _ in range(3)]
+        self.assertEqual(slugs, ['maillot-asec-2024', 'maillot-asec-2024-2', 'maillot-asec-2024-3'])
+        self.assertEqual(Team.objects.create(name="ASEC Mimosas", country="-").slug, 'asec-mimosas-2')
+
+    def test_batch_uses_one_query(self):
+        self.create_product("Maillot ASEC")
+        allocator = SlugAllocator(Product)
+        with self.assertNumQueries(1):
+            slugs = allocator.allocate_many(["Maillot ASEC", "Maillot ASEC", "Short ASEC", "maillot-asec-3"])
+        self.assertEqual(slugs, ['maillot-asec-2', 'maillot-asec-3', 'short-asec', 'maillot-asec-3-2'])
+        with self.assertNumQueries(0):
+            self.assertEqual(allocator.allocate("Maillot ASEC"), 'maillot-asec-4')
+
+    def test_rename_keeps_redirect(self):
+        product = self.create_product("Maillot ASEC")
+        product = Product.objects.get(pk=product.pk)
+        product.slug = 'maillot-asec-domicile'
+        product.save()
+        product.slug = 'maillot-asec-2025'
+        product.save()
+
+        self.assertEqual(
+            set(SlugRedirect.objects.values_list('old_slug', 'new_slug')),
+            {('maillot-asec', 'maillot-asec-2025'), ('maillot-asec-domicile', 'maillot-asec-2025')},
+        )
+        response = self.client.get(reverse('products:product_detail', args=['maillot-asec']))
+        self.assertRedirects(response, product.get_absolute_url(), status_code=301, fetch_redirect_response=False)
+        # Un ancien slug n'est pas réattribué à un nouveau produit
+        self.assertEqual(self.create_product("Maillot ASEC").slug, 'maillot-asec-2')
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class ProductCardTest(TestCase):
+    """Tests pour les cartes produit des listes"""
+
+    def setUp(self):
+        self.category = Category.objects.create(name="Maillots Domicile")
+        self.team = Team.objects.create(name="ASEC Mimosas", country="Côte d'Ivoire")
+        for i in range(6):
+            product = Product.objects.create(
+                name=f"Maillot {i}", category=self.category, team=self.team, description="-",
+                price=Decimal('15000'), sale_price=Decimal('12000') if i % 2 else None,
+                available_sizes=['M'], stock_quantity=5, is_featured=True,
+            )
+            ProductImage.objects.create(product=product, image=f'products/{i}-dos.jpg', order=0)
+            ProductImage.objects.create(product=product, image=f'products/{i}-face.jpg', order=1, is_primary=True)
+
+    def test_card_uses_primary_image_and_joined_names(self):
+        with self.assertNumQueries(1):
+            cards = product_cards(Product.objects.order_by('name'))
+        card = cards[1]
+        self.assertIsInstance(card, ProductCard)
+        self.assertEqual((card.team_name, card.category_name), ("ASEC Mimosas", "Maillots Domicile"))
+        self.assertTrue(card.image_url.endswith('products/1-face.jpg'))
+        self.assertEqual((card.current_price, card.is_on_sale, card.discount_percentage), (Decimal('12000'), True, 20))
+        self.assertEqual(card.get_absolute_url(), reverse('products:product_detail', args=['maillot-1']))
+        self.assertFalse(hasattr(card, '__dict__'))
+
+    def test_primary_image_follows_gallery_changes(self):
+        product = Product.objects.get(name="Maillot 0")
+        face = product.images.get(is_primary=True)
+        self.assertEqual(product.primary_image, face)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            face.delete()
+        product.refresh_from_db()
+        self.assertTrue(product.image_url.endswith('products/0-dos.jpg'))
+
+        ProductImage.objects.create(product=product, image='products/0-zoom.jpg', order=5, is_primary=True)
+        product.refresh_from_db()
+        self.assertTrue(product.image_url.endswith('products/0-zoom.jpg'))
+
+        Product.objects.update(primary_image=None)
+        call_command('backfill_primary_images', batch_size=4, stdout=io.StringIO())
+        self.assertFalse(Product.objects.filter(primary_image__isnull=True).exists())
+        self.assertTrue(Product.objects.get(pk=product.pk).image_url.endswith('products/0-zoom.jpg'))
+
+    def test_bulk_delete_keeps_a_primary_image(self):
+        products = list(Product.objects.filter(name__in=["Maillot 1", "Maillot 2"]))
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            ProductImage.objects.filter(product__in=products, is_primary=True).delete()
+        self.assertEqual(len(callbacks), 2)
+        for product in Product.objects.filter(pk__in=[product.pk for product in products]):
+            self.assertTrue(product.image_url.endswith('-dos.jpg'))
+
+        with self.assertNumQueries(0):
+            callbacks[1]()  # Produits déjà recalculés par le premier rappel: aucune requête
+        with self.captureOnCommitCallbacks(execute=True):
+            ProductImage.objects.filter(product=products[0]).delete()
+        self.assertIsNone(Product.objects.get(pk=products[0].pk).primary_image)
+
+    def catalog_queries(self, url, params=None):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        # Hors session (panier): seules les requêtes du catalogue comptent
+        return response, [query['sql'] for query in captured if 'products_' in query['sql']]
+
+    def test_listing_query_count_does_not_depend_on_products(self):
+        # catégorie, COUNT, produits joints à l'équipe, la catégorie et l'image principale
+        response, queries = self.catalog_queries(reverse('products:category_detail', args=[self.category.slug]))
+        self.assertEqual(len(queries), 3)
+        self.assertContains(response, 'products/3-face.jpg')
+
+        response, queries = self.catalog_queries(reverse('products:search'), {'q': 'Maillot'})
+        self.assertEqual(len(queries), 2)
+        self.assertContains(response, 'ASEC Mimosas')
+
+    def test_product_list_filters_by_category_and_team(self):
+        shorts = Category.objects.create(name="Shorts")
+        africa = Team.objects.create(name="Africa Sports", country="Côte d'Ivoire")
+        Product.objects.create(
+            name="Short Africa", category=shorts, team=africa, description="-",
+            price=Decimal('8000'), available_sizes=['M'], stock_quantity=5,
+        )
+        for params in ({'category': shorts.pk}, {'team': africa.pk}):
+            response = self.client.get(reverse('products:product_list'), params)
+            self.assertEqual([card.name for card in response.context['products']], ["Short Africa"])
+
+
+class ReviewRatingTest(TestCase):
+    """Tests pour les agrégats d'avis"""
+
+    def setUp(self):
+        self.product = Product.objects.create(
+            name="Maillot ASEC", category=Category.objects.create(name="Maillots"),
+            team=Team.objects.create(name="ASEC Mimosas", country="Côte d'Ivoire"),
+            description="-", price=Decimal('15000'), available_sizes=['M'], stock_quantity=5,
+        )
+        self.users = [User.objects.create_user(username=f'client{i}', password='testpass123') for i in range(3)]
+
+    def aggregates(self):
+        product = Product.objects.get(pk=self.product.pk)
+        return product.rating_count, product.rating_avg, product.rating_stars
+
+    def review(self, user, rating):
+        return Review.objects.create(product=self.product, user=user, rating=rating, comment="Très bien")
+
+    def test_aggregates_follow_review_changes(self):
+        reviews = [self.review(user, rating) for user, rating in zip(self.users, (5, 4, 4))]
+        self.assertEqual(self.aggregates(), (3, Decimal('4.33'), 4))
+
+        review = Review.objects.get(pk=reviews[0].pk)
+        review.rating = 2
+        review.save()
+        self.assertEqual(self.aggregates(), (3, Decimal('3.33'), 3))
+
+        review.delete()
+        reviews[1].delete()
+        self.assertEqual(self.aggregates(), (1, Decimal('4.00'), 4))
+        reviews[2].delete()
+        self.assertEqual(self.aggregates(), (0, Decimal('0.00'), 0))
+
+    def test_bulk_and_cascade_deletes_update_aggregates(self):
+        for user, rating in zip(self.users, (5, 4, 1)):
+            self.review(user, rating)
+        Review.objects.filter(rating__gte=4).delete()
+        self.assertEqual(self.aggregates(), (1, Decimal('1.00'), 1))
+
+        self.review(self.users[0], 3)
+        self.users[2].delete()
+        self.assertEqual(self.aggregates(), (1, Decimal('3.00'), 3))
+
+    def test_stale_edit_form_keeps_aggregates(self):
+        User.objects.create_user(username='admin', password='testpass123', is_staff=True)
+        self.client.login(username='admin', password='testpass123')
+
+        def load_then_review(model, **lookup):
+            # Un avis et une vente arrivent entre le chargement et l'enregistrement du formulaire
+            product = model.objects.get(**lookup)
+            self.review(self.users[0], 4)
+            Product.objects.filter(pk=product.pk).update(sales_count=3)
+            return product
+
+        with mock.patch('dashboard.views.get_object_or_404', side_effect=load_then_review):
+            self.client.post(reverse('dashboard:product_edit', args=[self.product.pk]), {
+                'name': "Maillot ASEC 2024", 'description': "-", 'price': '15000', 'stock_quantity': '5',
+            })
+
+        product = Product.objects.get(pk=self.product.pk)
+        self.assertEqual(product.name, "Maillot ASEC 2024")
+        self.assertEqual((product.rating_count, product.rating_sum, product.sales_count), (1, 4, 3))
+
+    def test_refresh_matches_incremental_updates(self):
+        for user, rating in zip(self.users, (5, 3, 1)):
+            self.review(user, rating)
+        expected = self.aggregates()
+        Product.objects.update(rating_count=0, rating_sum=0, rating_avg=0)
+        refresh_ratings()
+        self.assertEqual(self.aggregates(), expected)
+
+    def test_keyset_pagination(self):
+        reviews = [self.review(user, 5) for user in self.users]
+        page, cursor = review_page(self.product, size=2)
+        self.assertEqual([review.pk for review in page], [reviews[2].pk, reviews[1].pk])
+        page, cursor = review_page(self.product, before=cursor, size=2)
+        self.assertEqual(([review.pk for review in page], cursor), ([reviews[0].pk], None))
+
+    @override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+    def test_detail_page_shows_reviews(self):
+        self.review(self.users[0], 4)
+        response = self.client.get(self.product.get_absolute_url())
+        self.assertContains(response, 'Avis clients')
+        self.assertContains(response, '4,0 / 5')
+
+
+class SimilarProductsTest(TestCase):
+    """Tests pour les produits similaires et souvent achetés ensemble"""
+
+    def setUp(self):
+        self.maillots = Category.objects.create(name="Maillots")
+        self.shorts = Category.objects.create(name="Shorts")
+        self.asec = Team.objects.create(name="ASEC Mimosas", country="Côte d'Ivoire", league="Ligue 1")
+        self.africa = Team.objects.create(name="Africa Sports", country="Côte d'Ivoire", league="Ligue 1")
+        self.product = self.create("Maillot ASEC domicile", self.maillots, self.asec)
+        self.same_team = self.create("Short ASEC", self.shorts, self.asec)
+        self.both = self.create("Maillot ASEC extérieur", self.maillots, self.asec)
+        self.same_category = self.create("Maillot Africa", self.maillots, self.africa)
+        self.same_league = self.create("Short Africa", self.shorts, self.africa)
+
+    def create(self, name, category, team):
+        return Product.objects.create(
+            name=name, category=category, team=team, description="-",
+            price=Decimal('15000'), available_sizes=['M'], stock_quantity=5,
+        )
+
+    def neighbours(self, product):
+        return list(
+            SimilarProduct.objects.filter(product=product).order_by('rank').values_list('similar_id', flat=True)
+        )
+
+    def buy_together(self, *products):
+        from orders.models import Order, OrderItem
+
+        user = User.objects.create_user(username=f'client{Order.objects.count()}', password='testpass123')
+        order = Order.objects.create(user=user, subtotal=0, total=0)
+        for product in products:
+            OrderItem.objects.create(order=order, product=product, product_name=product.name,
+                                     size='M', quantity=1, price=product.price)
+        order.payment_status = 'paid'
+        order.save()
+        return order
+
+    def test_ranking(self):
+        self.assertEqual(rebuild_similar_products(), 5)
+        self.assertEqual(self.neighbours(self.product), [
+            self.both.pk, self.same_team.pk, self.same_category.pk, self.same_league.pk,
+        ])
+
+    def test_copurchases_lift_neighbours(self):
+        for _ in range(3):
+            self.buy_together(self.product, self.same_league)
+        rebuild_similar_products()
+        self.assertEqual(self.neighbours(self.product), [
+            self.both.pk, self.same_team.pk, self.same_league.pk, self.same_category.pk,
+        ])
+
+    def test_incremental_rebuild(self):
+        call_command('rebuild_similar_products', stdout=io.StringIO())
+        self.both.is_active = False
+        self.both.save()
+        call_command('rebuild_similar_products', stdout=io.StringIO())
+        self.assertNotIn(self.both.pk, self.neighbours(self.product))
+        self.assertFalse(SimilarProduct.objects.filter(product=self.both).exists())
+
+    def test_incremental_rebuild_updates_peers(self):
+        call_command('rebuild_similar_products', stdout=io.StringIO())
+        self.assertIn(self.same_category.pk, self.neighbours(self.product))
+        # Autre équipe : seule la liste de voisins relie les deux produits
+        self.same_category.is_active = False
+        self.same_category.save()
+        call_command('rebuild_similar_products', stdout=io.StringIO())
+        self.assertNotIn(self.same_category.pk, self.neighbours(self.product))
+
+    def test_invalid_since_is_an_error(self):
+        with self.assertRaises(CommandError):
+            call_command('rebuild_similar_products', since='hier', stdout=io.StringIO())
+        self.assertFalse(SimilarProduct.objects.exists())
+
+    @override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+    def test_detail_page_uses_neighbours(self):
+        rebuild_similar_products()
+        self.assertEqual([p.pk for p in similar_products_for(self.product)], self.neighbours(self.product)[:4])
+        response = self.client.get(self.product.get_absolute_url())
+        self.assertEqual([card.id for card in response.context['similar_products']], self.neighbours(self.product)[:4])
+
+    def pairs(self):
+        return set(BoughtTogether.objects.values_list('product_id', 'other_id', 'orders'))
+
+    def test_bought_together_incremental_matches_rebuild(self):
+        from orders.models import Order
+
+        self.buy_together(self.product, self.same_league, self.both)
+        order = self.buy_together(self.product, self.same_league)
+        order.save()  # déjà payée: pas de double comptage
+        incremental = self.pairs()
+        self.assertIn((self.product.pk, self.same_league.pk, 2), incremental)
+
+        # Commandes hors fenêtre de recomptage : comptées par la requête d'agrégation
+        Order.objects.update(paid_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(rebuild_bought_together(), 6)
+        self.assertEqual(self.pairs(), incremental)
+        self.assertEqual(
+            [product.pk for product in bought_together_for([self.product.pk])],
+            [self.same_league.pk, self.both.pk],
+        )
+
+    def test_bought_together_counts_outside_the_swap_transaction(self):
+        self.buy_together(self.product, self.same_league)
+        with CaptureQueriesContext(connection) as captured:
+            rebuild_bought_together()
+        sql = [query['sql'] for query in captured]
+        count = next(i for i, query in enumerate(sql) if 'COUNT(DISTINCT' in query)
+        savepoint = next(i for i, query in enumerate(sql) if query.startswith('SAVEPOINT'))
+        delete = next(i for i, query in enumerate(sql) if query.startswith('DELETE'))
+        self.assertLess(count, savepoint)
+        self.assertLess(savepoint, delete)
+        self.assertTrue(sql[-1].startswith('RELEASE SAVEPOINT'))
+
+    def test_bought_together_payment_during_count_is_counted_once(self):
+        from orders.models import Order
+
+        self.buy_together(self.product, self.same_league)
+        Order.objects.update(paid_at=timezone.now() - timedelta(hours=1))
+        count = recommendations.count_bought_together
+
+        def count_then_pay(cutoff):
+            pairs = list(count(cutoff))
+            # Paiement validé pendant le comptage: incrémente l'ancienne table
+            self.buy_together(self.product, self.same_league)
+            return iter(pairs)
+
+        with mock.patch.object(recommendations, 'count_bought_together', side_effect=count_then_pay):
+            rebuild_bought_together()
+        self.assertEqual(self.pairs(), {
+            (self.product.pk, self.same_league.pk, 2), (self.same_league.pk, self.product.pk, 2),
+        })
+
+    def test_bought_together_keeps_top_pairs_per_product(self):
+        from orders.models import Order
+
+        self.buy_together(self.product, self.same_league, self.both)
+        self.buy_together(self.product, self.same_league)
+        Order.objects.update(paid_at=timezone.now() - timedelta(hours=1))
+        rebuild_bought_together(top_n=1)
+        self.assertEqual(self.pairs(), {
+            (self.product.pk, self.same_league.pk, 2), (self.same_league.pk, self.product.pk, 2),
+            (self.both.pk, self.product.pk, 1),
+        })
+
+    @override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+    def test_bought_together_on_detail_and_cart(self):
+        self.buy_together(self.product, self.same_category)
+        response = self.client.get(self.product.get_absolute_url())
+        self.assertEqual([card.id for card in response.context['bought_together']], [self.same_category.pk])
+        self.assertContains(response, 'Souvent achetés ensemble')
+
+        self.client.post(reverse('cart:cart_add'), {'product_id': self.product.pk, 'size': 'M', 'quantity': 1})
+        response = self.client.get(reverse('cart:cart_detail'))
+        self.assertEqual([card.id for card in response.context['bought_together']], [self.same_category.pk])
+
+
+class CatalogImportTest(TestCase):
+    """Tests pour l'import / export du catalogue"""
+
+    def setUp(self):
+        self.category = Category.objects.create(name="Maillots Domicile")
+        self.team = Team.objects.create(name="ASEC Mimosas", country="Côte d'Ivoire")
+        self.existing = Product.objects.create(
+            name="Maillot ASEC", slug="maillot-asec", category=self.category, team=self.team,
+            description="-", price=Decimal('15000'), available_sizes=['M'], stock_quantity=5,
+        )
+
+    def import_csv(self, text, **options):
+        return import_catalog(io.StringIO(text), 'csv', **options)
+
+    def test_csv_creates_and_updates_with_unique_slugs(self):
+        report = self.import_csv(
+            "slug;name;category;team;description;price;sale_price;sizes;stock;is_featured;is_active\n"
+            "maillot-asec;Maillot ASEC;maillots-domicile;asec-mimosas;Nouveau;16000;;M|L;12;oui;1\n"
+            ";Maillot ASEC;maillots-domicile;asec-mimosas;Copie;14000;12000;s|xl;3;;1\n"
+            ";Maillot ASEC;maillots-domicile;asec-mimosas;Copie 2;14000;;M;3;;1\n"
+        )
+        self.assertEqual((report.created, report.updated, report.errors), (2, 1, []))
+
+        self.existing.refresh_from_db()
+        self.assertEqual(self.existing.price, Decimal('16000'))
+        self.assertEqual(self.existing.available_sizes, ['M', 'L'])
+        self.assertTrue(self.existing.is_featured)
+        self.assertEqual(
+            sorted(Product.objects.values_list('slug', flat=True)),
+            ['maillot-asec', 'maillot-asec-2', 'maillot-asec-3'],
+        )
+        copy = Product.objects.get(slug='maillot-asec-2')
+        self.assertEqual((copy.sale_price, copy.available_sizes), (Decimal('12000'), ['S', 'XL']))
+
+    def test_invalid_rows_are_reported_and_skipped(self):
+        report = self.import_csv(
+            "name,category,team,price,sizes\n"
+            "Maillot A,maillots-domicile,asec-mimosas,abc,M\n"
+            "Maillot B,inconnue,asec-mimosas,1000,M\n"
+            "Maillot C,maillots-domicile,asec-mimosas,1000,XXS\n"
+            "Maillot D,maillots-domicile,asec-mimosas,1000,M\n"
+        )
+        self.assertEqual(report.created, 1)
+        self.assertEqual([line for line, _ in report.errors], [2, 3, 4])
+
+    def test_model_constraints_are_row_errors(self):
+        long_name = 'M' * 201
+        report = self.import_csv(
+            "name,category,team,price\n"
+            f"{long_name},maillots-domicile,asec-mimosas,1000\n"
+            "Maillot B,maillots-domicile,asec-mimosas,123456789012\n"
+            "Maillot C,maillots-domicile,asec-mimosas,1000.555\n"
+            "Maillot D,maillots-domicile,asec-mimosas,1000\n",
+            chunk_size=10,
+        )
+        self.assertEqual(report.created, 1)
+        self.assertEqual([line for line, _ in report.errors], [2, 3, 4])
+        self.assertTrue(report.errors[0][1].startswith("Nom invalide"))
+        self.assertTrue(Product.objects.filter(name="Maillot D").exists())
+
+    def test_jsonl_partial_update_and_missing_teams(self):
+        lines = [
+            {'slug': 'maillot-asec', 'stock': 40},
+            {'name': 'Maillot Africa', 'category': 'maillots-domicile', 'team': 'africa-sports',
+             'team_name': 'Africa Sports', 'price': 13000},
+        ]
+        stream = io.StringIO(''.join(json.dumps(line) + '\n' for line in lines))
+        report = import_catalog(stream, 'jsonl', create_missing=True)
+        self.assertEqual((report.created, report.updated), (1, 1))
+
+        self.existing.refresh_from_db()
+        self.assertEqual((self.existing.stock_quantity, self.existing.price), (40, Decimal('15000')))
+        self.assertEqual(Team.objects.get(slug='africa-sports').name, 'Africa Sports')
+
+    def test_query_count_is_per_chunk(self):
+        header = "name;category;team;price\n"
+        rows = ''.join(f"Maillot {i};maillots-domicile;asec-mimosas;1000\n" for i in range(60))
+        # équipes et catégories + par lot: slugs, savepoint, INSERT, release
+        # (pas de recherche des produits existants sans colonne slug)
+        with self.assertNumQueries(2 + 4 * 3):
+            report = self.import_csv(header + rows, chunk_size=20)
+        self.assertEqual(report.created, 60)
+
+    def test_dry_run_writes_nothing(self):
+        report = self.import_csv("name;category;team;price\nMaillot B;maillots-domicile;asec-mimosas;1000\n", dry_run=True)
+        self.assertEqual(report.created, 1)
+        self.assertEqual(Product.objects.count(), 1)
+
+    def test_images_are_attached_from_directory(self):
+        images_dir = Path(tempfile.mkdtemp())
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, images_dir)
+        self.addCleanup(shutil.rmtree, media_root)
+        for name in ('face.jpg', 'dos.jpg'):
+            (images_dir / name).write_bytes(b'jpeg')
+
+        with override_settings(MEDIA_ROOT=media_root):
+            report = self.import_csv(
+                "name;category;team;price;images\n"
+                "Maillot B;maillots-domicile;asec-mimosas;1000;face.jpg|dos.jpg|absente.jpg\n",
+                images_dir=images_dir,
+            )
+        self.assertEqual(report.images, 2)
+        self.assertEqual(len(report.errors), 1)
+        images = list(ProductImage.objects.order_by('order').values_list('is_primary', 'order'))
+        self.assertEqual(images, [(True, 0), (False, 1)])
+
+    def test_export_round_trip(self):
+        out = io.StringIO()
+        self.assertEqual(export_catalog(out, 'csv'), 1)
+        Product.objects.update(price=Decimal('1'), stock_quantity=0)
+        report = self.import_csv(out.getvalue())
+        self.assertEqual((report.created, report.updated, report.errors), (0, 1, []))
+        self.existing.refresh_from_db()
+        self.assertEqual((self.existing.price, self.existing.stock_quantity), (Decimal('15000'), 5))
+
+    def test_export_quote_is_removed_on_import(self):
+        report = self.import_csv("slug;description\nmaillot-asec;'- Col en V\n")
+        self.assertEqual((report.updated, report.errors), (1, []))
+        self.assertEqual(Product.objects.get(pk=self.existing.pk).description, "- Col en V")
+
+    def test_management_command(self):
+        directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, directory)
+        path = directory / 'catalogue.jsonl'
+        path.write_text(json.dumps({'slug': 'maillot-asec', 'is_active': False}) + '\n', encoding='utf-8')
+        out = io.StringIO()
+        call_command('import_catalog', str(path), stdout=out, stderr=io.StringIO())
+        self.assertIn('1 mis à jour', out.getvalue())
+        self.assertFalse(Product.objects.get(pk=self.existing.pk).is_active)
+
+
+class CatalogCacheTest(TestCase):
+    """Tests pour le cache de la page d'accueil"""
+
+    def setUp(self):
+        caches[CATALOG_CACHE].clear()
+        self.category = Category.objects.create(name="Maillots", slug='maillots')
+        self.team = Team.objects.create(name="ASEC Mimosas", slug='asec', country="Côte d'Ivoire")
+
+    def create_product(self, name):
+        return Product.objects.create(
+            name=name, category=self.category, team=self.team, description="-",
+            price=Decimal('15000'), available_sizes=['M'], stock_quantity=5, is_featured=True,
+        )
+
+    def test_home_sections_cached_until_catalog_changes(self):
+        product = self.create_product("Maillot domicile")
+        self.assertEqual([card.name for card in home_sections()['featured_products']], ["Maillot domicile"])
+        with self.assertNumQueries(0):
+            home_sections()
+
+        product.name = "Maillot extérieur"
+        product.save()
+        self.assertEqual([card.name for card in home_sections()['featured_products']], ["Maillot extérieur"])
+
+    def test_import_invalidates_home(self):
+        self.assertEqual(home_sections()['latest_products'], [])
+        import_catalog(io.StringIO("name;category;team;price\nMaillot importé;maillots;asec;15000\n"))
+        self.assertEqual([card.name for card in home_sections()['latest_products']], ["Maillot importé"])
+
+
+class CustomizationCatalogTest(TestCase):
+    """Tests pour le catalogue des personnalisations en mémoire"""
+
+    def setUp(self):
+        caches[CATALOG_CACHE].clear()
+        self.badge = JerseyCustomization.objects.create(
+            name="Badge Ligue_1", customization_type='badge', badge_type='ligue_1', price=Decimal('500'),
+        )
+
+    def test_loaded_once_until_an_option_changes(self):
+        catalog = customization_catalog()
+        self.assertEqual(catalog.badge_option('ligue_1'), self.badge)
+        with self.assertNumQueries(0):
+            self.assertIs(customization_catalog(), catalog)
+            self.assertEqual(catalog.in_bulk([self.badge.id, 0]), {self.badge.id: self.badge})
+
+        self.badge.price = Decimal('700')
+        self.badge.save()
+        self.assertEqual(customization_catalog().get(self.badge.id).price, Decimal('700'))
+
+    def test_missing_option_is_created_once(self):
+        option = customization_catalog().name_option()
+        self.assertEqual((option.customization_type, option.name), ('name', "Nom et Numéro"))
+        with self.assertNumQueries(1):
+            self.assertEqual(customization_catalog().name_option(), option)
+        with self.assertNumQueries(0):
+            customization_catalog().name_option()
@@ -1,41 +1,53 @@
-from django.shortcuts import render, get_object_or_404
+from django.shortcuts import render, redirect, get_object_or_404
+from django.http import Http404
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 from django.db.models import Q
-from django_filters import rest_framework as filters
-from .models import Product, Category, Team
+from core.routers import replica_reads
+from .models import Product, Category, Team, SlugRedirect
 from .filters import ProductFilter
+from .cards import card_queryset, paginate_cards, product_cards
+from .cache import home_sections
+from .recommendations import bought_together_for, similar_products_for
 
 
+def redirect_renamed(kind, view_name, slug):
+    """Redirection permanente depuis un ancien slug, sinon 404"""
+    new_slug = SlugRedirect.resolve(kind, slug)
+    if new_slug is None:
+        raise Http404("Page introuvable")
+    return redirect(view_name, slug=new_slug, permanent=True)
+
+
+REVIEWS_PER_PAGE = 10
+
+
+def review_page(product, before=None, size=REVIEWS_PER_PAGE):
+    """
+    Avis d'un produit du plus récent au plus ancien, par pagination par clé:
+    ``before`` est l'id du dernier avis de la page précédente. Retourne
+    (avis, curseur de la page suivante ou None).
+    """
+    reviews = product.reviews.select_related('user').order_by('-id')
+    try:
+        reviews = reviews.filter(id__lt=int(before)) if before else reviews
+    except (TypeError, ValueError):
+        pass
+    reviews = list(reviews[:size + 1])
+    next_cursor = reviews[size - 1].id if len(reviews) > size else None
+    return reviews[:size], next_cursor
+
+
+@replica_reads
 def home(request):
     """Page d'accueil avec produits vedettes et promotions"""
-    featured_products = Product.objects.filter(
-        is_featured=True, 
-        is_active=True
-    ).prefetch_related('images', 'team', 'category')[:8]
-    
-    sale_products = Product.objects.filter(
-        sale_price__isnull=False,
-        is_active=True
-    ).prefetch_related('images', 'team', 'category')[:8]
-    
-    latest_products = Product.objects.filter(
-        is_active=True
-    ).prefetch_related('images', 'team', 'category')[:12]
-    
-    categories = Category.objects.all()[:6]
-    
-    context = {
-        'featured_products': featured_products,
-        'sale_products': sale_products,
-        'latest_products': latest_products,
-        'categories': categories,
-    }
+    context = home_sections()
     return render(request, 'products/home.html', context)
 
 
+@replica_reads
 def product_list(request):
     """Liste des produits avec filtres"""
-    products = Product.objects.filter(is_active=True).prefetch_related('images', 'team', 'category')
+    products = card_queryset(Product.objects.filter(is_active=True))
     
     # Appliquer les filtres
     product_filter = ProductFilter(request.GET, queryset=products)
@@ -50,6 +62,7 @@ def product_list(request):
         products = paginator.page(1)
     except EmptyPage:
         products = paginator.page(paginator.num_pages)
+    paginate_cards(products)
     
     # Obtenir les filtres disponibles
     categories = Category.objects.all()
@@ -64,38 +77,54 @@ def product_list(request):
     return render(request, 'products/product_list.html', context)
 
 
+@replica_reads
 def product_detail(request, slug):
     """Détail d'un produit"""
-    product = get_object_or_404(
-        Product.objects.prefetch_related('images', 'team', 'category', 'reviews__user'),
-        slug=slug, 
-        is_active=True
-    )
+    try:
+        product = get_object_or_404(
+            Product.objects.select_related('team', 'category').prefetch_related('images'),
+            slug=slug, 
+            is_active=True
+        )
+    except Http404:
+        return redirect_renamed('product', 'products:product_detail', slug)
     
     # Produits similaires
-    similar_products = Product.objects.filter(
-        Q(category=product.category) | Q(team=product.team),
-        is_active=True
-    ).exclude(id=product.id).prefetch_related('images')[:4]
-    
-    # Avis du produit
-    reviews = product.reviews.all()
+    similar_products = product_cards(similar_products_for(product))
+    if not similar_products:
+        # Voisins pas encore calculés (rebuild_similar_products)
+        similar_products = product_cards(Product.objects.filter(
+            Q(category=product.category) | Q(team=product.team),
+            is_active=True
+        ).exclude(id=product.id).order_by('-sales_count')[:4])
+    
+    # Souvent achetés ensemble
+    bought_together = product_cards(bought_together_for([product.id]))
+
+    # Avis du produit (pagination par curseur: ?avis=<id du dernier avis affiché>)
+    reviews, next_reviews = review_page(product, request.GET.get('avis'))
     
     context = {
         'product': product,
         'similar_products': similar_products,
+        'bought_together': bought_together,
         'reviews': reviews,
+        'next_reviews': next_reviews,
     }
     return render(request, 'products/product_detail.html', context)
 
 
+@replica_reads
 def category_detail(request, slug):
     """Détail d'une catégorie avec ses produits"""
-    category = get_object_or_404(Category, slug=slug)
-    products = Product.objects.filter(
+    try:
+        category = get_object_or_404(Category, slug=slug)
+    except Http404:
+        return redirect_renamed('category', 'products:category_detail', slug)
+    products = card_queryset(Product.objects.filter(
         category=category, 
         is_active=True
-    ).prefetch_related('images', 'team')
+    ))
     
     # Pagination
     paginator = Paginator(products, 12)
@@ -106,6 +135,7 @@ def category_detail(request, slug):
         products = paginator.page(1)
     except EmptyPage:
         products = paginator.page(paginator.num_pages)
+    paginate_cards(products)
     
     context = {
         'category': category,
@@ -114,13 +144,17 @@ def category_detail(request, slug):
     return render(request, 'products/category_detail.html', context)
 
 
+@replica_reads
 def team_detail(request, slug):
     """Détail d'une équipe avec ses produits"""
-    team = get_object_or_404(Team, slug=slug)
-    products = Product.objects.filter(
+    try:
+        team = get_object_or_404(Team, slug=slug)
+    except Http404:
+        return redirect_renamed('team', 'products:team_detail', slug)
+    products = card_queryset(Product.objects.filter(
         team=team, 
         is_active=True
-    ).prefetch_related('images', 'category')
+    ))
     
     # Pagination
     paginator = Paginator(products, 12)
@@ -131,6 +165,7 @@ def team_detail(request, slug):
         products = paginator.page(1)
     except EmptyPage:
         products = paginator.page(paginator.num_pages)
+    paginate_cards(products)
     
     context = {
         'team': team,
@@ -139,6 +174,7 @@ def team_detail(request, slug):
     return render(request, 'products/team_detail.html', context)
 
 
+@replica_reads
 def search(request):
     """Recherche de produits"""
     query = request.GET.get('q', '')
@@ -150,7 +186,8 @@ def search(request):
             Q(description__icontains=query) |
             Q(team__name__icontains=query) |
             Q(category__name__icontains=query)
-        ).prefetch_related('images', 'team', 'category')
+        )
+    products = card_queryset(products)
     
     # Pagination
     paginator = Paginator(products, 12)
@@ -161,6 +198,7 @@ def search(request):
         products = paginator.page(1)
     except EmptyPage:
         products = paginator.page(paginator.num_pages)
+    paginate_cards(products)
     
     context = {
         'products': products,
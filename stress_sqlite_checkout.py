@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+"""
+Test de charge SQLite: commandes simultanées depuis plusieurs workers
+
+Chaque worker (processus, comme un worker gunicorn) passe des commandes en
+boucle sur une base SQLite temporaire: lecture du stock, création de la
+commande et de ses articles, décrément du stock, dans une seule transaction.
+Le script compte les erreurs « database is locked ».
+
+Usage:
+    python stress_sqlite_checkout.py [--workers 4] [--orders 100] [--rate 0]
+    python stress_sqlite_checkout.py --baseline   # sans PRAGMA ni BEGIN IMMEDIATE
+"""
+import argparse
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+
+def setup_django(path, tuned):
+    os.environ['SQLITE_HIGH_CONCURRENCY'] = 'True' if tuned else 'False'
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ecom_maillot.settings')
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    from django.conf import settings
+    settings.DATABASES['default']['NAME'] = path
+
+    import django
+    django.setup()
+
+
+def checkout(user, products, tuned):
+    """Équivalent de orders.views.order_create pour deux articles"""
+    from decimal import Decimal
+
+    from django.db import transaction
+    from django.db.models import F
+
+    from core.db import write_atomic
+    from orders.models import Order, OrderItem
+    from products.models import Product
+
+    atomic = write_atomic if tuned else transaction.atomic
+    with atomic():
+        lines = list(Product.objects.filter(pk__in=products).values_list('pk', 'name', 'price', 'stock_quantity'))
+        subtotal = sum((price for _, _, price, _ in lines), Decimal('0'))
+        order = Order.objects.create(user=user, subtotal=subtotal, total=subtotal + 1000, shipping_cost=1000)
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product_id=pk, product_name=name, size='M', quantity=1, price=price, total_price=price)
+            for pk, name, price, _ in lines
+        ])
+        Product.objects.filter(pk__in=products).update(stock_quantity=F('stock_quantity') - 1)
+
+
+def worker(path, tuned, index, orders, rate, results):
+    setup_django(path, tuned)
+    import random
+
+    from django.contrib.auth.models import User
+    from django.db import OperationalError
+
+    user = User.objects.get(username=f'stress{index}')
+    product_ids = list(range(1, 21))
+    rng = random.Random(index)
+    timings, errors = [], 0
+    for _ in range(orders):
+        started = time.perf_counter()
+        try:
+            checkout(user, rng.sample(product_ids, 2), tuned)
+        except OperationalError as exc:
+            if 'locked' not in str(exc):
+                raise
+            errors += 1
+        else:
+            timings.append((time.perf_counter() - started) * 1000)
+        if rate:
+            time.sleep(max(0, 1 / rate - (time.perf_counter() - started)))
+    results.put((timings, errors))
+
+
+def prepare(path, workers):
+    from decimal import Decimal
+
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+    from django.db import connections
+
+    from products.models import Category, Product, Team
+
+    call_command('migrate', verbosity=0)
+    category = Category.objects.create(name="Maillots")
+    team = Team.objects.create(name="ASEC Mimosas", country="Côte d'Ivoire")
+    Product.objects.bulk_create([
+        Product(name=f"Maillot {i}", slug=f"maillot-{i}", category=category, team=team, description="-",
+                price=Decimal('15000'), available_sizes=['M'], stock_quantity=100000)
+        for i in range(1, 21)
+    ])
+    User.objects.bulk_create([User(username=f'stress{i}') for i in range(workers)])
+    connections.close_all()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--orders', type=int, default=100, help="Commandes par worker")
+    parser.add_argument('--rate', type=float, default=0, help="Commandes/s par worker (0: sans pause)")
+    parser.add_argument('--baseline', action='store_true', help="Sans PRAGMA ni BEGIN IMMEDIATE")
+    args = parser.parse_args()
+    tuned = not args.baseline
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'stress.sqlite3')
+        setup_django(path, tuned)
+        prepare(path, args.workers)
+
+        context = multiprocessing.get_context('spawn')
+        results = context.Queue()
+        started = time.perf_counter()
+        processes = [
+            context.Process(target=worker, args=(path, tuned, index, args.orders, args.rate, results))
+            for index in range(args.workers)
+        ]
+        for process in processes:
+            process.start()
+        collected = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - started
+
+    timings = [timing for worker_timings, _ in collected for timing in worker_timings]
+    errors = sum(worker_errors for _, worker_errors in collected)
+    mode = "référence (BEGIN différé, sans PRAGMA)" if args.baseline else "profil SQLite (WAL, BEGIN IMMEDIATE)"
+    print(f"⏱  {mode}: {args.workers} workers x {args.orders} commandes")
+    print(f"  commandes réussies : {len(timings)} ({len(timings) / elapsed:.0f}/s)")
+    if timings:
+        print(f"  latence médiane    : {statistics.median(timings):.1f} ms, max {max(timings):.1f} ms")
+    print(f"  erreurs « locked » : {errors}")
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -97,7 +97,7 @@ class CartTest(TestCase):
         self.assertEqual(response.status_code, 302)  # Redirection
         
         # Vérifier que le produit est dans le panier
-        cart = Cart(self.client)
+        cart = Cart(response.wsgi_request)
         self.assertEqual(len(cart), 2)
     
     def test_cart_remove_product(self):
@@ -118,7 +118,7 @@ class CartTest(TestCase):
         self.assertEqual(response.status_code, 302)
         
         # Vérifier que le panier est vide
-        cart = Cart(self.client)
+        cart = Cart(response.wsgi_request)
         self.assertEqual(len(cart), 0)
 
 